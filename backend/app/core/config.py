@@ -22,13 +22,68 @@ STORAGE_TYPE = os.getenv("STORAGE_TYPE", "json")
 ENABLE_AUTO_ANALYTICS = os.getenv("ENABLE_AUTO_ANALYTICS", "true").lower() == "true"
 ENABLE_RAG = os.getenv("ENABLE_RAG", "false").lower() == "true"
 
+# --- Configuration stockage JSON ---
+# Mode journal : ajout en fin de fichier + compaction en tâche de fond
+JSON_STORAGE_JOURNAL = os.getenv("JSON_STORAGE_JOURNAL", "false").lower() == "true"
+JSON_JOURNAL_COMPACT_THRESHOLD = int(os.getenv("JSON_JOURNAL_COMPACT_THRESHOLD", "1000"))
+# Format des fichiers/données : json (compact, orjson si installé), json-pretty ou msgpack
+STORAGE_CODEC = os.getenv("STORAGE_CODEC", "json")
+# Cache de lecture des tickets (par processus, couche "cache" de
+# STORAGE_MIDDLEWARE) : nombre d'entrées (0 = désactivé)
+# et durée de vie en secondes, qui borne le retard vu par les autres workers
+STORAGE_CACHE_SIZE = int(os.getenv("STORAGE_CACHE_SIZE", "1000"))
+STORAGE_CACHE_TTL = float(os.getenv("STORAGE_CACHE_TTL", "5"))
+# Couches empilées autour du stockage, du backend vers les routers :
+# cache, metrics, slowlog, faults (voir services/storage/middleware.py).
+# Aucune par défaut : le cache est propre au processus, à n'activer qu'avec
+# un seul worker ou si un retard de STORAGE_CACHE_TTL est acceptable
+STORAGE_MIDDLEWARE = [
+    name.strip() for name in os.getenv("STORAGE_MIDDLEWARE", "").split(",") if name.strip()
+]
+# slowlog : seuil en millisecondes au-delà duquel un appel est loggé
+STORAGE_SLOW_CALL_MS = float(os.getenv("STORAGE_SLOW_CALL_MS", "500"))
+# faults (tests de charge uniquement) : latence ajoutée (+ jitter aléatoire),
+# taux d'erreurs 503 et opérations visées (vide = toutes)
+STORAGE_FAULT_LATENCY_MS = float(os.getenv("STORAGE_FAULT_LATENCY_MS", "0"))
+STORAGE_FAULT_JITTER_MS = float(os.getenv("STORAGE_FAULT_JITTER_MS", "0"))
+STORAGE_FAULT_ERROR_RATE = float(os.getenv("STORAGE_FAULT_ERROR_RATE", "0"))
+STORAGE_FAULT_OPERATIONS = [
+    name.strip() for name in os.getenv("STORAGE_FAULT_OPERATIONS", "").split(",") if name.strip()
+]
+
 # --- Configuration AWS / DynamoDB ---
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 DYNAMODB_TABLE_TICKETS = os.getenv("DYNAMODB_TABLE_TICKETS", "freeda-tickets")
+# Disposition de la table : "item" (messages dans l'item ticket) ou
+# "single_table" (clé ticket_id + sk, un item par message)
+DYNAMODB_LAYOUT = os.getenv("DYNAMODB_LAYOUT", "item")
+# Scan parallèle : nombre de segments et segments lus simultanément
+DYNAMODB_SCAN_SEGMENTS = int(os.getenv("DYNAMODB_SCAN_SEGMENTS", "4"))
+DYNAMODB_SCAN_WORKERS = int(os.getenv("DYNAMODB_SCAN_WORKERS", "4"))
+# Pool de threads dédié et connexions HTTP du client (défaut : une par thread)
+DYNAMODB_MAX_WORKERS = int(os.getenv("DYNAMODB_MAX_WORKERS", "32"))
+DYNAMODB_MAX_POOL_CONNECTIONS = int(os.getenv("DYNAMODB_MAX_POOL_CONNECTIONS", "0")) or None
+# Statut shardé sur N clés du GSI status_shard-created_at-index (0 = désactivé)
+DYNAMODB_STATUS_SHARDS = int(os.getenv("DYNAMODB_STATUS_SHARDS", "0"))
+# Index « tous les tickets » sur N clés du GSI created_shard-created_at-index,
+# exigé au démarrage (0 = listings non filtrés par scan complet de la table)
+DYNAMODB_CREATED_SHARDS = int(os.getenv("DYNAMODB_CREATED_SHARDS", "4"))
+# Compteurs agrégés du dashboard (table dédiée, vide = non maintenus) et
+# nombre d'items compteurs (limite les conflits entre transactions)
+DYNAMODB_TABLE_COUNTERS = os.getenv("DYNAMODB_TABLE_COUNTERS", "")
+DYNAMODB_COUNTER_SHARDS = int(os.getenv("DYNAMODB_COUNTER_SHARDS", "4"))
+# Retry adaptatif : essais par appel, backoff (secondes) et budget de retry
+# partagé par le processus (un retry coûte 5 jetons, un succès en rend 1)
+DYNAMODB_MAX_ATTEMPTS = int(os.getenv("DYNAMODB_MAX_ATTEMPTS", "5"))
+DYNAMODB_RETRY_BASE_DELAY = float(os.getenv("DYNAMODB_RETRY_BASE_DELAY", "0.05"))
+DYNAMODB_RETRY_MAX_DELAY = float(os.getenv("DYNAMODB_RETRY_MAX_DELAY", "2"))
+DYNAMODB_RETRY_BUDGET = int(os.getenv("DYNAMODB_RETRY_BUDGET", "500"))
 
 # --- Chemins de fichiers ---
 DATA_DIR = BASE_DIR / "data"
-TICKETS_FILE = DATA_DIR / "tickets.json"
+TICKETS_FILE = DATA_DIR / ("tickets.msgpack" if STORAGE_CODEC == "msgpack" else "tickets.json")
+TICKETS_DIR = DATA_DIR / "tickets"  # STORAGE_TYPE=json_sharded
+SQLITE_PATH = Path(os.getenv("SQLITE_PATH", str(DATA_DIR / "tickets.db")))  # STORAGE_TYPE=sqlite
 CHROMA_DB_DIR = DATA_DIR / "chroma_db"
 
 # Créer le dossier data s'il n'existe pas (sécurité)
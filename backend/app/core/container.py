@@ -9,3 +9,24 @@ class ServiceContainer:
     rag_service = None
 
 services = ServiceContainer()
+
+
+async def get_ticket_storage():
+    """
+    Dépendance FastAPI : stockage des tickets unique du processus.
+
+    Créé au startup (ou à la première requête si le startup n'a pas eu lieu,
+    par exemple avec un TestClient) puis partagé par tous les routers : un
+    seul client DynamoDB, un seul verrou et un seul cache par fichier JSON.
+    """
+    if services.storage is None:
+        from app.services.storage.interface import get_storage
+        services.storage = get_storage()
+    return services.storage
+
+
+async def close_ticket_storage() -> None:
+    """Fermer le stockage partagé ; il sera recréé au prochain appel."""
+    storage, services.storage = services.storage, None
+    if storage is not None:
+        await storage.close()
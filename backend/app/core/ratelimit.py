@@ -11,18 +11,18 @@ class RateLimiter:
         # Stockage : {ip: [timestamp1, timestamp2, ...]}
         self.requests = defaultdict(list)
         
-    def is_allowed(self, ip: str, limit: int, window_seconds: int) -> bool:
+    def is_allowed(self, ip: str, limit: int, window_seconds: int, cost: int = 1) -> bool:
         now = time.time()
         
         # Nettoyer les anciennes requêtes de cette IP
         self.requests[ip] = [t for t in self.requests[ip] if now - t < window_seconds]
         
-        # Vérifier le nombre de requêtes
-        if len(self.requests[ip]) >= limit:
+        # Vérifier le nombre de requêtes (une requête peut compter pour plusieurs)
+        if len(self.requests[ip]) + cost > limit:
             return False
             
         # Ajouter la nouvelle requête
-        self.requests[ip].append(now)
+        self.requests[ip].extend([now] * cost)
         return True
 
 # Instances globales pour différents types de limites
@@ -32,6 +32,10 @@ ticket_limiter = RateLimiter()
 # Limite plus souple pour les messages (conversation fluide)
 message_limiter = RateLimiter()
 
+# Suivi groupé : limite en nombre d'IDs consultés, et non en requêtes, pour
+# qu'un appel à 100 IDs ne multiplie pas par 100 l'énumération des tickets
+lookup_limiter = RateLimiter()
+
 async def check_ticket_rate_limit(request: Request):
     """
     Dépendance pour limiter la création de tickets.
@@ -57,3 +61,23 @@ async def check_message_rate_limit(request: Request):
             status_code=429, 
             detail="Vous envoyez des messages trop vite. Veuillez ralentir."
         )
+
+async def check_lookup_rate_limit(request: Request):
+    """
+    Dépendance pour limiter le suivi groupé de tickets.
+    Max 100 IDs consultés par minute par IP (chaque ID distinct compte).
+    """
+    client_ip = request.client.host
+    # Corps déjà lu par FastAPI : request.json() le relit depuis le cache
+    try:
+        ticket_ids = (await request.json()).get("ticket_ids")
+        cost = min(100, max(1, len(set(ticket_ids))))
+    except Exception:
+        # Corps invalide : rejeté ensuite par la validation, compte pour un
+        cost = 1
+    # 100 IDs / 60 secondes
+    if not lookup_limiter.is_allowed(client_ip, limit=100, window_seconds=60, cost=cost):
+        raise HTTPException(
+            status_code=429,
+            detail="Trop de tickets consultés. Veuillez patienter avant de réessayer."
+        )
@@ -10,13 +10,11 @@ from app.core.config import (
     MISTRAL_API_URL,
     STORAGE_TYPE,
     TICKETS_FILE,
-    DYNAMODB_TABLE_TICKETS,
-    AWS_REGION,
     ENABLE_AUTO_ANALYTICS,
     ENABLE_RAG,
     CHROMA_DB_DIR
 )
-from app.core.container import services
+from app.core.container import services, get_ticket_storage, close_ticket_storage
 from app.core.websocket import manager
 
 # Routers imports
@@ -26,8 +24,6 @@ from app.routers.private import tickets as private_tickets
 from app.routers.private import auth as private_auth
 
 # Services imports
-from app.services.storage.json_store import JSONStorage
-from app.services.storage.dynamodb_store import DynamoDBStorage
 from app.services.ai.mistral import MistralClient
 from app.services.ai.analytics import AnalyticsService
 from app.services.ai.rag import RAGService
@@ -45,6 +41,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 # Include API routes
@@ -58,14 +55,10 @@ async def startup():
     logger.info("Starting Freeda SAV backend...")
     
     # 1. Initialize Storage
-    if STORAGE_TYPE == "dynamodb":
-        logger.info("Using DynamoDB storage")
-        services.storage = DynamoDBStorage(table_name=DYNAMODB_TABLE_TICKETS, region=AWS_REGION)
-    else:
-        logger.info("Using JSON storage: %s", TICKETS_FILE)
-        services.storage = JSONStorage(file_path=TICKETS_FILE)
-        if not TICKETS_FILE.exists():
-            TICKETS_FILE.write_text("{}", encoding="utf-8")
+    logger.info("Using %s storage", STORAGE_TYPE)
+    storage = await get_ticket_storage()
+    if STORAGE_TYPE == "json" and not TICKETS_FILE.exists():
+        TICKETS_FILE.write_bytes(storage.codec.dumps({}))
 
     # 2. Initialize Mistral Client
     if MISTRAL_API_KEY:
@@ -90,7 +83,7 @@ async def startup():
         logger.info("Analytics service disabled")
     
     # 4. Initialize Export
-    services.export_service = ExportService(services.storage)
+    services.export_service = ExportService(storage)
     logger.info("Export service initialized")
     
     # 5. Initialize RAG
@@ -121,8 +114,7 @@ async def startup():
 @app.on_event("shutdown")
 async def shutdown():
     logger.info("Shutting down...")
-    if services.storage:
-        await services.storage.close()
+    await close_ticket_storage()
     if services.mistral_client:
         await services.mistral_client.close()
     logger.info("Shutdown complete")
@@ -134,8 +126,9 @@ async def websocket_endpoint(websocket: WebSocket, ticket_id: str):
     try:
         # Send initial ticket state if exists
         try:
-            if services.storage and await services.storage.ticket_exists(ticket_id):
-                ticket = await services.storage.get_ticket(ticket_id)
+            storage = await get_ticket_storage()
+            if await storage.ticket_exists(ticket_id):
+                ticket = await storage.get_ticket(ticket_id)
                 await websocket.send_json({"type": "ticket_snapshot", "ticket": ticket})
         except Exception as e:
             logger.error(f"Error sending snapshot: {e}")
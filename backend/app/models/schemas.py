@@ -1,5 +1,5 @@
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class TicketCreate(BaseModel):
     initial_message: str
@@ -33,5 +33,8 @@ class AgentMessageCreate(BaseModel):
     content: str
     internal: bool = False
 
+class TicketLookup(BaseModel):
+    ticket_ids: List[str] = Field(..., min_length=1, max_length=100)
+
 class AssignTicketRequest(BaseModel):
     agent_email: str
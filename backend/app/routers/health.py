@@ -36,7 +36,23 @@ async def health():
         "mistral_model": MISTRAL_MODEL,
         "analytics_enabled": ENABLE_AUTO_ANALYTICS,
         "rag_enabled": ENABLE_RAG,
-        "rag_active": rag_status
+        "rag_active": rag_status,
+        "storage_cache": (
+            services.storage.cache_stats()
+            if hasattr(services.storage, "cache_stats") else None
+        ),
+        "storage_retry": (
+            services.storage.retry_stats()
+            if hasattr(services.storage, "retry_stats") else None
+        ),
+        "storage_metrics": (
+            services.storage.metrics_stats()
+            if hasattr(services.storage, "metrics_stats") else None
+        ),
+        "storage_faults": (
+            services.storage.fault_stats()
+            if hasattr(services.storage, "fault_stats") else None
+        )
     }
 
 
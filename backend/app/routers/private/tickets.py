@@ -11,15 +11,16 @@ Utilisés par le frontend admin pour :
 Sécurité : JWT obligatoire, vérification des rôles
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from datetime import datetime
 
 # Import des services
-from app.services.storage.interface import get_storage
+from app.services.storage.interface import OPEN_STATUSES, TicketStorage, resolution_seconds
 from app.core.security import verify_token, require_admin
 from app.services.analytics.sentiment_analyzer import SentimentAnalyzer
-from app.core.container import services
+from app.core.container import services, get_ticket_storage
 from app.core.utils import now_iso
 from app.models.schemas import AgentMessageCreate, AssignTicketRequest
 from app.core.websocket import manager
@@ -27,18 +28,24 @@ from app.core.websocket import manager
 router = APIRouter(prefix="/private/tickets", tags=["Private - Tickets"])
 
 # Initialisation des services
-storage = get_storage()
 analyzer = SentimentAnalyzer()
 
 
 @router.get("/", response_model=List[dict])
 async def list_all_tickets(
+    response: Response,
     user: dict = Depends(verify_token),
     status: Optional[str] = None,
     channel: Optional[str] = None,
     assigned_to: Optional[str] = None,
     urgency: Optional[str] = None,
-    limit: int = 100
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    summary: bool = False,
+    with_total: bool = False,
+    storage: TicketStorage = Depends(get_ticket_storage)
 ):
     """
     Liste de TOUS les tickets (PRIVÉ - JWT requis)
@@ -52,29 +59,46 @@ async def list_all_tickets(
         channel: Filtrer par canal (chat, phone, email, etc.)
         assigned_to: Filtrer par agent assigné
         urgency: Filtrer par urgence (haute, normale, basse)
-        limit: Nombre maximum de tickets à retourner
+        date_from / date_to: Bornes de date de création (ISO format)
+        limit: Nombre maximum de tickets à retourner (taille de page)
+        cursor: Jeton de la page suivante (en-tête X-Next-Cursor de la réponse précédente)
+        summary: Résumés pour la vue liste (attributs affichés, analytics
+            réduits, aperçu du dernier message) au lieu des en-têtes complets
+        with_total: Ajouter le nombre total de tickets correspondant aux
+            filtres (en-tête X-Total-Count), compté par le stockage
     
     Returns:
-        Liste de tous les tickets avec toutes les données
+        Liste des en-têtes de tickets (sans les messages, avec
+        message_count et last_message), ou des résumés si `summary`
     """
     
-    # Récupérer tous les tickets
-    tickets = await storage.list_tickets(
+    # Récupérer une page de tickets (filtres et limite appliqués par le stockage)
+    filters = dict(
         status=status,
         channel=channel,
-        limit=limit
+        assigned_to=assigned_to,
+        urgency=urgency,
+        date_from=date_from,
+        date_to=date_to,
+        limit=limit,
+        cursor=cursor,
     )
-    
-    # Filtrer par agent si spécifié
-    if assigned_to:
-        tickets = [t for t in tickets if t.get("assigned_to") == assigned_to]
-    
-    # Filtrer par urgence si spécifié
-    if urgency:
-        tickets = [
-            t for t in tickets 
-            if t.get("analytics", {}).get("urgency") == urgency
-        ]
+    if summary:
+        tickets, next_cursor = await storage.list_ticket_summaries(**filters)
+    else:
+        tickets, next_cursor = await storage.list_tickets_page(include_messages=False, **filters)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if with_total:
+        total = await storage.count_tickets(
+            status=status,
+            channel=channel,
+            assigned_to=assigned_to,
+            urgency=urgency,
+            date_from=date_from,
+            date_to=date_to,
+        )
+        response.headers["X-Total-Count"] = str(total)
     
     # Enrichir avec des métadonnées pour l'admin
     for ticket in tickets:
@@ -82,22 +106,42 @@ async def list_all_tickets(
         created_at = datetime.fromisoformat(ticket["created_at"].replace("Z", "+00:00"))
         age_hours = (datetime.utcnow() - created_at.replace(tzinfo=None)).total_seconds() / 3600
         ticket["age_hours"] = round(age_hours, 1)
-        
-        # Nombre de messages
-        ticket["message_count"] = len(ticket.get("messages", []))
-        
-        # Dernier message
-        messages = ticket.get("messages", [])
-        if messages:
-            ticket["last_message"] = messages[-1]
+        # message_count et last_message sont fournis par l'en-tête
     
     return tickets
 
 
+@router.get("/stats", response_model=dict)
+async def get_ticket_stats(
+    user: dict = Depends(verify_token),
+    days: int = Query(30, ge=1, le=366),
+    storage: TicketStorage = Depends(get_ticket_storage)
+):
+    """
+    Totaux du dashboard (PRIVÉ - JWT requis)
+    
+    Utilisé par : Frontend ADMIN (dashboard)
+    
+    Permissions : Agent, Manager, Admin
+    
+    Les compteurs sont maintenus à chaque écriture par le stockage : aucun
+    listing des tickets n'est nécessaire.
+    
+    Query Params:
+        days: Nombre de jours de l'historique créations/fermetures
+    
+    Returns:
+        total, open, closed, by_status, by_channel et by_urgency
+        (ouverts/fermés), by_day (créés/fermés par jour)
+    """
+    return await storage.get_ticket_stats(days)
+
+
 @router.get("/{ticket_id}", response_model=dict)
 async def get_ticket_full(
     ticket_id: str,
-    user: dict = Depends(verify_token)
+    user: dict = Depends(verify_token),
+    storage: TicketStorage = Depends(get_ticket_storage)
 ):
     """
     Récupérer un ticket complet (PRIVÉ - JWT requis)
@@ -122,7 +166,8 @@ async def get_ticket_full(
 async def update_ticket(
     ticket_id: str,
     updates: dict,
-    user: dict = Depends(verify_token)
+    user: dict = Depends(verify_token),
+    storage: TicketStorage = Depends(get_ticket_storage)
 ):
     """
     Modifier un ticket (PRIVÉ - JWT requis)
@@ -142,27 +187,28 @@ async def update_ticket(
         Ticket mis à jour
     """
     
-    # Vérifier que le ticket existe
-    ticket = await storage.get_ticket(ticket_id)
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket non trouvé")
-    
     # Ajouter les métadonnées de modification
-    updates["updated_at"] = datetime.utcnow().isoformat()
+    now = datetime.utcnow().isoformat()
+    updates["updated_at"] = now
     updates["updated_by"] = user["email"]
     
-    # Si on change le statut à "fermé", ajouter la date de fermeture
-    if updates.get("status") == "fermé" and ticket["status"] != "fermé":
-        updates["closed_at"] = datetime.utcnow().isoformat()
-        updates["closed_by"] = user["email"]
-        
-        # Calculer le temps de résolution
-        created_at = datetime.fromisoformat(ticket["created_at"].replace("Z", "+00:00"))
-        resolution_time = (datetime.utcnow() - created_at.replace(tzinfo=None)).total_seconds()
-        updates["resolution_time_seconds"] = int(resolution_time)
-    
-    # Mettre à jour le ticket
-    updated_ticket = await storage.update_ticket(ticket_id, updates)
+    # Mettre à jour le ticket (404 levée par le stockage, sans lecture préalable)
+    if updates.get("status") == "fermé":
+        # Ajouter la date de fermeture seulement si le ticket était encore ouvert ;
+        # le temps de résolution est dérivé de created_at/closed_at à la lecture
+        try:
+            updated_ticket = await storage.update_ticket(
+                ticket_id,
+                {**updates, "closed_at": now, "closed_by": user["email"]},
+                expected_status=OPEN_STATUSES,
+            )
+        except HTTPException as e:
+            if e.status_code != 409:
+                raise
+            # Déjà fermé : mise à jour simple
+            updated_ticket = await storage.update_ticket(ticket_id, updates)
+    else:
+        updated_ticket = await storage.update_ticket(ticket_id, updates)
     
     # Broadcast update via WebSocket (pour le client)
     await manager.broadcast(ticket_id, {
@@ -177,7 +223,8 @@ async def update_ticket(
 async def add_agent_message(
     ticket_id: str,
     request: AgentMessageCreate,
-    user: dict = Depends(verify_token)
+    user: dict = Depends(verify_token),
+    storage: TicketStorage = Depends(get_ticket_storage)
 ):
     """
     Ajouter un message en tant qu'agent (PRIVÉ - JWT requis)
@@ -187,11 +234,6 @@ async def add_agent_message(
     content = request.content
     internal = request.internal
     
-    # Vérifier que le ticket existe
-    ticket = await storage.get_ticket(ticket_id)
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket non trouvé")
-    
     # Créer le message
     import uuid
     message = {
@@ -204,16 +246,21 @@ async def add_agent_message(
         "internal": internal
     }
     
-    # Ajouter le message
+    # Ajouter le message (404 levée par le stockage si le ticket n'existe pas)
     await storage.add_message(ticket_id, message)
     
-    # Si le ticket était "nouveau", le passer en "en cours"
-    if ticket["status"] == "nouveau":
+    # Si le ticket était "nouveau", le passer en "en cours" (écriture conditionnelle)
+    status_updated = True
+    try:
         await storage.update_ticket(ticket_id, {
             "status": "en cours",
             "assigned_to": user["email"],
             "updated_at": datetime.utcnow().isoformat()
-        })
+        }, expected_status="nouveau")
+    except HTTPException as e:
+        if e.status_code != 409:
+            raise
+        status_updated = False
         
     # Broadcast message via WebSocket (pour le client)
     if not internal:
@@ -231,7 +278,7 @@ async def add_agent_message(
     return {
         "message": "Message ajouté avec succès",
         "message_id": message["message_id"],
-        "ticket_status_updated": ticket["status"] == "nouveau"
+        "ticket_status_updated": status_updated
     }
 
 
@@ -239,7 +286,8 @@ async def add_agent_message(
 async def assign_ticket(
     ticket_id: str,
     request: AssignTicketRequest,
-    user: dict = Depends(verify_token)
+    user: dict = Depends(verify_token),
+    storage: TicketStorage = Depends(get_ticket_storage)
 ):
     """
     Assigner un ticket à un agent (PRIVÉ - JWT requis)
@@ -248,19 +296,24 @@ async def assign_ticket(
     """
     agent_email = request.agent_email
     
-    # Vérifier que le ticket existe
-    ticket = await storage.get_ticket(ticket_id)
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket non trouvé")
-    
-    # Mettre à jour l'assignation
-    await storage.update_ticket(ticket_id, {
+    # Mettre à jour l'assignation (404 levée par le stockage)
+    now = datetime.utcnow().isoformat()
+    assignment = {
         "assigned_to": agent_email,
-        "assigned_at": datetime.utcnow().isoformat(),
+        "assigned_at": now,
         "assigned_by": user["email"],
-        "status": "en cours" if ticket["status"] == "nouveau" else ticket["status"],
-        "updated_at": datetime.utcnow().isoformat()
-    })
+        "updated_at": now
+    }
+    try:
+        # Un ticket "nouveau" passe "en cours"
+        await storage.update_ticket(
+            ticket_id, {**assignment, "status": "en cours"}, expected_status="nouveau"
+        )
+    except HTTPException as e:
+        if e.status_code != 409:
+            raise
+        # Statut déjà pris en charge : conserver le statut courant
+        await storage.update_ticket(ticket_id, assignment)
     
     # Broadcast update via WebSocket
     await manager.broadcast(ticket_id, {
@@ -278,7 +331,8 @@ async def assign_ticket(
 @router.delete("/{ticket_id}", response_model=dict)
 async def delete_ticket(
     ticket_id: str,
-    user: dict = Depends(require_admin)  # Admin uniquement
+    user: dict = Depends(require_admin),  # Admin uniquement
+    storage: TicketStorage = Depends(get_ticket_storage)
 ):
     """
     Supprimer un ticket (PRIVÉ - ADMIN uniquement)
@@ -291,12 +345,7 @@ async def delete_ticket(
         Confirmation de suppression
     """
     
-    # Vérifier que le ticket existe
-    ticket = await storage.get_ticket(ticket_id)
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket non trouvé")
-    
-    # Supprimer le ticket
+    # Supprimer le ticket (404 levée par le stockage s'il n'existe pas)
     await storage.delete_ticket(ticket_id)
     
     return {
@@ -310,7 +359,8 @@ async def delete_ticket(
 @router.get("/{ticket_id}/history", response_model=List[dict])
 async def get_ticket_history(
     ticket_id: str,
-    user: dict = Depends(verify_token)
+    user: dict = Depends(verify_token),
+    storage: TicketStorage = Depends(get_ticket_storage)
 ):
     """
     Récupérer l'historique complet d'un ticket (PRIVÉ - JWT requis)
@@ -372,7 +422,11 @@ async def get_ticket_history(
             "timestamp": ticket["closed_at"],
             "description": f"Fermé par {ticket.get('closed_by', 'Système')}",
             "data": {
-                "resolution_time": ticket.get("resolution_time_seconds")
+                "resolution_time": ticket.get(
+                    "resolution_time_seconds",
+                    ticket.get("resolution_duration")
+                    or resolution_seconds(ticket["created_at"], ticket["closed_at"])
+                )
             }
         })
     
@@ -396,16 +450,19 @@ async def export_tickets_csv(
     Utilisé par : Frontend ADMIN (export de données)
     
     Permissions : Manager, Admin
+    
+    Le CSV est envoyé au fil des pages lues dans le stockage : la mémoire
+    utilisée ne dépend pas du nombre de tickets exportés.
     """
     if not services.export_service:
         raise HTTPException(status_code=503, detail="Service d'export indisponible")
         
-    csv_content = await services.export_service.generate_csv(
+    csv_chunks = services.export_service.iter_csv(
         status=status, channel=channel, date_from=date_from, date_to=date_to
     )
     
-    return Response(
-        content=csv_content,
+    return StreamingResponse(
+        csv_chunks,
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename=tickets_export_{now_iso()}.csv"}
     )
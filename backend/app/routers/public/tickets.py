@@ -16,21 +16,23 @@ from typing import Optional
 import uuid
 
 # Import des services
-from app.services.storage.interface import get_storage
+from app.services.storage.interface import OPEN_STATUSES, TicketStorage
 from app.core.config import SYSTEM_PROMPT, ENABLE_RAG
-from app.core.container import services
+from app.core.container import services, get_ticket_storage
 from app.core.utils import normalize_agent_signature
 from app.core.websocket import manager
-from app.core.ratelimit import check_ticket_rate_limit, check_message_rate_limit
-from app.models.schemas import TicketCreate, MessageCreate, StatusUpdate
+from app.core.ratelimit import (
+    check_ticket_rate_limit,
+    check_message_rate_limit,
+    check_lookup_rate_limit,
+)
+from app.models.schemas import TicketCreate, MessageCreate, StatusUpdate, TicketLookup
 from app.services.ai.smart_reply import smart_reply
 
 
 
 router = APIRouter(prefix="/public/tickets", tags=["Public - Tickets"])
 
-# Initialisation des services
-storage = get_storage()
 
 async def get_system_prompt_with_context(user_message: str) -> str:
     """Ajoute le contexte RAG au prompt systeme si active."""
@@ -55,7 +57,10 @@ def generate_ticket_id() -> str:
 
 
 @router.post("/", response_model=dict, dependencies=[Depends(check_ticket_rate_limit)])
-async def create_ticket_public(request: TicketCreate):
+async def create_ticket_public(
+    request: TicketCreate,
+    storage: TicketStorage = Depends(get_ticket_storage)
+):
     """
     Creer un nouveau ticket (PUBLIC - sans authentification)
     
@@ -191,8 +196,44 @@ async def create_ticket_public(request: TicketCreate):
     return response
 
 
+@router.post("/lookup", response_model=dict, dependencies=[Depends(check_lookup_rate_limit)])
+async def lookup_tickets_public(
+    request: TicketLookup,
+    storage: TicketStorage = Depends(get_ticket_storage)
+):
+    """
+    Suivre plusieurs tickets en un appel (PUBLIC)
+    
+    Utilise par : Frontend CLIENT (suivi de plusieurs tickets)
+    
+    Returns:
+        Statut de chaque ticket trouve (les IDs inconnus sont listes a part)
+    """
+    # Lecture groupee des en-tetes, sans les messages
+    tickets = await storage.get_tickets(request.ticket_ids, include_messages=False)
+    found = {t["ticket_id"] for t in tickets}
+    
+    return {
+        "tickets": [
+            {
+                "ticket_id": t["ticket_id"],
+                "status": t["status"],
+                "channel": t.get("channel"),
+                "created_at": t["created_at"],
+                "last_update": t.get("updated_at", t["created_at"]),
+                "message_count": t.get("message_count", 0)
+            }
+            for t in tickets
+        ],
+        "not_found": [t for t in dict.fromkeys(request.ticket_ids) if t not in found]
+    }
+
+
 @router.get("/{ticket_id}", response_model=dict)
-async def get_ticket_public(ticket_id: str):
+async def get_ticket_public(
+    ticket_id: str,
+    storage: TicketStorage = Depends(get_ticket_storage)
+):
     """
     Recuperer un ticket par son ID (PUBLIC)
     
@@ -250,7 +291,8 @@ async def get_ticket_public(ticket_id: str):
 @router.post("/{ticket_id}/messages", response_model=dict, dependencies=[Depends(check_message_rate_limit)])
 async def add_message_public(
     ticket_id: str,
-    request: MessageCreate
+    request: MessageCreate,
+    storage: TicketStorage = Depends(get_ticket_storage)
 ):
     """
     Ajouter un message a un ticket (PUBLIC)
@@ -395,7 +437,10 @@ async def add_message_public(
 
 
 @router.get("/{ticket_id}/status", response_model=dict)
-async def get_ticket_status_public(ticket_id: str):
+async def get_ticket_status_public(
+    ticket_id: str,
+    storage: TicketStorage = Depends(get_ticket_storage)
+):
     """
     Recuperer uniquement le statut d un ticket (PUBLIC)
     
@@ -408,7 +453,8 @@ async def get_ticket_status_public(ticket_id: str):
         Statut actuel du ticket
     """
     
-    ticket = await storage.get_ticket(ticket_id)
+    # En-tete seul : le statut ne necessite pas les messages
+    ticket = await storage.get_ticket(ticket_id, include_messages=False)
     
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket non trouve")
@@ -442,14 +488,15 @@ async def get_ticket_status_public(ticket_id: str):
             "color": "gray"
         }),
         "last_update": ticket.get("updated_at", ticket["created_at"]),
-        "message_count": len(ticket.get("messages", []))
+        "message_count": ticket.get("message_count", 0)
     }
 
 
 @router.patch("/{ticket_id}/status", response_model=dict)
 async def update_ticket_status_public(
     ticket_id: str,
-    update: StatusUpdate
+    update: StatusUpdate,
+    storage: TicketStorage = Depends(get_ticket_storage)
 ):
     """
     Mettre à jour le statut d'un ticket (PUBLIC)
@@ -464,17 +511,17 @@ async def update_ticket_status_public(
             detail="Seule la fermeture du ticket est autorisée publiquement"
         )
         
-    ticket = await storage.get_ticket(ticket_id)
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket non trouvé")
-        
-    # Si déjà fermé, rien à faire
-    if ticket["status"] == "fermé":
-        return {"message": "Ticket déjà fermé", "status": "fermé"}
-        
-    # Mettre à jour le statut
+    # Fermeture conditionnelle (404 si inconnu, 409 si déjà fermé), sans lecture préalable
     closed_at = datetime.utcnow().isoformat()
-    await storage.update_ticket_status(ticket_id, "fermé", closed_at)
+    try:
+        await storage.update_ticket_status(
+            ticket_id, "fermé", closed_at, expected_status=OPEN_STATUSES
+        )
+    except HTTPException as e:
+        if e.status_code != 409:
+            raise
+        # Si déjà fermé, rien à faire
+        return {"message": "Ticket déjà fermé", "status": "fermé"}
     
     # Broadcast via WebSocket
     await manager.broadcast(ticket_id, {
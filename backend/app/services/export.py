@@ -6,10 +6,31 @@ import csv
 import io
 import logging
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Colonnes du CSV d'export
+CSV_HEADERS = [
+    "ticket_id",
+    "created_at",
+    "closed_at",
+    "status",
+    "channel",
+    "sentiment",
+    "category",
+    "urgency",
+    "summary",
+    "messages_count",
+    "resolution_duration_seconds",
+    "resolution_duration_hours",
+    "first_response_time_seconds",
+    "avg_response_time_seconds",
+]
+
+# Tickets lus (avec leurs messages) par page lors d'un export
+EXPORT_PAGE_SIZE = 200
+
 
 class ExportService:
     """Service d'export CSV des tickets."""
@@ -24,15 +45,17 @@ class ExportService:
         self.storage = storage
         logger.info("ExportService initialized")
 
-    async def generate_csv(
+    async def iter_csv(
         self,
         status: Optional[str] = None,
         channel: Optional[str] = None,
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
-    ) -> str:
+    ) -> AsyncIterator[str]:
         """
-        Générer un CSV avec tous les tickets filtrés.
+        Générer le CSV des tickets filtrés morceau par morceau : en-têtes,
+        puis un morceau par page de `storage.iter_tickets`. La mémoire
+        utilisée ne dépend pas du nombre de tickets exportés.
         
         Args:
             status: Filtrer par statut
@@ -40,50 +63,50 @@ class ExportService:
             date_from: Date de début (ISO format)
             date_to: Date de fin (ISO format)
             
-        Returns:
-            str: Contenu du CSV
+        Yields:
+            str: Morceaux successifs du CSV
         """
-        # Récupérer les tickets filtrés
-        tickets = await self.storage.list_tickets(
-            status=status,
-            channel=channel,
-            date_from=date_from,
-            date_to=date_to
-        )
-
-        # Générer le CSV
         output = io.StringIO()
         writer = csv.writer(output)
+        writer.writerow(CSV_HEADERS)
+        yield output.getvalue()
 
-        # En-têtes
-        headers = [
-            "ticket_id",
-            "created_at",
-            "closed_at",
-            "status",
-            "channel",
-            "sentiment",
-            "category",
-            "urgency",
-            "summary",
-            "messages_count",
-            "resolution_duration_seconds",
-            "resolution_duration_hours",
-            "first_response_time_seconds",
-            "avg_response_time_seconds",
-        ]
-        writer.writerow(headers)
-
-        # Données
-        for ticket in tickets:
-            row = self._ticket_to_row(ticket)
-            writer.writerow(row)
+        count = 0
+        async for page in self.storage.iter_tickets(
+            status=status,
+            channel=channel,
+            date_from=date_from,
+            date_to=date_to,
+            page_size=EXPORT_PAGE_SIZE,
+        ):
+            output.seek(0)
+            output.truncate()
+            writer.writerows(self._ticket_to_row(ticket) for ticket in page)
+            count += len(page)
+            yield output.getvalue()
 
-        csv_content = output.getvalue()
         output.close()
+        logger.info(f"CSV generated with {count} tickets")
 
-        logger.info(f"CSV generated with {len(tickets)} tickets")
-        return csv_content
+    async def generate_csv(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> str:
+        """
+        Générer un CSV avec tous les tickets filtrés (voir iter_csv).
+        
+        Returns:
+            str: Contenu du CSV
+        """
+        chunks = [
+            chunk async for chunk in self.iter_csv(
+                status=status, channel=channel, date_from=date_from, date_to=date_to
+            )
+        ]
+        return "".join(chunks)
 
     async def generate_single_ticket_csv(self, ticket_id: str) -> str:
         """
@@ -101,23 +124,7 @@ class ExportService:
         writer = csv.writer(output)
 
         # En-têtes
-        headers = [
-            "ticket_id",
-            "created_at",
-            "closed_at",
-            "status",
-            "channel",
-            "sentiment",
-            "category",
-            "urgency",
-            "summary",
-            "messages_count",
-            "resolution_duration_seconds",
-            "resolution_duration_hours",
-            "first_response_time_seconds",
-            "avg_response_time_seconds",
-        ]
-        writer.writerow(headers)
+        writer.writerow(CSV_HEADERS)
 
         # Données
         row = self._ticket_to_row(ticket)
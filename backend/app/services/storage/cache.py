@@ -0,0 +1,250 @@
+"""
+Cache de lecture devant un stockage de tickets.
+
+`CachedStorage` décore n'importe quel `TicketStorage` : `get_ticket`,
+`get_tickets` et `ticket_exists` sont servis depuis un cache LRU borné avec
+expiration (TTL), et chaque écriture met à jour ou invalide les entrées du
+ticket concerné. Les listings, itérations, comptages et totaux ne sont pas
+mis en cache.
+
+Le cache est propre au processus : avec plusieurs workers, une écriture
+faite par un autre processus n'est visible qu'après expiration du TTL.
+"""
+import copy
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .interface import StatusCondition, TicketStorage
+from .middleware import StorageMiddleware
+
+logger = logging.getLogger(__name__)
+
+_MISS = object()
+
+
+class TicketCache:
+    """Cache LRU borné avec TTL, et compteurs de hits/misses."""
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 5.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        # Séquence des invalidations : un remplissage note `generation` avant
+        # de lire le stockage, et n'est pas inséré si son ticket a été
+        # invalidé depuis (une écriture sur un autre ticket ne compte pas)
+        self.generation = 0
+        # Dernière invalidation de chaque ticket (bornée à maxsize, du plus
+        # ancien au plus récent) ; les tickets oubliés prennent `_floor`
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Valeur en cache (copie), ou `_MISS`."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < self._clock():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return _MISS
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, key: Tuple[str, str], value: Any, generation: Optional[int] = None) -> None:
+        """Mettre une valeur en cache, sauf si son ticket a été invalidé depuis `generation`."""
+        if generation is not None and self.invalidated_since(key[1], generation):
+            return
+        self._entries[key] = (self._clock() + self.ttl, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidated_since(self, ticket_id: str, generation: int) -> bool:
+        """Vrai si le ticket a été invalidé après `generation`."""
+        return self._invalidated.get(ticket_id, self._floor) > generation
+
+    def invalidate(self, ticket_id: str) -> None:
+        """Oublier toutes les entrées d'un ticket."""
+        self.generation += 1
+        self._invalidated[ticket_id] = self.generation
+        self._invalidated.move_to_end(ticket_id)
+        while len(self._invalidated) > self.maxsize:
+            # Ticket le plus anciennement invalidé : relever le plancher
+            _, self._floor = self._invalidated.popitem(last=False)
+        for key in (("ticket", ticket_id), ("header", ticket_id), ("exists", ticket_id)):
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._floor = self.generation
+        self._invalidated.clear()
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs du cache."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else None,
+        }
+
+
+_shared_cache: Optional[TicketCache] = None
+
+
+def shared_cache(maxsize: int, ttl: float) -> TicketCache:
+    """
+    Cache unique du processus : toutes les instances de stockage créées par
+    la factory le partagent, pour qu'une écriture faite par l'une invalide
+    les lectures des autres.
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = TicketCache(maxsize=maxsize, ttl=ttl)
+    return _shared_cache
+
+
+class CachedStorage(StorageMiddleware):
+    """Décorateur de `TicketStorage` avec cache de lecture et invalidation à l'écriture."""
+
+    def __init__(self, storage: TicketStorage, cache: Optional[TicketCache] = None):
+        super().__init__(storage)
+        self.cache = cache or TicketCache()
+        logger.info(
+            f"CachedStorage initialized: {type(storage).__name__} "
+            f"(maxsize={self.cache.maxsize}, ttl={self.cache.ttl}s)"
+        )
+
+    @staticmethod
+    def _key(ticket_id: str, include_messages: bool) -> Tuple[str, str]:
+        return ("ticket" if include_messages else "header", ticket_id)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+    # ------------------------------------------------------------------
+    # Lectures
+    # ------------------------------------------------------------------
+    async def get_ticket(self, ticket_id: str, include_messages: bool = True) -> dict:
+        key = self._key(ticket_id, include_messages)
+        ticket = self.cache.get(key)
+        if ticket is _MISS:
+            generation = self.cache.generation
+            ticket = await self.storage.get_ticket(ticket_id, include_messages=include_messages)
+            self.cache.put(key, ticket, generation)
+        return ticket
+
+    async def get_tickets(
+        self, ticket_ids: Iterable[str], include_messages: bool = True
+    ) -> List[dict]:
+        ticket_ids = list(dict.fromkeys(ticket_ids))
+        found: Dict[str, dict] = {}
+        missing = []
+        for ticket_id in ticket_ids:
+            ticket = self.cache.get(self._key(ticket_id, include_messages))
+            if ticket is _MISS:
+                missing.append(ticket_id)
+            else:
+                found[ticket_id] = ticket
+        if missing:
+            generation = self.cache.generation
+            for ticket in await self.storage.get_tickets(missing, include_messages=include_messages):
+                found[ticket["ticket_id"]] = ticket
+                self.cache.put(self._key(ticket["ticket_id"], include_messages), ticket, generation)
+        return [found[t] for t in ticket_ids if t in found]
+
+    async def ticket_exists(self, ticket_id: str) -> bool:
+        if self.cache.get(("exists", ticket_id)) is True:
+            return True
+        generation = self.cache.generation
+        exists = await self.storage.ticket_exists(ticket_id)
+        if exists:
+            # Pas de cache négatif : un ticket créé ailleurs doit apparaître
+            self.cache.put(("exists", ticket_id), True, generation)
+        return exists
+
+    # ------------------------------------------------------------------
+    # Écritures
+    # ------------------------------------------------------------------
+    def _store_updated(self, ticket: dict, generation: int) -> None:
+        """
+        Write-through : le ticket complet retourné par l'écriture remplace
+        l'entrée, sauf si une autre écriture sur ce ticket s'est terminée
+        depuis `generation` (noté avant l'appel) : son résultat peut être plus
+        récent, l'entrée est seulement invalidée.
+        """
+        stale = self.cache.invalidated_since(ticket["ticket_id"], generation)
+        self.cache.invalidate(ticket["ticket_id"])
+        if not stale:
+            self.cache.put(self._key(ticket["ticket_id"], True), ticket)
+
+    async def save_ticket(self, ticket: dict) -> None:
+        try:
+            await self.storage.save_ticket(ticket)
+        finally:
+            self.cache.invalidate(ticket["ticket_id"])
+
+    async def save_tickets(self, tickets: Iterable[dict]) -> int:
+        tickets = list(tickets)
+        try:
+            return await self.storage.save_tickets(tickets)
+        finally:
+            for ticket in tickets:
+                self.cache.invalidate(ticket["ticket_id"])
+
+    async def update_ticket_status(
+        self,
+        ticket_id: str,
+        status: str,
+        closed_at: Optional[str] = None,
+        expected_status: StatusCondition = None,
+    ) -> dict:
+        generation = self.cache.generation
+        try:
+            ticket = await self.storage.update_ticket_status(
+                ticket_id, status, closed_at, expected_status=expected_status
+            )
+        except Exception:
+            self.cache.invalidate(ticket_id)
+            raise
+        self._store_updated(ticket, generation)
+        return ticket
+
+    async def update_ticket(
+        self, ticket_id: str, updates: dict, expected_status: StatusCondition = None
+    ) -> dict:
+        generation = self.cache.generation
+        try:
+            ticket = await self.storage.update_ticket(
+                ticket_id, updates, expected_status=expected_status
+            )
+        except Exception:
+            self.cache.invalidate(ticket_id)
+            raise
+        self._store_updated(ticket, generation)
+        return ticket
+
+    async def add_message(self, ticket_id: str, message: dict) -> None:
+        try:
+            await self.storage.add_message(ticket_id, message)
+        finally:
+            self.cache.invalidate(ticket_id)
+
+    async def delete_ticket(self, ticket_id: str) -> None:
+        try:
+            await self.storage.delete_ticket(ticket_id)
+        finally:
+            self.cache.invalidate(ticket_id)
+
+    async def close(self) -> None:
+        self.cache.clear()
+        await self.storage.close()
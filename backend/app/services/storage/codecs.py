@@ -0,0 +1,138 @@
+"""
+Codecs de sérialisation pour la persistance des tickets.
+
+- json : JSON compact, encodé avec orjson s'il est installé (sinon stdlib).
+- json-pretty : JSON indenté (ancien format, lisible à la main).
+- msgpack : MessagePack binaire (nécessite le paquet `msgpack`).
+
+Chaque codec sait aussi encoder des enregistrements successifs pour les
+journaux en ajout seul (`frame`) et les relire depuis un flux (`iter_frames`).
+"""
+import json
+from abc import ABC, abstractmethod
+from typing import Any, List, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    msgpack = None
+
+
+class Codec(ABC):
+    """Format de sérialisation des tickets."""
+
+    name: str = ""
+    suffix: str = ""
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        """Encoder un objet."""
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        """Décoder un objet."""
+
+    @abstractmethod
+    def frame(self, obj: Any) -> bytes:
+        """Encoder un enregistrement de journal."""
+
+    @abstractmethod
+    def iter_frames(self, data: bytes) -> Tuple[List[Any], int]:
+        """
+        Décoder les enregistrements complets d'un flux.
+
+        Retourne `(records, consumed)` : un enregistrement incomplet en fin de
+        flux n'est pas consommé. Un enregistrement illisible est remplacé par
+        None pour que l'appelant puisse le signaler.
+        """
+
+
+class JSONCodec(Codec):
+    """JSON (orjson si disponible) ; journal au format JSON Lines."""
+
+    suffix = ".json"
+
+    def __init__(self, pretty: bool = False):
+        self.pretty = pretty
+        self.name = "json-pretty" if pretty else "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if self.pretty else 0)
+        if self.pretty:
+            return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+    def frame(self, obj: Any) -> bytes:
+        # Une ligne par enregistrement, jamais indenté
+        if orjson is not None:
+            return orjson.dumps(obj) + b"\n"
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+    def iter_frames(self, data: bytes) -> Tuple[List[Any], int]:
+        end = data.rfind(b"\n") + 1
+        records = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(self.loads(line))
+            except ValueError:
+                records.append(None)
+        return records, end
+
+
+class MsgPackCodec(Codec):
+    """MessagePack : plus compact et plus rapide que JSON."""
+
+    name = "msgpack"
+    suffix = ".msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise RuntimeError("Le codec msgpack nécessite le paquet 'msgpack' (pip install msgpack)")
+
+    def dumps(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+    def frame(self, obj: Any) -> bytes:
+        return self.dumps(obj)
+
+    def iter_frames(self, data: bytes) -> Tuple[List[Any], int]:
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(data)
+        records = []
+        consumed = 0
+        try:
+            for record in unpacker:
+                records.append(record)
+                consumed = unpacker.tell()
+        except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError):
+            # Flux corrompu : on ne peut pas se resynchroniser
+            records.append(None)
+            consumed = len(data)
+        return records, consumed
+
+
+def get_codec(name: str = "json") -> Codec:
+    """Obtenir un codec par son nom (json, json-pretty, msgpack)."""
+    if name == "json":
+        return JSONCodec()
+    if name == "json-pretty":
+        return JSONCodec(pretty=True)
+    if name == "msgpack":
+        return MsgPackCodec()
+    raise ValueError(f"Unknown storage codec: {name}")
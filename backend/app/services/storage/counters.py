@@ -0,0 +1,123 @@
+"""
+Compteurs agrégés des tickets, pour les totaux du dashboard.
+
+Chaque ticket contribue à un ensemble de compteurs (`counter_keys`) : total,
+ouverts/fermés, par statut, par canal et par urgence (ouverts/fermés), créés
+par jour et fermés par jour. Une écriture applique la différence entre les
+compteurs de l'état avant et après (`counter_delta`) : les totaux se lisent
+en O(1), sans lister les tickets.
+
+`TicketCounters` les maintient en mémoire pour les stockages résidents
+(JSONStorage, comme `TicketIndex`) ; DynamoDBStorage les écrit dans une
+table dédiée, dans la même transaction que le ticket.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .index import indexed_values
+
+CLOSED_STATUS = "fermé"
+
+# Champs d'un ticket dont dépendent les compteurs
+COUNTER_FIELDS = ("status", "channel", "analytics", "created_at", "closed_at")
+
+
+def counter_keys(ticket: dict) -> List[str]:
+    """Compteurs auxquels un ticket contribue (une unité chacun)."""
+    values = indexed_values(ticket)
+    state = "closed" if values["status"] == CLOSED_STATUS else "open"
+    keys = ["total", f"state:{state}"]
+    if values["status"]:
+        keys.append(f"status:{values['status']}")
+    if values["channel"]:
+        keys.append(f"channel:{values['channel']}:{state}")
+    if values["urgency"]:
+        keys.append(f"urgency:{values['urgency']}:{state}")
+    created_day = str(ticket.get("created_at") or "")[:10]
+    if created_day:
+        keys.append(f"created:{created_day}")
+    closed_day = str(ticket.get("closed_at") or "")[:10]
+    if state == "closed" and closed_day:
+        keys.append(f"closed:{closed_day}")
+    return keys
+
+
+def counter_delta(before: Optional[dict], after: Optional[dict]) -> Dict[str, int]:
+    """Incréments à appliquer pour passer de `before` à `after` (None = absent)."""
+    delta = Counter(counter_keys(after) if after else [])
+    delta.subtract(counter_keys(before) if before else [])
+    return {key: value for key, value in delta.items() if value}
+
+
+def stats_from_counters(counts: Dict[str, int], days: int = 30) -> dict:
+    """
+    Totaux du dashboard à partir des compteurs : ouverts/fermés, répartitions
+    par statut, canal et urgence, créations et fermetures des `days` derniers
+    jours (UTC, du plus ancien au plus récent).
+    """
+    stats = {
+        "total": counts.get("total", 0),
+        "open": counts.get("state:open", 0),
+        "closed": counts.get("state:closed", 0),
+        "by_status": {},
+        "by_channel": {},
+        "by_urgency": {},
+    }
+    daily: Dict[str, Dict[str, int]] = {}
+    for key, value in counts.items():
+        if not value:
+            continue
+        kind, _, rest = key.partition(":")
+        if kind == "status":
+            stats["by_status"][rest] = value
+        elif kind in ("channel", "urgency"):
+            name, _, state = rest.rpartition(":")
+            bucket = stats[f"by_{kind}"].setdefault(name, {"open": 0, "closed": 0})
+            bucket[state] = value
+        elif kind in ("created", "closed"):
+            daily.setdefault(rest, {})[kind] = value
+
+    today = datetime.utcnow().date()
+    stats["by_day"] = []
+    for offset in range(days - 1, -1, -1):
+        day = (today - timedelta(days=offset)).isoformat()
+        stats["by_day"].append({
+            "date": day,
+            "created": daily.get(day, {}).get("created", 0),
+            "closed": daily.get(day, {}).get("closed", 0),
+        })
+    return stats
+
+
+class TicketCounters:
+    """Compteurs maintenus incrémentalement à chaque écriture."""
+
+    def __init__(self, tickets: Iterable[dict] = ()):
+        self._keys: Dict[str, Tuple[str, ...]] = {}
+        self.counts: Counter = Counter()
+        for ticket in tickets:
+            self.put(ticket)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def put(self, ticket: dict) -> None:
+        """Compter (ou recompter) un ticket."""
+        keys = tuple(counter_keys(ticket))
+        previous = self._keys.get(ticket["ticket_id"])
+        if previous == keys:
+            return
+        if previous is not None:
+            self.counts.subtract(previous)
+        self.counts.update(keys)
+        self._keys[ticket["ticket_id"]] = keys
+
+    def remove(self, ticket_id: str) -> None:
+        """Retirer un ticket des compteurs."""
+        previous = self._keys.pop(ticket_id, None)
+        if previous is not None:
+            self.counts.subtract(previous)
+
+    def stats(self, days: int = 30) -> dict:
+        return stats_from_counters(self.counts, days)
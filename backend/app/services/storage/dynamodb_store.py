@@ -3,23 +3,179 @@ Implémentation DynamoDB du stockage des tickets.
 Production-ready avec retry logic, error handling, et indexes secondaires.
 """
 import asyncio
+import functools
+import heapq
+import itertools
 import logging
-from datetime import datetime
+import random
+import zlib
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 
 import boto3
 from boto3.dynamodb.conditions import Attr, Key
-from botocore.exceptions import ClientError, BotoCoreError
+from botocore.config import Config
+from botocore.exceptions import (
+    BotoCoreError,
+    ClientError,
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
 from fastapi import HTTPException
 
-from .interface import TicketStorage
+from .counters import COUNTER_FIELDS, TicketCounters, counter_delta, stats_from_counters
+from .dynamodb_types import NativeTypeDeserializer, install_native_types
+from .interface import (
+    OPEN_STATUSES,
+    StatusCondition,
+    TicketStorage,
+    check_expected_status,
+    expected_statuses,
+    resolution_seconds,
+)
+from .pagination import cursor_key, decode_cursor, encode_cursor, ticket_cursor
+from .retry import THROTTLING_CODES, TRANSIENT_CODES, AdaptiveRetry
+from .summary import SUMMARY_ANALYTICS_FIELDS, SUMMARY_FIELDS, message_preview
 
 logger = logging.getLogger(__name__)
 
+# Attributs de l'en-tête d'un ticket en disposition "item" (tout sauf
+# `messages`), lus via ProjectionExpression pour les listings et les
+# consultations d'en-tête : DynamoDB ne sait pas exclure un attribut, la
+# liste suit donc les champs écrits par les routers. Un champ libre d'un
+# PATCH absent de cette liste est stocké et rendu par `get_ticket`, mais pas
+# par les listings : l'ajouter ici pour qu'il y apparaisse. En disposition
+# "single_table", l'item d'en-tête est lu en entier (il n'a pas de messages).
+HEADER_ATTRIBUTES = (
+    "ticket_id",
+    "status",
+    "channel",
+    "created_at",
+    "updated_at",
+    "updated_by",
+    "closed_at",
+    "closed_by",
+    "resolution_duration",
+    "resolution_time_seconds",
+    "analytics",
+    "assigned_to",
+    "assigned_at",
+    "assigned_by",
+    "priority",
+    "notes",
+    "customer_name",
+    "initial_message",
+    "public",
+    "message_count",
+    "last_message",
+    "last_message_preview",
+)
+
+
+# Disposition "single_table" : clé (ticket_id, sk), un item d'en-tête
+# (sk = TICKET) et un item par message (sk = MSG#<timestamp>#<message_id>)
+LAYOUT_ITEM = "item"
+LAYOUT_SINGLE_TABLE = "single_table"
+TICKET_SK = "TICKET"
+MESSAGE_SK_PREFIX = "MSG#"
+
+# Index creux des files d'attente : ces attributs n'existent que sur les
+# en-têtes de tickets ouverts (assignés / avec une urgence), donc ni les
+# tickets fermés ni les items messages ne sont indexés
+OPEN_ASSIGNEE_INDEX = "open_assignee-created_at-index"
+OPEN_URGENCY_INDEX = "open_urgency-created_at-index"
+QUEUE_ATTRIBUTES = ("open_assignee", "open_urgency")
+
+# Statut shardé (option status_shards) : "nouveau#3", réparti sur N clés de
+# partition du GSI pour ne pas concentrer toutes les créations sur une seule
+STATUS_SHARD_INDEX = "status_shard-created_at-index"
+STATUS_SHARD_ATTRIBUTE = "status_shard"
+# Index « tous les tickets » (option created_shards) : "all#3" sur chaque
+# en-tête, pour lister sans filtre par created_at décroissant sans scan
+CREATED_SHARD_INDEX = "created_shard-created_at-index"
+CREATED_SHARD_ATTRIBUTE = "created_shard"
+ALL_TICKETS = "all"
+# Conditions de clé par shard d'un listing shardé et attribut de partition
+# de l'index (retirés des paramètres envoyés à DynamoDB, voir _page_request)
+_SHARDS = "_shards"
+_SHARD_ATTRIBUTE = "_shard_attribute"
+# Clés de la table et des index shardés, jamais modifiées par update_ticket
+INDEX_KEY_ATTRIBUTES = ("ticket_id", "sk", STATUS_SHARD_ATTRIBUTE, CREATED_SHARD_ATTRIBUTE)
+
+# Table des compteurs (option counters_table) : items "counters#<n>" portant
+# un attribut numérique par compteur (voir counters.counter_keys). Chaque
+# écriture incrémente un item tiré au hasard, pour limiter les conflits entre
+# transactions concurrentes ; la lecture additionne les N items.
+COUNTER_ITEM_PREFIX = "counters#"
+# Champs lus pour calculer les compteurs d'un ticket
+COUNTER_PROJECTION = {
+    "ProjectionExpression": "#cp_id, #cp_st, #cp_ch, #cp_ca, #cp_cl, #cp_an.#cp_ur",
+    "ExpressionAttributeNames": {
+        "#cp_id": "ticket_id",
+        "#cp_st": "status",
+        "#cp_ch": "channel",
+        "#cp_ca": "created_at",
+        "#cp_cl": "closed_at",
+        "#cp_an": "analytics",
+        "#cp_ur": "urgency",
+    },
+}
+# État d'un ticket pas encore lu (voir _counted_write)
+_UNREAD = object()
+
+_deserializer = NativeTypeDeserializer()
+
+# Erreurs réseau retentées par _retry_operation (botocore ne retente plus rien)
+TRANSIENT_BOTOCORE_ERRORS = (
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+
+
+def message_sort_key(message: dict) -> str:
+    """Clé de tri d'un message : ordre chronologique dans la partition du ticket."""
+    return f"{MESSAGE_SK_PREFIX}{message.get('timestamp', '')}#{message.get('message_id', '')}"
+
+
+def header_projection() -> Dict[str, Any]:
+    """Paramètres ProjectionExpression limités aux attributs d'en-tête."""
+    names = {f"#h{i}": attr for i, attr in enumerate(HEADER_ATTRIBUTES)}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+
+
+def summary_projection() -> Dict[str, Any]:
+    """
+    Paramètres ProjectionExpression d'un résumé : attributs de liste, aperçu
+    du dernier message et seulement quelques chemins de `analytics`.
+    """
+    names = {f"#s{i}": attr for i, attr in enumerate(SUMMARY_FIELDS)}
+    paths = list(names)
+    names["#an"] = "analytics"
+    for i, attr in enumerate(SUMMARY_ANALYTICS_FIELDS):
+        names[f"#a{i}"] = attr
+        paths.append(f"#an.#a{i}")
+    return {
+        "ProjectionExpression": ", ".join(paths),
+        "ExpressionAttributeNames": names,
+    }
+
 
 def decimal_to_float(obj: Any) -> Any:
-    """Convertir les Decimal de DynamoDB en float/int pour JSON."""
+    """
+    Convertir les Decimal de DynamoDB en float/int pour JSON.
+
+    Inutile pour les items lus par DynamoDBStorage (voir dynamodb_types) ;
+    conservé pour les données obtenues par un client boto3 standard.
+    """
     if isinstance(obj, Decimal):
         return int(obj) if obj % 1 == 0 else float(obj)
     elif isinstance(obj, dict):
@@ -30,7 +186,7 @@ def decimal_to_float(obj: Any) -> Any:
 
 
 def float_to_decimal(obj: Any) -> Any:
-    """Convertir les float/int en Decimal pour DynamoDB."""
+    """Convertir les float/int en Decimal pour un client boto3 standard."""
     if isinstance(obj, float):
         return Decimal(str(obj))
     elif isinstance(obj, int) and not isinstance(obj, bool):
@@ -42,6 +198,47 @@ def float_to_decimal(obj: Any) -> Any:
     return obj
 
 
+def with_date_range(key_condition, date_from: Optional[str], date_to: Optional[str]):
+    """Ajouter les bornes de date (clé de tri `created_at` des GSI) à une condition de clé."""
+    created_at = Key("created_at")
+    if date_from and date_to:
+        return key_condition & created_at.between(date_from, date_to)
+    if date_from:
+        return key_condition & created_at.gte(date_from)
+    if date_to:
+        return key_condition & created_at.lte(date_to)
+    return key_condition
+
+
+def queue_attributes(ticket: dict) -> Dict[str, str]:
+    """Clés des index de file d'attente d'un ticket (vide s'il est fermé)."""
+    if ticket.get("status") not in OPEN_STATUSES:
+        return {}
+    attributes = {}
+    if isinstance(ticket.get("assigned_to"), str) and ticket["assigned_to"]:
+        attributes["open_assignee"] = ticket["assigned_to"]
+    urgency = (ticket.get("analytics") or {}).get("urgency")
+    if isinstance(urgency, str) and urgency:
+        attributes["open_urgency"] = urgency
+    return attributes
+
+
+def status_shard(status: str, ticket_id: str, shards: int) -> str:
+    """Clé shardée d'un statut : déterministe, calculable sans relire le ticket."""
+    return f"{status}#{zlib.crc32(ticket_id.encode('utf-8')) % shards}"
+
+
+def ticket_item(ticket: dict) -> dict:
+    """Item DynamoDB d'un ticket (champs dénormalisés des messages et des files)."""
+    item = {k: v for k, v in ticket.items() if k not in QUEUE_ATTRIBUTES}
+    messages = item.get("messages") or []
+    item["message_count"] = len(messages)
+    item["last_message"] = messages[-1] if messages else None
+    item["last_message_preview"] = message_preview(item["last_message"])
+    item.update(queue_attributes(item))
+    return item
+
+
 class DynamoDBStorage(TicketStorage):
     """
     Stockage des tickets dans DynamoDB.
@@ -50,6 +247,21 @@ class DynamoDBStorage(TicketStorage):
     - Primary Key: ticket_id (String)
     - GSI1: status-created_at-index (pour filtrer par statut)
     - GSI2: channel-created_at-index (pour filtrer par canal)
+    - GSI3/GSI4 (creux) : open_assignee-created_at-index et
+      open_urgency-created_at-index, limités aux tickets ouverts, pour les
+      files « mes tickets » et « urgents » (voir `queue_attributes`)
+    - GSI5 (option `status_shards`) : status_shard-created_at-index, statut
+      réparti sur N clés ("nouveau#0".."nouveau#N-1") ; les listings par
+      statut interrogent tous les shards et fusionnent par created_at
+    - GSI6 (option `created_shards`) : created_shard-created_at-index, tous
+      les en-têtes répartis sur N clés ("all#0".."all#N-1") ; les listings
+      sans filtre indexé sont servis par date décroissante comme un statut
+      shardé. Sans cet index, une page non filtrée relit toute la table
+
+    Avec `counters_table`, les totaux du dashboard (voir counters.py) sont
+    maintenus dans une table dédiée, dans la même transaction
+    (TransactWriteItems) que la création, le changement de statut ou la
+    suppression du ticket.
     
     Attributes:
     - ticket_id: UUID unique
@@ -60,26 +272,85 @@ class DynamoDBStorage(TicketStorage):
     - resolution_duration: int (secondes, nullable)
     - analytics: dict (sentiment, category, urgency, summary)
     - messages: list of messages
+    - message_count / last_message / last_message_preview: dénormalisés à
+      l'écriture, pour que les lectures d'en-tête et de résumé n'aient jamais
+      à charger `messages`
+
+    Avec `layout="single_table"`, la table a une clé de tri `sk` : le ticket
+    est un item d'en-tête (sk = "TICKET") et chaque message un item séparé
+    (sk = "MSG#<timestamp>#<message_id>"). Ajouter un message est un petit
+    put, le détail d'un ticket une seule Query sur sa partition, et la
+    taille d'une conversation n'est plus bornée par la limite de 400 Ko.
     """
 
     def __init__(
         self,
         table_name: str,
         region: str = "eu-west-1",
-        max_retries: int = 3,
+        max_retries: int = 5,
+        scan_segments: int = 4,
+        scan_workers: int = 4,
+        max_workers: int = 32,
+        max_pool_connections: Optional[int] = None,
+        layout: str = LAYOUT_ITEM,
+        retry: Optional[AdaptiveRetry] = None,
+        status_shards: int = 0,
+        created_shards: int = 0,
+        counters_table: Optional[str] = None,
+        counter_shards: int = 4,
     ):
+        if layout not in (LAYOUT_ITEM, LAYOUT_SINGLE_TABLE):
+            raise ValueError(f"Unknown DynamoDB layout: {layout}")
         self.table_name = table_name
+        self.single_table = layout == LAYOUT_SINGLE_TABLE
         self.region = region
-        self.max_retries = max_retries
+        # Compteurs agrégés (table dédiée, None = non maintenus)
+        self.counters_table_name = counters_table
+        self.counters_table = None
+        self.counter_shards = min(100, max(1, counter_shards))
+        # Shards du statut (0 = GSI status-created_at-index classique)
+        self.status_shards = max(0, status_shards)
+        # Shards de l'index « tous les tickets » (0 = listings non filtrés par scan)
+        self.created_shards = max(0, created_shards)
+        # Retry et limitation de débit (max_retries = essais par appel)
+        self.retry = retry or AdaptiveRetry(max_attempts=max_retries)
+        # Scan parallèle (listings sans filtre indexé, exports)
+        self.scan_segments = max(1, scan_segments)
+        self.scan_workers = max(1, scan_workers)
+
+        # Pool de threads dédié : les appels DynamoDB ne font pas la queue
+        # derrière les I/O fichiers et autres tâches de l'exécuteur par défaut
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="dynamodb"
+        )
+        # Une connexion HTTP par thread au minimum, gardées ouvertes
+        self.client_config = Config(
+            max_pool_connections=max_pool_connections or self.max_workers,
+            tcp_keepalive=True,
+            # Pas de retry caché dans botocore : le throttling doit remonter
+            # jusqu'à _retry_operation pour ralentir tous les appels
+            retries={"mode": "standard", "total_max_attempts": 1},
+        )
         
         try:
-            # Initialiser le client DynamoDB
-            self.dynamodb = boto3.resource("dynamodb", region_name=region)
+            # Initialiser le client DynamoDB (partagé par la ressource et la table)
+            self.dynamodb = boto3.resource("dynamodb", region_name=region, config=self.client_config)
+            # Nombres lus en int/float et float acceptés en écriture, sans
+            # repasser sur chaque item après coup
+            install_native_types(self.dynamodb)
+            self.client = self.dynamodb.meta.client
             self.table = self.dynamodb.Table(table_name)
             
             # Vérifier que la table existe
             self.table.load()
-            logger.info(f"DynamoDBStorage initialized: table={table_name}, region={region}")
+            self._check_created_index()
+            if counters_table:
+                self.counters_table = self.dynamodb.Table(counters_table)
+                self.counters_table.load()
+            logger.info(
+                f"DynamoDBStorage initialized: table={table_name}, region={region}, layout={layout}"
+            )
             
         except ClientError as e:
             error_code = e.response["Error"]["Code"]
@@ -102,52 +373,411 @@ class DynamoDBStorage(TicketStorage):
                 detail=f"Failed to initialize DynamoDB storage: {str(e)}"
             )
 
+    def _check_created_index(self) -> None:
+        """
+        Les listings non filtrés (vue par défaut du dashboard) passent par
+        l'index « tous les tickets » : refuser de démarrer s'il manque, et
+        signaler bruyamment le repli sur un scan complet s'il est désactivé.
+        """
+        if not self.created_shards:
+            logger.warning(
+                "DYNAMODB_CREATED_SHARDS=0: every unfiltered ticket listing page "
+                f"scans the whole table '{self.table_name}'; deploy {CREATED_SHARD_INDEX} "
+                "and enable it (see docs/MIGRATION_DYNAMODB.md)"
+            )
+            return
+        indexes = {index["IndexName"] for index in self.table.global_secondary_indexes or []}
+        if CREATED_SHARD_INDEX not in indexes:
+            raise ValueError(
+                f"DynamoDB table '{self.table_name}' has no {CREATED_SHARD_INDEX} "
+                "(deploy the template with CreatedShards, or set DYNAMODB_CREATED_SHARDS=0)"
+            )
+
     async def _retry_operation(self, operation, *args, **kwargs):
-        """Exécuter une opération avec retry logic."""
-        last_error = None
-        
-        for attempt in range(self.max_retries):
+        """
+        Exécuter une opération dans le pool dédié, avec retry adaptatif
+        (voir `AdaptiveRetry`) : chaque envoi attend un jeton du limiteur
+        partagé, le throttling et les erreurs transitoires sont retentés avec
+        un backoff « full jitter » dans la limite des essais et du budget.
+        """
+        retry = self.retry
+        retry.counters["calls"] += 1
+        attempt = 0
+        while True:
+            await retry.acquire()
+            throttled = False
             try:
-                # Exécuter l'opération dans un thread pour ne pas bloquer
-                result = await asyncio.to_thread(operation, *args, **kwargs)
-                return result
+                # Exécuter l'opération dans le pool dédié pour ne pas bloquer
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, functools.partial(operation, *args, **kwargs)
+                )
             except ClientError as e:
                 error_code = e.response["Error"]["Code"]
-                last_error = e
-                
+
                 # Erreurs non-retriables
-                if error_code in ["ResourceNotFoundException", "ValidationException"]:
+                if error_code in [
+                    "ResourceNotFoundException",
+                    "ValidationException",
+                    "ConditionalCheckFailedException",
+                    "TransactionCanceledException",
+                ]:
                     raise
-                
-                # Erreurs retriables (throttling, etc.)
-                if error_code in ["ProvisionedThroughputExceededException", "ThrottlingException"]:
-                    wait_time = (2 ** attempt) * 0.1  # Exponential backoff
-                    logger.warning(
-                        f"DynamoDB throttled, retrying in {wait_time}s (attempt {attempt + 1}/{self.max_retries})"
-                    )
-                    await asyncio.sleep(wait_time)
-                    continue
-                
-                # Autres erreurs
-                logger.error(f"DynamoDB error: {error_code} - {e}")
-                raise HTTPException(status_code=500, detail=f"Database error: {error_code}")
-            
+
+                if error_code in THROTTLING_CODES:
+                    throttled = True
+                    retry.on_throttle()
+                elif error_code not in TRANSIENT_CODES:
+                    logger.error(f"DynamoDB error: {error_code} - {e}")
+                    raise HTTPException(status_code=500, detail=f"Database error: {error_code}")
+                last_error = error_code
+
             except BotoCoreError as e:
-                last_error = e
-                logger.error(f"BotoCore error: {e}")
-                raise HTTPException(status_code=500, detail="Database connection error")
-        
-        # Si on arrive ici, toutes les tentatives ont échoué
-        logger.error(f"All retry attempts failed: {last_error}")
-        raise HTTPException(status_code=500, detail="Database operation failed after retries")
+                if not isinstance(e, TRANSIENT_BOTOCORE_ERRORS):
+                    logger.error(f"BotoCore error: {e}")
+                    raise HTTPException(status_code=500, detail="Database connection error")
+                last_error = type(e).__name__
+
+            else:
+                retry.on_success()
+                return result
+
+            attempt += 1
+            if not retry.take_retry(attempt):
+                retry.counters["failed"] += 1
+                logger.error(f"DynamoDB {last_error}: giving up after {attempt} attempt(s)")
+                if throttled:
+                    raise HTTPException(
+                        status_code=503, detail="Base de données surchargée, réessayez"
+                    )
+                raise HTTPException(status_code=500, detail="Database operation failed after retries")
+            wait_time = retry.backoff(attempt)
+            logger.warning(
+                f"DynamoDB {last_error}, retrying in {wait_time:.3f}s "
+                f"(attempt {attempt + 1}/{retry.max_attempts})"
+            )
+            await asyncio.sleep(wait_time)
+
+    def retry_stats(self) -> Dict[str, Any]:
+        """Compteurs du retry adaptatif (appels, retries, throttling, débit limite)."""
+        return self.retry.stats()
+
+    # ------------------------------------------------------------------
+    # Disposition des items
+    # ------------------------------------------------------------------
+
+    def _key(self, ticket_id: str) -> Dict[str, str]:
+        """Clé de l'item d'en-tête d'un ticket."""
+        if self.single_table:
+            return {"ticket_id": ticket_id, "sk": TICKET_SK}
+        return {"ticket_id": ticket_id}
+
+    @staticmethod
+    def _from_item(item: dict) -> dict:
+        """
+        Item DynamoDB -> ticket ou message (sans la clé de tri technique).
+
+        Les nombres sont déjà des int/float (voir dynamodb_types) : l'item lu
+        est adapté sur place, sans copie.
+        """
+        item.pop("sk", None)
+        item.pop(STATUS_SHARD_ATTRIBUTE, None)
+        item.pop(CREATED_SHARD_ATTRIBUTE, None)
+        for attribute in QUEUE_ATTRIBUTES:
+            item.pop(attribute, None)
+        if item.get("closed_at") and item.get("created_at") and item.get("resolution_duration") is None:
+            # Dérivée à la lecture : la fermeture n'écrit que closed_at
+            item["resolution_duration"] = resolution_seconds(item["created_at"], item["closed_at"])
+        return item
+
+    def _header_params(self) -> Dict[str, Any]:
+        """Projection d'une lecture d'en-tête (aucune en single_table : pas de messages)."""
+        return {} if self.single_table else header_projection()
+
+    def _header_item(self, ticket: dict) -> dict:
+        """Item d'en-tête (single_table) ou item complet (disposition item)."""
+        item = ticket_item(ticket)
+        item.pop(STATUS_SHARD_ATTRIBUTE, None)
+        item.pop(CREATED_SHARD_ATTRIBUTE, None)
+        if self.status_shards and item.get("status"):
+            item[STATUS_SHARD_ATTRIBUTE] = status_shard(
+                item["status"], item["ticket_id"], self.status_shards
+            )
+        if self.created_shards:
+            item[CREATED_SHARD_ATTRIBUTE] = status_shard(
+                ALL_TICKETS, item["ticket_id"], self.created_shards
+            )
+        if self.single_table:
+            item.pop("messages", None)
+            item["sk"] = TICKET_SK
+        return item
+
+    @staticmethod
+    def _message_item(ticket_id: str, message: dict) -> dict:
+        return {**message, "ticket_id": ticket_id, "sk": message_sort_key(message)}
+
+    async def _batch_write(self, requests: List[dict]) -> None:
+        """BatchWriteItem par lots de 25 (PutRequest/DeleteRequest)."""
+        for i in range(0, len(requests), 25):
+            await self._retry_unprocessed(
+                self.dynamodb.batch_write_item,
+                {self.table_name: requests[i:i + 25]},
+                "UnprocessedItems",
+            )
+
+    async def _query_partition(self, ticket_id: str, messages_only: bool = False, **params) -> List[dict]:
+        """Lire toute la partition d'un ticket (en-tête puis messages, ou messages seuls)."""
+        key_condition = Key("ticket_id").eq(ticket_id)
+        if messages_only:
+            key_condition = key_condition & Key("sk").begins_with(MESSAGE_SK_PREFIX)
+        items: List[dict] = []
+        async for page in self._iter_pages(
+            self.table.query, {"KeyConditionExpression": key_condition, **params}
+        ):
+            items.extend(page)
+        return items
+
+    async def _read_messages(self, ticket_id: str) -> List[dict]:
+        """Messages d'un ticket, dans l'ordre chronologique (single_table)."""
+        messages = []
+        for item in await self._query_partition(ticket_id, messages_only=True):
+            message = self._from_item(item)
+            message.pop("ticket_id", None)
+            messages.append(message)
+        return messages
+
+    async def _attach_messages(self, tickets: List[dict]) -> List[dict]:
+        """Charger les messages d'en-têtes (single_table), une Query par ticket en parallèle."""
+        if not self.single_table:
+            return tickets
+        workers = asyncio.Semaphore(self.scan_workers)
+
+        async def attach(ticket: dict) -> None:
+            async with workers:
+                ticket["messages"] = await self._read_messages(ticket["ticket_id"])
+            ticket.pop("message_count", None)
+            ticket.pop("last_message", None)
+            ticket.pop("last_message_preview", None)
+
+        await asyncio.gather(*(attach(ticket) for ticket in tickets))
+        return tickets
+
+    async def _sync_messages(self, ticket_id: str, messages: List[dict]) -> None:
+        """
+        Aligner les items messages d'un ticket sur une liste (single_table) :
+        seuls les messages absents sont écrits et les messages retirés supprimés.
+        """
+        existing = {
+            item["sk"]
+            for item in await self._query_partition(
+                ticket_id, messages_only=True, ProjectionExpression="sk"
+            )
+        }
+        wanted = {message_sort_key(m): m for m in messages}
+        requests = [
+            {"PutRequest": {"Item": self._message_item(ticket_id, m)}}
+            for sk, m in wanted.items()
+            if sk not in existing
+        ]
+        requests += [
+            {"DeleteRequest": {"Key": {"ticket_id": ticket_id, "sk": sk}}}
+            for sk in existing - wanted.keys()
+        ]
+        await self._batch_write(requests)
+
+    # ------------------------------------------------------------------
+    # Compteurs agrégés
+    # ------------------------------------------------------------------
+
+    async def _counter_state(self, ticket_id: str) -> Optional[dict]:
+        """Champs dont dépendent les compteurs (lecture cohérente), None si absent."""
+        response = await self._retry_operation(
+            self.table.get_item,
+            Key=self._key(ticket_id),
+            ConsistentRead=True,
+            **self._page_request(COUNTER_PROJECTION),
+        )
+        return response.get("Item")
+
+    async def _counter_states(self, ticket_ids: List[str]) -> Dict[str, dict]:
+        """Champs des compteurs de plusieurs tickets (BatchGetItem, lots de 100)."""
+        states: Dict[str, dict] = {}
+        for i in range(0, len(ticket_ids), 100):
+            keys_and_attributes = {
+                "Keys": [self._key(t) for t in ticket_ids[i:i + 100]],
+                "ConsistentRead": True,
+                **self._page_request(COUNTER_PROJECTION),
+            }
+            for item in await self._retry_unprocessed(
+                self.dynamodb.batch_get_item,
+                {self.table_name: keys_and_attributes},
+                "UnprocessedKeys",
+            ):
+                states[item["ticket_id"]] = item
+        return states
+
+    @staticmethod
+    def _state_condition(state: Optional[dict]) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """Condition « le ticket est toujours dans l'état `state` » (None = absent)."""
+        if state is None:
+            return "attribute_not_exists(ticket_id)", {}, {}
+        names = dict(COUNTER_PROJECTION["ExpressionAttributeNames"])
+        names.pop("#cp_id")
+        values: Dict[str, Any] = {}
+        clauses = ["attribute_exists(ticket_id)"]
+        for path, value in (
+            ("#cp_st", state.get("status")),
+            ("#cp_ch", state.get("channel")),
+            ("#cp_ca", state.get("created_at")),
+            ("#cp_cl", state.get("closed_at")),
+            ("#cp_an.#cp_ur", (state.get("analytics") or {}).get("urgency")),
+        ):
+            if value is None:
+                # Absent ou stocké à null
+                values[":cp_null"] = "NULL"
+                clauses.append(f"(attribute_not_exists({path}) OR attribute_type({path}, :cp_null))")
+            else:
+                placeholder = f":cp{len(values)}"
+                values[placeholder] = value
+                clauses.append(f"{path} = {placeholder}")
+        return " AND ".join(clauses), names, values
+
+    def _counter_update(self, delta: Dict[str, int]) -> Dict[str, Any]:
+        """Incréments (ADD) des compteurs sur un item tiré parmi les shards."""
+        return {
+            "TableName": self.counters_table_name,
+            "Key": {"counter_id": f"{COUNTER_ITEM_PREFIX}{random.randrange(self.counter_shards)}"},
+            "UpdateExpression": "ADD " + ", ".join(f"#c{i} :c{i}" for i in range(len(delta))),
+            "ExpressionAttributeNames": {f"#c{i}": key for i, key in enumerate(delta)},
+            "ExpressionAttributeValues": {f":c{i}": value for i, value in enumerate(delta.values())},
+        }
+
+    async def _counted_write(self, ticket_id: str, build, state: Any = _UNREAD) -> None:
+        """
+        Écrire un ticket et ses compteurs dans une même transaction.
+
+        `build(before)` retourne `(type, opération, after)` : un "Put",
+        "Update" ou "Delete" du ticket et son état après écriture (None s'il
+        est supprimé) ; il peut lever une 404/409 selon `before`. L'opération
+        est conditionnée à l'état lu (concurrence optimiste) : si le ticket a
+        changé entre-temps, il est relu et l'écriture rejouée. `state=None`
+        suppose le ticket absent (création) sans le lire.
+        """
+        for attempt in range(self.retry.max_attempts):
+            if state is _UNREAD:
+                state = await self._counter_state(ticket_id)
+            kind, operation, after = build(state)
+            condition, names, values = self._state_condition(state)
+            operation = {**operation, "TableName": self.table_name, "ConditionExpression": condition}
+            if names:
+                operation["ExpressionAttributeNames"] = {
+                    **operation.get("ExpressionAttributeNames", {}), **names
+                }
+            if values:
+                operation["ExpressionAttributeValues"] = {
+                    **operation.get("ExpressionAttributeValues", {}), **values
+                }
+            transact_items = [{kind: operation}]
+            delta = counter_delta(state, after)
+            if delta:
+                transact_items.append({"Update": self._counter_update(delta)})
+            try:
+                await self._retry_operation(
+                    self.client.transact_write_items, TransactItems=transact_items
+                )
+                return
+            except ClientError as e:
+                reasons = [r.get("Code") for r in e.response.get("CancellationReasons", [])]
+                if reasons and reasons[0] == "ConditionalCheckFailed":
+                    # Ticket modifié entre la lecture et l'écriture : relire
+                    state = _UNREAD
+                elif "TransactionConflict" in reasons:
+                    # Item compteur pris par une autre transaction
+                    await asyncio.sleep(self.retry.backoff(attempt + 1))
+                else:
+                    raise
+        raise HTTPException(status_code=409, detail="Ticket modifié simultanément, réessayez")
+
+    async def _add_counters(self, delta: Dict[str, int]) -> None:
+        """Incrémenter les compteurs hors transaction (imports en masse)."""
+        delta = {key: value for key, value in delta.items() if value}
+        if not delta:
+            return
+        update = self._counter_update(delta)
+        update.pop("TableName")
+        await self._retry_operation(self.counters_table.update_item, **update)
+
+    async def get_ticket_stats(self, days: int = 30) -> dict:
+        """Totaux du dashboard : somme des items compteurs (un BatchGetItem)."""
+        if self.counters_table is None:
+            return await super().get_ticket_stats(days)
+        try:
+            items = await self._retry_unprocessed(
+                self.dynamodb.batch_get_item,
+                {
+                    self.counters_table_name: {
+                        "Keys": [
+                            {"counter_id": f"{COUNTER_ITEM_PREFIX}{n}"}
+                            for n in range(self.counter_shards)
+                        ]
+                    }
+                },
+                "UnprocessedKeys",
+            )
+            counts: Counter = Counter()
+            for item in items:
+                item.pop("counter_id", None)
+                counts.update(item)
+            return stats_from_counters(counts, days)
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception(f"Error reading ticket counters from DynamoDB: {e}")
+            raise HTTPException(status_code=500, detail="Failed to read ticket stats")
+
+    async def rebuild_counters(self) -> int:
+        """
+        Recalculer les compteurs à partir de tous les tickets (activation,
+        réparation) ; retourne le nombre de tickets comptés. Les écritures
+        concurrentes au recalcul peuvent être perdues : à lancer hors trafic.
+        """
+        if self.counters_table is None:
+            return 0
+        params = dict(COUNTER_PROJECTION)
+        if self.single_table:
+            params["FilterExpression"] = Attr("sk").eq(TICKET_SK)
+        counters = TicketCounters()
+        async for page in self._parallel_scan_pages(params):
+            for item in page:
+                counters.put(item)
+        # Tout sur le premier item, les autres shards remis à zéro
+        counts = {key: value for key, value in counters.counts.items() if value}
+        await self._retry_operation(
+            self.counters_table.put_item, Item={"counter_id": f"{COUNTER_ITEM_PREFIX}0", **counts}
+        )
+        for n in range(1, self.counter_shards):
+            await self._retry_operation(
+                self.counters_table.delete_item, Key={"counter_id": f"{COUNTER_ITEM_PREFIX}{n}"}
+            )
+        return len(counters)
+
+    # ------------------------------------------------------------------
+    # Opérations
+    # ------------------------------------------------------------------
 
     async def save_ticket(self, ticket: dict) -> None:
         """Sauvegarder un ticket dans DynamoDB."""
         try:
-            # Convertir les float en Decimal pour DynamoDB
-            item = float_to_decimal(ticket)
-            
-            await self._retry_operation(self.table.put_item, Item=item)
+            if self.single_table:
+                await self._sync_messages(ticket["ticket_id"], ticket.get("messages") or [])
+            item = self._header_item(ticket)
+            if self.counters_table is not None:
+                # Création supposée ; ticket existant : relu puis remplacé
+                await self._counted_write(
+                    ticket["ticket_id"], lambda before: ("Put", {"Item": item}, ticket), state=None
+                )
+            else:
+                await self._retry_operation(self.table.put_item, Item=item)
             logger.info(f"Ticket saved to DynamoDB: {ticket['ticket_id']}")
             
         except HTTPException:
@@ -156,19 +786,128 @@ class DynamoDBStorage(TicketStorage):
             logger.exception(f"Error saving ticket to DynamoDB: {e}")
             raise HTTPException(status_code=500, detail="Failed to save ticket")
 
-    async def get_ticket(self, ticket_id: str) -> dict:
-        """Récupérer un ticket depuis DynamoDB."""
+    async def _retry_unprocessed(self, operation, request_items: dict, unprocessed_key: str) -> List[dict]:
+        """
+        Exécuter un appel batch et rejouer ses éléments non traités
+        (`UnprocessedItems`/`UnprocessedKeys`), traités comme du throttling.
+
+        Retourne les éléments lus (`Responses`) pour BatchGetItem.
+        """
+        items: List[dict] = []
+        for attempt in range(self.retry.max_attempts + 3):
+            response = await self._retry_operation(operation, RequestItems=request_items)
+            for table_items in response.get("Responses", {}).values():
+                items.extend(table_items)
+            request_items = response.get(unprocessed_key) or {}
+            if not request_items:
+                return items
+            # Éléments non traités = capacité dépassée : ralentir tous les appels
+            self.retry.on_throttle()
+            wait_time = self.retry.backoff(attempt + 1)
+            logger.warning(
+                f"DynamoDB batch partially processed, retrying in {wait_time:.3f}s "
+                f"(attempt {attempt + 1})"
+            )
+            await asyncio.sleep(wait_time)
+        self.retry.counters["failed"] += 1
+        logger.error("DynamoDB batch still unprocessed after retries")
+        raise HTTPException(status_code=503, detail="Base de données surchargée, réessayez")
+
+    async def save_tickets(self, tickets: Iterable[dict]) -> int:
+        """
+        Sauvegarder plusieurs tickets (BatchWriteItem, lots de 25).
+
+        En single_table, les items messages sont écrits avec l'en-tête
+        (import en masse : les messages déjà présents ne sont pas purgés).
+        Les compteurs sont ajustés après le lot, hors transaction.
+        """
+        # Une même clé ne peut apparaître deux fois dans un lot : garder la dernière version
+        tickets = list({t["ticket_id"]: t for t in tickets}.values())
+        try:
+            before: Dict[str, dict] = {}
+            if self.counters_table is not None:
+                before = await self._counter_states([t["ticket_id"] for t in tickets])
+            requests = []
+            for ticket in tickets:
+                requests.append({"PutRequest": {"Item": self._header_item(ticket)}})
+                if self.single_table:
+                    messages = {message_sort_key(m): m for m in ticket.get("messages") or []}
+                    requests.extend(
+                        {"PutRequest": {"Item": self._message_item(ticket["ticket_id"], m)}}
+                        for m in messages.values()
+                    )
+            await self._batch_write(requests)
+            if self.counters_table is not None:
+                delta: Counter = Counter()
+                for ticket in tickets:
+                    delta.update(counter_delta(before.get(ticket["ticket_id"]), ticket))
+                await self._add_counters(delta)
+            logger.info(f"{len(tickets)} tickets saved to DynamoDB")
+            return len(tickets)
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception(f"Error batch saving tickets to DynamoDB: {e}")
+            raise HTTPException(status_code=500, detail="Failed to save tickets")
+
+    async def get_tickets(
+        self, ticket_ids: Iterable[str], include_messages: bool = True
+    ) -> List[dict]:
+        """Récupérer plusieurs tickets (BatchGetItem, lots de 100)."""
+        ticket_ids = list(dict.fromkeys(ticket_ids))
         try:
+            found: Dict[str, dict] = {}
+            for i in range(0, len(ticket_ids), 100):
+                keys_and_attributes = {"Keys": [self._key(t) for t in ticket_ids[i:i + 100]]}
+                if not include_messages:
+                    keys_and_attributes.update(self._header_params())
+                items = await self._retry_unprocessed(
+                    self.dynamodb.batch_get_item,
+                    {self.table_name: keys_and_attributes},
+                    "UnprocessedKeys",
+                )
+                for item in items:
+                    found[item["ticket_id"]] = self._from_item(item)
+            # BatchGetItem ne garantit aucun ordre : suivre celui des IDs demandés
+            tickets = [found[t] for t in ticket_ids if t in found]
+            return await self._attach_messages(tickets) if include_messages else tickets
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception(f"Error batch getting tickets from DynamoDB: {e}")
+            raise HTTPException(status_code=500, detail="Failed to retrieve tickets")
+
+    async def get_ticket(self, ticket_id: str, include_messages: bool = True) -> dict:
+        """Récupérer un ticket depuis DynamoDB (en-tête seul si `include_messages` est faux)."""
+        try:
+            if self.single_table and include_messages:
+                # Une seule Query : messages (MSG#...) puis en-tête (TICKET)
+                items = await self._query_partition(ticket_id)
+                if not items or items[-1]["sk"] != TICKET_SK:
+                    raise HTTPException(status_code=404, detail="Ticket non trouvé")
+                ticket = self._from_item(items[-1])
+                ticket.pop("message_count", None)
+                ticket.pop("last_message", None)
+                ticket.pop("last_message_preview", None)
+                ticket["messages"] = []
+                for item in items[:-1]:
+                    message = self._from_item(item)
+                    message.pop("ticket_id", None)
+                    ticket["messages"].append(message)
+                return ticket
+
             response = await self._retry_operation(
                 self.table.get_item,
-                Key={"ticket_id": ticket_id}
+                Key=self._key(ticket_id),
+                **({} if include_messages else self._header_params())
             )
             
             if "Item" not in response:
                 raise HTTPException(status_code=404, detail="Ticket non trouvé")
             
-            # Convertir les Decimal en float/int
-            ticket = decimal_to_float(response["Item"])
+            ticket = self._from_item(response["Item"])
             return ticket
             
         except HTTPException:
@@ -177,125 +916,691 @@ class DynamoDBStorage(TicketStorage):
             logger.exception(f"Error getting ticket from DynamoDB: {e}")
             raise HTTPException(status_code=500, detail="Failed to retrieve ticket")
 
+    def _list_request(
+        self,
+        status: Optional[str],
+        channel: Optional[str],
+        date_from: Optional[str],
+        date_to: Optional[str],
+        assigned_to: Optional[str],
+        urgency: Optional[str],
+        include_messages: bool,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Choisir l'opération (query sur un GSI ou scan) et ses paramètres.
+
+        Sur un GSI, les bornes de date font partie de la condition de clé
+        (`created_at` est la clé de tri) : seuls les éléments de la fenêtre
+        sont lus. Les autres filtres sont évalués côté DynamoDB. Sans les
+        messages, seuls les attributs de `projection` (l'en-tête par défaut)
+        sont retournés.
+        """
+        # Index le plus sélectif : (nom, attribut de partition, valeur, filtre couvert).
+        # Les files d'un agent ou d'une urgence passent par les index creux :
+        # les lectures sont proportionnelles à la file, pas à l'historique
+        index = None
+        if assigned_to and status in OPEN_STATUSES:
+            index = (OPEN_ASSIGNEE_INDEX, "open_assignee", assigned_to, "assigned_to")
+        elif urgency and status in OPEN_STATUSES:
+            index = (OPEN_URGENCY_INDEX, "open_urgency", urgency, "urgency")
+        elif status:
+            index = ("status-created_at-index", "status", status, "status")
+        elif channel:
+            index = ("channel-created_at-index", "channel", channel, "channel")
+
+        # Filtres non couverts par l'index choisi, évalués côté DynamoDB
+        conditions = {
+            "status": status and Attr("status").eq(status),
+            "channel": channel and Attr("channel").eq(channel),
+            "assigned_to": assigned_to and Attr("assigned_to").eq(assigned_to),
+            "urgency": urgency and Attr("analytics.urgency").eq(urgency),
+        }
+        filters = [
+            condition for name, condition in conditions.items()
+            if condition and not (index and index[3] == name)
+        ]
+        if index is None and not self.created_shards:
+            if self.single_table:
+                # Le scan parcourt aussi les items messages : ne garder que les en-têtes
+                filters.append(Attr("sk").eq(TICKET_SK))
+            if date_from:
+                filters.append(Attr("created_at").gte(date_from))
+            if date_to:
+                filters.append(Attr("created_at").lte(date_to))
+        params = {} if include_messages else (projection or self._header_params())
+        if filters:
+            filter_expression = filters[0]
+            for condition in filters[1:]:
+                filter_expression = filter_expression & condition
+            params["FilterExpression"] = filter_expression
+
+        if index is None:
+            if self.created_shards:
+                # Index creux des en-têtes : ordre par created_at, sans scan
+                return self.table.query, self._sharded_query(
+                    params, CREATED_SHARD_INDEX, CREATED_SHARD_ATTRIBUTE,
+                    ALL_TICKETS, self.created_shards, date_from, date_to,
+                )
+            # Sans filtre indexable, faire un scan (moins performant mais nécessaire)
+            return self.table.scan, params
+
+        index_name, key_attribute, key_value, _ = index
+        if key_attribute == "status" and self.status_shards:
+            return self.table.query, self._sharded_query(
+                params, STATUS_SHARD_INDEX, STATUS_SHARD_ATTRIBUTE,
+                status, self.status_shards, date_from, date_to,
+            )
+
+        params["IndexName"] = index_name
+        params["KeyConditionExpression"] = with_date_range(
+            Key(key_attribute).eq(key_value), date_from, date_to
+        )
+        params["ScanIndexForward"] = False  # Tri décroissant par created_at
+        return self.table.query, params
+
+    @staticmethod
+    def _sharded_query(
+        params: Dict[str, Any],
+        index_name: str,
+        attribute: str,
+        prefix: str,
+        shards: int,
+        date_from: Optional[str],
+        date_to: Optional[str],
+    ) -> Dict[str, Any]:
+        """Scatter-gather : une condition de clé par shard, fusion par created_at."""
+        params["IndexName"] = index_name
+        params["ScanIndexForward"] = False
+        params[_SHARD_ATTRIBUTE] = attribute
+        params[_SHARDS] = [
+            (shard, with_date_range(Key(attribute).eq(shard), date_from, date_to))
+            for shard in (f"{prefix}#{n}" for n in range(shards))
+        ]
+        return params
+
+    @staticmethod
+    def _page_request(
+        params: Dict[str, Any],
+        limit: Optional[int] = None,
+        start_key: Optional[dict] = None,
+        **extra: Any,
+    ) -> Dict[str, Any]:
+        """Paramètres d'un appel de page (copie : boto3 les modifie sur place)."""
+        request = {k: v for k, v in params.items() if k not in (_SHARDS, _SHARD_ATTRIBUTE)}
+        request.update(extra)
+        if "ExpressionAttributeNames" in params:
+            # boto3 complète ce dict avec les noms des conditions
+            request["ExpressionAttributeNames"] = dict(params["ExpressionAttributeNames"])
+        if limit is not None:
+            request["Limit"] = limit
+        if start_key:
+            request["ExclusiveStartKey"] = start_key
+        return request
+
+    async def _fetch_pages(
+        self,
+        operation,
+        params: Dict[str, Any],
+        limit: Optional[int] = None,
+        start_key: Optional[dict] = None,
+    ) -> Tuple[List[dict], Optional[dict]]:
+        """
+        Enchaîner les pages DynamoDB (1 Mo max chacune) via LastEvaluatedKey.
+
+        Sans `limit`, draine toutes les pages. Avec `limit`, demande au plus
+        les éléments restants à chaque appel (`Limit`) et s'arrête dès que la
+        page est pleine ; retourne la clé de reprise éventuelle.
+        """
+        items: List[dict] = []
+        while True:
+            remaining = None if limit is None else limit - len(items)
+            response = await self._retry_operation(
+                operation, **self._page_request(params, remaining, start_key)
+            )
+            items.extend(response.get("Items", []))
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key or (limit is not None and len(items) >= limit):
+                return items, start_key
+
+    async def _iter_pages(self, operation, params: Dict[str, Any]) -> AsyncIterator[List[dict]]:
+        """Itérer séquentiellement sur toutes les pages d'une query ou d'un scan."""
+        start_key = None
+        while True:
+            response = await self._retry_operation(
+                operation, **self._page_request(params, start_key=start_key)
+            )
+            yield response.get("Items", [])
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                return
+
+    async def _parallel_scan_pages(self, params: Dict[str, Any]) -> AsyncIterator[List[dict]]:
+        """
+        Scan parallèle (`Segment`/`TotalSegments`) : chaque segment est drainé
+        page par page, au plus `scan_workers` segments à la fois, et les pages
+        sont produites dans l'ordre où elles arrivent.
+        """
+        total = self.scan_segments
+        if total == 1:
+            async for page in self._iter_pages(self.table.scan, params):
+                yield page
+            return
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=total * 2)
+        workers = asyncio.Semaphore(self.scan_workers)
+        finished = object()
+
+        async def drain(segment: int) -> None:
+            try:
+                async with workers:
+                    start_key = None
+                    while True:
+                        response = await self._retry_operation(
+                            self.table.scan,
+                            **self._page_request(
+                                params, start_key=start_key, Segment=segment, TotalSegments=total
+                            ),
+                        )
+                        await queue.put(response.get("Items", []))
+                        start_key = response.get("LastEvaluatedKey")
+                        if not start_key:
+                            break
+                await queue.put(finished)
+            except Exception as e:
+                await queue.put(e)
+
+        tasks = [asyncio.create_task(drain(segment)) for segment in range(total)]
+        try:
+            remaining = total
+            while remaining:
+                page = await queue.get()
+                if page is finished:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield page
+        finally:
+            # Consommateur arrêté ou erreur : ne pas laisser de segment orphelin
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _shard_params(params: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Paramètres de query de chaque shard d'un listing par statut shardé."""
+        return [
+            (shard, {**params, "KeyConditionExpression": key_condition})
+            for shard, key_condition in params[_SHARDS]
+        ]
+
+    def _shard_key(self, params: Dict[str, Any], shard: str, item: dict) -> Dict[str, str]:
+        """Clé de reprise (ExclusiveStartKey) d'un shard après `item`."""
+        key = {**self._key(item["ticket_id"]), "created_at": item["created_at"]}
+        key[params[_SHARD_ATTRIBUTE]] = shard
+        return key
+
+    async def _merged_shard_pages(
+        self, operation, params: Dict[str, Any]
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Fusionner les pages des shards par created_at décroissant : un élément
+        n'est produit que lorsque chaque shard non épuisé a un élément en
+        attente, les pages suivantes étant lues en parallèle au besoin.
+        Les pages produites ne dépassent pas `Limit` éléments.
+        """
+        limit = params.get("Limit")
+        iterators = [self._iter_pages(operation, p) for _, p in self._shard_params(params)]
+        # File d'attente par shard ; None = shard épuisé
+        buffers: List[Optional[deque]] = [deque() for _ in iterators]
+        try:
+            while True:
+                empty = [i for i, buffer in enumerate(buffers) if buffer is not None and not buffer]
+                if empty:
+                    pages = await asyncio.gather(*(anext(iterators[i], None) for i in empty))
+                    for i, page in zip(empty, pages):
+                        buffers[i] = None if page is None else deque(page)
+                    continue
+                live = [buffer for buffer in buffers if buffer]
+                if not live:
+                    return
+                merged = []
+                while all(live):
+                    newest = max(live, key=lambda buffer: buffer[0].get("created_at") or "")
+                    merged.append(newest.popleft())
+                    if len(merged) == limit:
+                        yield merged
+                        merged = []
+                if merged:
+                    yield merged
+        finally:
+            for iterator in iterators:
+                await iterator.aclose()
+
+    async def _fetch_shard_page(
+        self, operation, params: Dict[str, Any], limit: int, cursor: Optional[str]
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Page d'un listing par statut shardé : chaque shard lit au plus `limit`
+        éléments depuis sa position, la fusion garde les `limit` plus récents.
+        Le curseur contient la position de chaque shard non épuisé (None =
+        depuis le début).
+        """
+        positions = decode_cursor(cursor)
+        if positions is not None and not isinstance(positions.get("shards"), dict):
+            raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+        shards = self._shard_params(params)
+        starts = (
+            positions["shards"] if positions is not None
+            else dict.fromkeys(shard for shard, _ in shards)
+        )
+        shards = [(shard, p) for shard, p in shards if shard in starts]
+
+        results = await asyncio.gather(*(
+            self._fetch_pages(operation, p, limit=limit, start_key=starts[shard])
+            for shard, p in shards
+        ))
+        merged = heapq.merge(
+            *([(shard, item) for item in items] for (shard, _), (items, _) in zip(shards, results)),
+            key=lambda entry: entry[1].get("created_at") or "",
+            reverse=True,
+        )
+        page = list(itertools.islice(merged, limit))
+
+        served: Dict[str, List[dict]] = {}
+        for shard, item in page:
+            served.setdefault(shard, []).append(item)
+        next_positions = {}
+        for (shard, _), (items, last_key) in zip(shards, results):
+            taken = served.get(shard, [])
+            if len(taken) < len(items):
+                # Éléments lus mais non servis : reprendre après le dernier servi
+                next_positions[shard] = (
+                    self._shard_key(params, shard, taken[-1]) if taken else starts[shard]
+                )
+            elif last_key:
+                next_positions[shard] = last_key
+        next_cursor = encode_cursor({"shards": next_positions}) if next_positions else None
+        return [item for _, item in page], next_cursor
+
+    def _pages(self, operation, params: Dict[str, Any]) -> AsyncIterator[List[dict]]:
+        """
+        Pages d'un listing complet : scan parallèle si aucun index n'est
+        utilisé, fusion des shards pour un statut shardé.
+        """
+        if _SHARDS in params:
+            return self._merged_shard_pages(operation, params)
+        if "KeyConditionExpression" not in params:
+            return self._parallel_scan_pages(params)
+        return self._iter_pages(operation, params)
+
     async def list_tickets(
         self,
         status: Optional[str] = None,
         channel: Optional[str] = None,
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        include_messages: bool = True,
     ) -> List[dict]:
-        """Lister les tickets depuis DynamoDB avec filtres."""
+        """Lister les tickets depuis DynamoDB avec filtres (toutes les pages)."""
         try:
-            # Si on filtre par statut, utiliser le GSI status-created_at-index
-            if status:
-                response = await self._retry_operation(
-                    self.table.query,
-                    IndexName="status-created_at-index",
-                    KeyConditionExpression=Key("status").eq(status),
-                    ScanIndexForward=False  # Tri décroissant par created_at
-                )
-                items = response.get("Items", [])
-            
-            # Si on filtre par channel, utiliser le GSI channel-created_at-index
-            elif channel:
-                response = await self._retry_operation(
-                    self.table.query,
-                    IndexName="channel-created_at-index",
-                    KeyConditionExpression=Key("channel").eq(channel),
-                    ScanIndexForward=False
-                )
-                items = response.get("Items", [])
-            
-            # Sinon, faire un scan (moins performant mais nécessaire)
-            else:
-                response = await self._retry_operation(self.table.scan)
-                items = response.get("Items", [])
-            
-            # Appliquer les filtres supplémentaires en mémoire
-            result = items
-            
-            if channel and status:  # Si on a déjà filtré par status, filtrer par channel
-                result = [t for t in result if t.get("channel") == channel]
-            
-            if status and not channel:  # Si on a déjà filtré par channel, filtrer par status
-                # Déjà filtré par le query
-                pass
-            
-            if date_from:
-                result = [t for t in result if t.get("created_at", "") >= date_from]
-            
-            if date_to:
-                result = [t for t in result if t.get("created_at", "") <= date_to]
-            
-            # Trier par date de création (plus récent en premier)
-            result.sort(key=lambda t: t.get("created_at", ""), reverse=True)
-            
-            # Convertir les Decimal en float/int
-            result = [decimal_to_float(ticket) for ticket in result]
-            
-            return result
-            
+            operation, params = self._list_request(
+                status, channel, date_from, date_to, assigned_to, urgency, include_messages
+            )
+            items = [item async for page in self._pages(operation, params) for item in page]
+            if "KeyConditionExpression" not in params and _SHARDS not in params:
+                # Le scan ne garantit aucun ordre : trier par date de création
+                items.sort(key=lambda t: t.get("created_at", ""), reverse=True)
+
+            tickets = [self._from_item(ticket) for ticket in items]
+            return await self._attach_messages(tickets) if include_messages else tickets
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception(f"Error listing tickets from DynamoDB: {e}")
+            raise HTTPException(status_code=500, detail="Failed to list tickets")
+
+    async def list_tickets_page(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        include_messages: bool = True,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Lister une page de tickets (`Limit` + `ExclusiveStartKey`).
+
+        Le curseur encode le LastEvaluatedKey de DynamoDB. Sans filtre
+        indexable, les pages suivent l'index « tous les tickets »
+        (`created_shards`) ; à défaut, chaque page relit toute la table.
+        """
+        operation, params = self._list_request(
+            status, channel, date_from, date_to, assigned_to, urgency, include_messages
+        )
+        tickets, next_cursor = await self._list_page(operation, params, limit, cursor)
+        if include_messages:
+            tickets = await self._attach_messages(tickets)
+        return tickets, next_cursor
+
+    async def list_ticket_summaries(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Lister une page de résumés : la ProjectionExpression ne lit que les
+        attributs du résumé (ni `last_message` complet ni analytics détaillés).
+        """
+        operation, params = self._list_request(
+            status, channel, date_from, date_to, assigned_to, urgency,
+            include_messages=False, projection=summary_projection(),
+        )
+        return await self._list_page(operation, params, limit, cursor)
+
+    async def _list_page(
+        self, operation, params: Dict[str, Any], limit: int, cursor: Optional[str]
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Lire une page de `limit` éléments à partir d'un curseur."""
+        try:
+            if _SHARDS in params:
+                items, next_cursor = await self._fetch_shard_page(operation, params, limit, cursor)
+                return [self._from_item(item) for item in items], next_cursor
+
+            if "KeyConditionExpression" not in params:
+                return await self._scan_page(params, limit, cursor)
+
+            items, last_key = await self._fetch_pages(
+                operation, params, limit=limit, start_key=decode_cursor(cursor)
+            )
+            next_cursor = encode_cursor(last_key) if last_key else None
+            return [self._from_item(item) for item in items], next_cursor
+
         except HTTPException:
             raise
+        except ClientError as e:
+            if cursor and e.response["Error"]["Code"] == "ValidationException":
+                # Clé de reprise forgée ou venant d'un autre filtre
+                raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+            logger.exception(f"Error listing tickets from DynamoDB: {e}")
+            raise HTTPException(status_code=500, detail="Failed to list tickets")
         except Exception as e:
             logger.exception(f"Error listing tickets from DynamoDB: {e}")
             raise HTTPException(status_code=500, detail="Failed to list tickets")
 
+    async def _scan_page(
+        self, params: Dict[str, Any], limit: int, cursor: Optional[str]
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Page d'un listing sans index (ni filtre indexable, ni `created_shards`).
+
+        Un scan ne suit aucun ordre : la table est lue en entier et seuls les
+        `limit` tickets les plus récents après le curseur `(created_at,
+        ticket_id)` sont gardés, comme pour les stockages fichiers. Coûteux
+        sur une grande table : y créer l'index « tous les tickets ».
+        """
+        after = cursor_key(cursor)
+        # Tas des limit + 1 plus récents (le dernier sert à savoir s'il reste une page)
+        newest: List[Tuple[tuple, dict]] = []
+        async for page in self._parallel_scan_pages(params):
+            for item in page:
+                key = (item.get("created_at") or "", item.get("ticket_id") or "")
+                if after is not None and key >= after:
+                    continue
+                if len(newest) <= limit:
+                    heapq.heappush(newest, (key, item))
+                elif key > newest[0][0]:
+                    heapq.heapreplace(newest, (key, item))
+        items = [item for _, item in sorted(newest, key=lambda entry: entry[0], reverse=True)]
+        next_cursor = ticket_cursor(items[limit - 1]) if len(items) > limit else None
+        return [self._from_item(item) for item in items[:limit]], next_cursor
+
+    async def iter_tickets(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        include_messages: bool = True,
+        page_size: int = 100,
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Itérer sur les tickets au fil des pages DynamoDB (`Limit` = `page_size`),
+        sans tout garder en mémoire.
+
+        Sans filtre indexable, les segments du scan parallèle sont produits
+        dès leur arrivée : aucun ordre n'est garanti entre les pages.
+        """
+        operation, params = self._list_request(
+            status, channel, date_from, date_to, assigned_to, urgency, include_messages
+        )
+        params["Limit"] = page_size
+        try:
+            async for page in self._pages(operation, params):
+                if not page:
+                    # Limit s'applique avant le FilterExpression : page vide possible
+                    continue
+                tickets = [self._from_item(item) for item in page]
+                if include_messages:
+                    tickets = await self._attach_messages(tickets)
+                yield tickets
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception(f"Error iterating tickets from DynamoDB: {e}")
+            raise HTTPException(status_code=500, detail="Failed to list tickets")
+
+    async def _count_pages(self, operation, params: Dict[str, Any], **extra: Any) -> int:
+        """Sommer les `Count` d'une query ou d'un scan `Select=COUNT`, page par page."""
+        count, start_key = 0, None
+        while True:
+            response = await self._retry_operation(
+                operation, **self._page_request(params, start_key=start_key, **extra)
+            )
+            count += response.get("Count", 0)
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                return count
+
+    async def count_tickets(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+    ) -> int:
+        """
+        Compter les tickets avec `Select=COUNT` : DynamoDB ne retourne aucun
+        item (la capacité lue reste celle des éléments parcourus). Les shards
+        d'un statut et les segments d'un scan sont comptés en parallèle.
+        """
+        # Sans les messages, aucune projection : incompatible avec Select=COUNT
+        operation, params = self._list_request(
+            status, channel, date_from, date_to, assigned_to, urgency, include_messages=True
+        )
+        params["Select"] = "COUNT"
+        try:
+            if _SHARDS in params:
+                counts = await asyncio.gather(*(
+                    self._count_pages(operation, p) for _, p in self._shard_params(params)
+                ))
+            elif "KeyConditionExpression" not in params and self.scan_segments > 1:
+                workers = asyncio.Semaphore(self.scan_workers)
+
+                async def count_segment(segment: int) -> int:
+                    async with workers:
+                        return await self._count_pages(
+                            self.table.scan, params,
+                            Segment=segment, TotalSegments=self.scan_segments,
+                        )
+
+                counts = await asyncio.gather(*(
+                    count_segment(segment) for segment in range(self.scan_segments)
+                ))
+            else:
+                counts = [await self._count_pages(operation, params)]
+            return sum(counts)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception(f"Error counting tickets from DynamoDB: {e}")
+            raise HTTPException(status_code=500, detail="Failed to count tickets")
+
+    async def _conditional_update(
+        self,
+        ticket_id: str,
+        update_expression: str,
+        names: Dict[str, str],
+        values: Dict[str, Any],
+        expected_status: StatusCondition = None,
+        changes: Optional[dict] = None,
+    ) -> dict:
+        """
+        UpdateItem conditionné à l'existence du ticket (et à son statut), en
+        un seul aller-retour. Retourne l'item mis à jour (ALL_NEW) ; l'échec
+        de la condition donne une 404 ou une 409 selon l'item existant.
+
+        Si les compteurs sont maintenus et que `changes` (nouvelles valeurs
+        des champs comptés) n'est pas vide, la mise à jour passe par une
+        transaction avec les compteurs, puis l'item est relu.
+        """
+        if self.counters_table is not None and changes:
+            return await self._counted_update(
+                ticket_id, update_expression, names, values, expected_status, changes
+            )
+        names = dict(names)
+        values = dict(values)
+        condition = "attribute_exists(ticket_id)"
+        allowed = expected_statuses(expected_status)
+        if allowed:
+            names["#status"] = "status"
+            placeholders = [f":expected{i}" for i in range(len(allowed))]
+            values.update(zip(placeholders, allowed))
+            condition += f" AND #status IN ({', '.join(placeholders)})"
+
+        params = {
+            "Key": self._key(ticket_id),
+            "UpdateExpression": update_expression,
+            "ConditionExpression": condition,
+            "ReturnValues": "ALL_NEW",
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }
+        if names:
+            params["ExpressionAttributeNames"] = names
+        if values:
+            params["ExpressionAttributeValues"] = values
+        try:
+            response = await self._retry_operation(self.table.update_item, **params)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            current = e.response.get("Item")
+            if not current:
+                raise HTTPException(status_code=404, detail="Ticket non trouvé")
+            check_expected_status(
+                {k: _deserializer.deserialize(v) for k, v in current.items()}, expected_status
+            )
+            raise
+        return response["Attributes"]
+
+    async def _counted_update(
+        self,
+        ticket_id: str,
+        update_expression: str,
+        names: Dict[str, str],
+        values: Dict[str, Any],
+        expected_status: StatusCondition,
+        changes: dict,
+    ) -> dict:
+        """UpdateItem et compteurs en une transaction ; retourne l'item relu."""
+        def build(before):
+            if before is None:
+                raise HTTPException(status_code=404, detail="Ticket non trouvé")
+            check_expected_status(before, expected_status)
+            operation = {"Key": self._key(ticket_id), "UpdateExpression": update_expression}
+            if names:
+                operation["ExpressionAttributeNames"] = names
+            if values:
+                operation["ExpressionAttributeValues"] = values
+            return "Update", operation, {**before, **changes}
+
+        await self._counted_write(ticket_id, build)
+        response = await self._retry_operation(
+            self.table.get_item, Key=self._key(ticket_id), ConsistentRead=True
+        )
+        if "Item" not in response:
+            raise HTTPException(status_code=404, detail="Ticket non trouvé")
+        return response["Item"]
+
     async def update_ticket_status(
-        self, ticket_id: str, status: str, closed_at: Optional[str] = None
+        self,
+        ticket_id: str,
+        status: str,
+        closed_at: Optional[str] = None,
+        expected_status: StatusCondition = None,
     ) -> dict:
-        """Mettre à jour le statut d'un ticket dans DynamoDB."""
+        """
+        Mettre à jour le statut d'un ticket dans DynamoDB (un UpdateItem conditionnel).
+
+        Le ticket n'est pas relu avant l'écriture : la durée de résolution est
+        dérivée de created_at/closed_at à la lecture (voir `_from_item`).
+        """
+        set_clauses = ["#status = :status"]
+        remove_clauses = []
+        names = {"#status": "status"}
+        values = {":status": status}
+        if self.status_shards:
+            set_clauses.append(f"{STATUS_SHARD_ATTRIBUTE} = :status_shard")
+            values[":status_shard"] = status_shard(status, ticket_id, self.status_shards)
+
+        # Si on ferme le ticket
+        if status == "fermé" and closed_at:
+            set_clauses.append("closed_at = :closed_at")
+            values[":closed_at"] = closed_at
+            remove_clauses.append("resolution_duration")
+
+        # Si on réouvre le ticket (sans effet s'il n'était pas fermé)
+        if status == "en cours":
+            remove_clauses += ["closed_at", "resolution_duration"]
+
+        # Ticket hors des files d'attente : le sortir des index creux
+        if status not in OPEN_STATUSES:
+            remove_clauses += list(QUEUE_ATTRIBUTES)
+
+        update_expression = "SET " + ", ".join(set_clauses)
+        if remove_clauses:
+            update_expression += " REMOVE " + ", ".join(remove_clauses)
+
         try:
-            # Récupérer le ticket pour calculer la durée
-            ticket = await self.get_ticket(ticket_id)
-            old_status = ticket.get("status")
-            
-            # Préparer les updates
-            update_expression = "SET #status = :status"
-            expression_names = {"#status": "status"}
-            expression_values = {":status": status}
-            
-            # Si on ferme le ticket
-            if status == "fermé" and closed_at:
-                update_expression += ", closed_at = :closed_at"
-                expression_values[":closed_at"] = closed_at
-                
-                # Calculer la durée de résolution
-                if "created_at" in ticket:
-                    try:
-                        created = datetime.fromisoformat(ticket["created_at"].replace("Z", "+00:00"))
-                        closed = datetime.fromisoformat(closed_at.replace("Z", "+00:00"))
-                        duration = int((closed - created).total_seconds())
-                        
-                        update_expression += ", resolution_duration = :duration"
-                        expression_values[":duration"] = duration
-                    except Exception as e:
-                        logger.warning(f"Could not calculate resolution duration: {e}")
-            
-            # Si on réouvre le ticket
-            if status == "en cours" and old_status == "fermé":
-                update_expression += ", closed_at = :null_closed, resolution_duration = :null_duration"
-                expression_values[":null_closed"] = None
-                expression_values[":null_duration"] = None
-            
-            # Convertir les valeurs en Decimal
-            expression_values = float_to_decimal(expression_values)
-            
-            # Mettre à jour dans DynamoDB
-            response = await self._retry_operation(
-                self.table.update_item,
-                Key={"ticket_id": ticket_id},
-                UpdateExpression=update_expression,
-                ExpressionAttributeNames=expression_names,
-                ExpressionAttributeValues=expression_values,
-                ReturnValues="ALL_NEW"
+            changes = {"status": status}
+            if ":closed_at" in values:
+                changes["closed_at"] = closed_at
+            attributes = await self._conditional_update(
+                ticket_id, update_expression, names, values, expected_status, changes
             )
-            
-            updated_ticket = decimal_to_float(response["Attributes"])
-            logger.info(f"Ticket {ticket_id} status updated: {old_status} -> {status}")
-            
+            await self._sync_queue_attributes(attributes)
+            updated_ticket = await self._with_messages(attributes)
+            logger.info(f"Ticket {ticket_id} status updated: -> {status}")
             return updated_ticket
-            
+
         except HTTPException:
             raise
         except Exception as e:
@@ -307,7 +1612,7 @@ class DynamoDBStorage(TicketStorage):
         try:
             response = await self._retry_operation(
                 self.table.get_item,
-                Key={"ticket_id": ticket_id},
+                Key=self._key(ticket_id),
                 ProjectionExpression="ticket_id"  # Ne récupérer que l'ID pour performance
             )
             return "Item" in response
@@ -318,40 +1623,345 @@ class DynamoDBStorage(TicketStorage):
 
     async def add_message(self, ticket_id: str, message: dict) -> None:
         """Ajouter un message à un ticket dans DynamoDB."""
+        if self.single_table:
+            await self._put_message(ticket_id, message)
+            return
         try:
-            # Convertir en Decimal
-            message_item = float_to_decimal(message)
-            
             # Si la liste messages n'existe pas, on la crée avec le message
             # Sinon on ajoute à la fin
             await self._retry_operation(
                 self.table.update_item,
                 Key={"ticket_id": ticket_id},
-                UpdateExpression="SET messages = list_append(if_not_exists(messages, :empty_list), :message)",
+                ConditionExpression="attribute_exists(ticket_id)",
+                UpdateExpression=(
+                    "SET messages = list_append(if_not_exists(messages, :empty_list), :message), "
+                    "message_count = if_not_exists(message_count, :zero) + :one, "
+                    "last_message = :last, last_message_preview = :preview"
+                ),
                 ExpressionAttributeValues={
-                    ":message": [message_item],
-                    ":empty_list": []
+                    ":message": [message],
+                    ":empty_list": [],
+                    ":zero": 0,
+                    ":one": 1,
+                    ":last": message,
+                    ":preview": message_preview(message),
                 }
             )
             logger.info(f"Message added to ticket {ticket_id} in DynamoDB")
             
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                raise HTTPException(status_code=404, detail="Ticket non trouvé")
+            logger.exception(f"Error adding message to DynamoDB: {e}")
+            raise HTTPException(status_code=500, detail="Failed to add message")
+        except HTTPException:
+            raise
         except Exception as e:
             logger.exception(f"Error adding message to DynamoDB: {e}")
             raise HTTPException(status_code=500, detail="Failed to add message")
 
-    async def update_ticket(self, ticket_id: str, updates: dict) -> dict:
-        """Mettre à jour un ticket avec un dictionnaire de champs."""
+    async def _put_message(self, ticket_id: str, message: dict) -> None:
+        """
+        Ajouter un message (single_table) : put de l'item message et mise à
+        jour des champs dénormalisés de l'en-tête dans une même transaction.
+        """
         try:
-            # Convertir en Decimal
-            updates_decimal = float_to_decimal(updates)
-            
+            # Le client de la ressource sérialise lui-même les valeurs natives
+            await self._retry_operation(
+                self.client.transact_write_items,
+                TransactItems=[
+                    {
+                        "Put": {
+                            "TableName": self.table_name,
+                            "Item": self._message_item(ticket_id, message),
+                            "ConditionExpression": "attribute_not_exists(sk)",
+                        }
+                    },
+                    {
+                        "Update": {
+                            "TableName": self.table_name,
+                            "Key": self._key(ticket_id),
+                            "UpdateExpression": (
+                                "SET message_count = if_not_exists(message_count, :zero) + :one, "
+                                "last_message = :last, last_message_preview = :preview"
+                            ),
+                            "ConditionExpression": "attribute_exists(ticket_id)",
+                            "ExpressionAttributeValues": {
+                                ":zero": 0,
+                                ":one": 1,
+                                ":last": message,
+                                ":preview": message_preview(message),
+                            },
+                        }
+                    },
+                ],
+            )
+            logger.info(f"Message added to ticket {ticket_id} in DynamoDB")
+
+        except ClientError as e:
+            reasons = [r.get("Code") for r in e.response.get("CancellationReasons", [])]
+            if len(reasons) > 1 and reasons[1] == "ConditionalCheckFailed":
+                raise HTTPException(status_code=404, detail="Ticket non trouvé")
+            if reasons and reasons[0] == "ConditionalCheckFailed":
+                # Même message déjà enregistré (rejeu) : rien à faire
+                logger.info(f"Message already stored for ticket {ticket_id}")
+                return
+            logger.exception(f"Error adding message to DynamoDB: {e}")
+            raise HTTPException(status_code=500, detail="Failed to add message")
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception(f"Error adding message to DynamoDB: {e}")
+            raise HTTPException(status_code=500, detail="Failed to add message")
+
+    async def _sync_queue_attributes(self, item: dict) -> None:
+        """
+        Remettre les attributs des index de file en cohérence avec l'item
+        retourné par une mise à jour partielle (assignation, analytics,
+        réouverture). Aucun appel si rien n'a changé, soit le cas courant.
+
+        L'écriture est conditionnée aux valeurs sources lues : si une autre
+        mise à jour est passée entre-temps, c'est elle qui resynchronise.
+        """
+        wanted = queue_attributes(item)
+        stale = [a for a in QUEUE_ATTRIBUTES if a in item and a not in wanted]
+        changed = {a: v for a, v in wanted.items() if item.get(a) != v}
+        if not stale and not changed:
+            return
+
+        names = {
+            "#status": "status",
+            "#assigned_to": "assigned_to",
+            "#analytics": "analytics",
+            "#urgency": "urgency",
+        }
+        values = {":status": item.get("status")}
+        condition = "#status = :status"
+        for path, value, placeholder in (
+            ("#assigned_to", item.get("assigned_to"), ":assigned_to"),
+            ("#analytics.#urgency", (item.get("analytics") or {}).get("urgency"), ":urgency"),
+        ):
+            if value is None:
+                condition += f" AND attribute_not_exists({path})"
+            else:
+                condition += f" AND {path} = {placeholder}"
+                values[placeholder] = value
+
+        expression = []
+        if changed:
+            expression.append("SET " + ", ".join(f"{a} = :{a}" for a in changed))
+            values.update({f":{a}": v for a, v in changed.items()})
+        if stale:
+            expression.append("REMOVE " + ", ".join(stale))
+        try:
+            await self._retry_operation(
+                self.table.update_item,
+                Key=self._key(item["ticket_id"]),
+                UpdateExpression=" ".join(expression),
+                ConditionExpression=condition,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+
+    async def backfill_queue_attributes(self) -> int:
+        """
+        Renseigner les attributs des index de file sur les tickets ouverts
+        écrits avant leur création (migration) ; retourne le nombre de
+        tickets concernés.
+        """
+        count = 0
+        for status in OPEN_STATUSES:
+            for ticket in await self.list_tickets(status=status, include_messages=False):
+                if queue_attributes(ticket):
+                    await self._sync_queue_attributes(ticket)
+                    count += 1
+        return count
+
+    async def backfill_status_shards(self) -> int:
+        """
+        Renseigner (ou recalculer après un changement de `status_shards`) le
+        statut shardé de tous les en-têtes ; retourne le nombre d'items
+        modifiés. Chaque écriture est conditionnée au statut lu.
+        """
+        if not self.status_shards:
+            return 0
+        return await self._backfill_shard_attribute(
+            STATUS_SHARD_ATTRIBUTE, self.status_shards, source="status"
+        )
+
+    async def backfill_created_shards(self) -> int:
+        """
+        Indexer tous les en-têtes existants dans l'index « tous les tickets »
+        (ou les répartir à nouveau après un changement de `created_shards`) ;
+        retourne le nombre d'items modifiés.
+        """
+        if not self.created_shards:
+            return 0
+        return await self._backfill_shard_attribute(CREATED_SHARD_ATTRIBUTE, self.created_shards)
+
+    async def _backfill_shard_attribute(
+        self, attribute: str, shards: int, source: Optional[str] = None
+    ) -> int:
+        """
+        Poser `attribute` ("<valeur de source>#<n>", ou "all#<n>" sans source)
+        sur tous les en-têtes. L'écriture est conditionnée à la valeur source
+        lue, ou à l'existence du ticket : une écriture concurrente pose la clé
+        elle-même, et un ticket supprimé entre-temps n'est pas recréé.
+        """
+        names = {"#shard": attribute, "#id": "ticket_id"}
+        if source:
+            names["#source"] = source
+        params = {
+            "ProjectionExpression": ", ".join(names),
+            "ExpressionAttributeNames": names,
+        }
+        if self.single_table:
+            params["FilterExpression"] = Attr("sk").eq(TICKET_SK)
+        count = 0
+        async for page in self._parallel_scan_pages(params):
+            for item in page:
+                prefix = item.get(source) if source else ALL_TICKETS
+                if not prefix:
+                    continue
+                shard = status_shard(prefix, item["ticket_id"], shards)
+                if item.get(attribute) == shard:
+                    continue
+                request = {
+                    "Key": self._key(item["ticket_id"]),
+                    "UpdateExpression": "SET #shard = :shard",
+                    "ExpressionAttributeNames": {"#shard": attribute, "#id": "ticket_id"},
+                    "ExpressionAttributeValues": {":shard": shard},
+                    "ConditionExpression": "attribute_exists(#id)",
+                }
+                if source:
+                    request["ConditionExpression"] = "#source = :source"
+                    request["ExpressionAttributeNames"] = {"#shard": attribute, "#source": source}
+                    request["ExpressionAttributeValues"][":source"] = prefix
+                try:
+                    await self._retry_operation(self.table.update_item, **request)
+                    count += 1
+                except ClientError as e:
+                    # Source modifiée (ou ticket supprimé) entre-temps : rien à poser
+                    if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                        raise
+        return count
+
+    async def backfill_message_summaries(self) -> int:
+        """
+        Recalculer `message_count`, `last_message` et `last_message_preview`
+        des tickets écrits avant leur dénormalisation (migration) ; retourne
+        le nombre de tickets corrigés. Un `add_message` sur un ticket sans
+        compteur part de zéro : les compteurs faux sont aussi corrigés.
+        """
+        names = {"#id": "ticket_id", "#count": "message_count"}
+        if not self.single_table:
+            names["#messages"] = "messages"
+        params = {"ProjectionExpression": ", ".join(names), "ExpressionAttributeNames": names}
+        if self.single_table:
+            params["FilterExpression"] = Attr("sk").eq(TICKET_SK)
+        count = 0
+        async for page in self._parallel_scan_pages(params):
+            for item in page:
+                if await self._backfill_message_summary(item, params):
+                    count += 1
+        return count
+
+    async def _backfill_message_summary(self, item: dict, params: Dict[str, Any]) -> bool:
+        """
+        Corriger les champs dénormalisés d'un ticket si son compteur est faux.
+        L'écriture est conditionnée aux messages lus (taille de la liste, ou
+        compteur de l'en-tête en single_table) : si un message arrive
+        entre-temps, le ticket est relu et recalculé.
+        """
+        ticket_id = item["ticket_id"]
+        for _ in range(3):
+            if self.single_table:
+                messages = await self._read_messages(ticket_id)
+            else:
+                messages = item.get("messages") or []
+            if item.get("message_count") == len(messages):
+                return False
+
+            last_message = messages[-1] if messages else None
+            names = {"#count": "message_count"}
+            values = {
+                ":count": len(messages),
+                ":last": last_message,
+                ":preview": message_preview(last_message),
+            }
+            if not self.single_table:
+                names["#messages"] = "messages"
+                condition = "size(#messages) = :count"
+            elif item.get("message_count") is None:
+                condition = "attribute_not_exists(#count)"
+            else:
+                condition = "#count = :seen"
+                values[":seen"] = item["message_count"]
+            try:
+                await self._retry_operation(
+                    self.table.update_item,
+                    Key=self._key(ticket_id),
+                    UpdateExpression=(
+                        "SET #count = :count, last_message = :last, last_message_preview = :preview"
+                    ),
+                    ConditionExpression=condition,
+                    ExpressionAttributeNames=names,
+                    ExpressionAttributeValues=values,
+                )
+                return True
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+            # Message ajouté entre-temps : relire le ticket
+            response = await self._retry_operation(
+                self.table.get_item,
+                Key=self._key(ticket_id),
+                ProjectionExpression=params["ProjectionExpression"],
+                ExpressionAttributeNames=dict(params["ExpressionAttributeNames"]),
+            )
+            item = response.get("Item")
+            if item is None:
+                return False
+        logger.warning(f"Message summary of ticket {ticket_id} still changing, skipped")
+        return False
+
+    async def _with_messages(self, item: dict) -> dict:
+        """Ticket complet à partir de l'item d'en-tête retourné par une écriture."""
+        ticket = self._from_item(item)
+        if self.single_table:
+            await self._attach_messages([ticket])
+        return ticket
+
+    async def update_ticket(
+        self, ticket_id: str, updates: dict, expected_status: StatusCondition = None
+    ) -> dict:
+        """Mettre à jour un ticket avec un dictionnaire de champs (UpdateItem conditionnel)."""
+        try:
+            messages = None
+            if "messages" in updates:
+                # Garder les champs dénormalisés cohérents avec la liste
+                messages = updates["messages"] or []
+                updates = {
+                    **updates,
+                    "message_count": len(messages),
+                    "last_message": messages[-1] if messages else None,
+                    "last_message_preview": message_preview(messages[-1] if messages else None),
+                }
+                if self.single_table:
+                    # Les messages sont des items séparés, réécrits après l'en-tête
+                    updates.pop("messages")
+
             update_expression = "SET"
             expression_names = {}
             expression_values = {}
             
-            for i, (key, value) in enumerate(updates_decimal.items()):
-                # Ignorer ticket_id car c'est la clé
-                if key == "ticket_id":
+            for i, (key, value) in enumerate(updates.items()):
+                # Ignorer ticket_id (et sk) car c'est la clé, et les clés
+                # d'index dérivées (files, shards)
+                if key in INDEX_KEY_ATTRIBUTES or key in QUEUE_ATTRIBUTES:
                     continue
                     
                 attr_name = f"#{key}"
@@ -361,25 +1971,38 @@ class DynamoDBStorage(TicketStorage):
                 expression_names[attr_name] = key
                 expression_values[attr_value] = value
             
+            if self.status_shards and updates.get("status"):
+                update_expression += f" {STATUS_SHARD_ATTRIBUTE} = :{STATUS_SHARD_ATTRIBUTE},"
+                expression_values[f":{STATUS_SHARD_ATTRIBUTE}"] = status_shard(
+                    updates["status"], ticket_id, self.status_shards
+                )
+
             # Enlever la dernière virgule
             update_expression = update_expression.rstrip(",")
             
             if not expression_names:
                 return await self.get_ticket(ticket_id)
+
+            if "status" in updates and updates["status"] not in OPEN_STATUSES:
+                # Ticket hors des files d'attente : le sortir des index creux
+                update_expression += " REMOVE " + ", ".join(QUEUE_ATTRIBUTES)
                 
-            response = await self._retry_operation(
-                self.table.update_item,
-                Key={"ticket_id": ticket_id},
-                UpdateExpression=update_expression,
-                ExpressionAttributeNames=expression_names,
-                ExpressionAttributeValues=expression_values,
-                ReturnValues="ALL_NEW"
+            attributes = await self._conditional_update(
+                ticket_id, update_expression, expression_names, expression_values, expected_status,
+                changes={k: v for k, v in updates.items() if k in COUNTER_FIELDS},
             )
+            if self.single_table and messages is not None:
+                # Seulement une fois la condition vérifiée : une 404 ou une 409
+                # ne laisse aucun message modifié
+                await self._sync_messages(ticket_id, messages)
+            await self._sync_queue_attributes(attributes)
             
-            updated_ticket = decimal_to_float(response["Attributes"])
+            updated_ticket = await self._with_messages(attributes)
             logger.info(f"Ticket updated in DynamoDB: {ticket_id}")
             return updated_ticket
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.exception(f"Error updating ticket in DynamoDB: {e}")
             raise HTTPException(status_code=500, detail="Failed to update ticket")
@@ -387,16 +2010,50 @@ class DynamoDBStorage(TicketStorage):
     async def delete_ticket(self, ticket_id: str) -> None:
         """Supprimer un ticket de DynamoDB."""
         try:
-            await self._retry_operation(
-                self.table.delete_item,
-                Key={"ticket_id": ticket_id}
-            )
+            if self.counters_table is not None:
+                await self._delete_counted(ticket_id)
+            elif self.single_table:
+                # Supprimer toute la partition : en-tête et messages
+                keys = await self._query_partition(ticket_id, ProjectionExpression="ticket_id, sk")
+                if not any(key["sk"] == TICKET_SK for key in keys):
+                    raise HTTPException(status_code=404, detail="Ticket non trouvé")
+                await self._batch_write([{"DeleteRequest": {"Key": key}} for key in keys])
+            else:
+                await self._retry_operation(
+                    self.table.delete_item,
+                    Key={"ticket_id": ticket_id},
+                    ConditionExpression="attribute_exists(ticket_id)"
+                )
             logger.info(f"Ticket deleted from DynamoDB: {ticket_id}")
             
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                raise HTTPException(status_code=404, detail="Ticket non trouvé")
+            logger.exception(f"Error deleting ticket from DynamoDB: {e}")
+            raise HTTPException(status_code=500, detail="Failed to delete ticket")
+        except HTTPException:
+            raise
         except Exception as e:
             logger.exception(f"Error deleting ticket from DynamoDB: {e}")
             raise HTTPException(status_code=500, detail="Failed to delete ticket")
 
+    async def _delete_counted(self, ticket_id: str) -> None:
+        """Supprimer l'en-tête et décompter le ticket en une transaction, puis ses messages."""
+        message_keys = []
+        if self.single_table:
+            message_keys = await self._query_partition(
+                ticket_id, messages_only=True, ProjectionExpression="ticket_id, sk"
+            )
+
+        def build(before):
+            if before is None:
+                raise HTTPException(status_code=404, detail="Ticket non trouvé")
+            return "Delete", {"Key": self._key(ticket_id)}, None
+
+        await self._counted_write(ticket_id, build)
+        if message_keys:
+            await self._batch_write([{"DeleteRequest": {"Key": key}} for key in message_keys])
+
     async def health_check(self) -> bool:
         """Vérifier que DynamoDB est accessible."""
         try:
@@ -407,6 +2064,7 @@ class DynamoDBStorage(TicketStorage):
             return False
 
     async def close(self) -> None:
-        """Fermer les connexions DynamoDB."""
+        """Fermer les connexions DynamoDB et le pool de threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.client.close()
         logger.info("DynamoDBStorage closed")
-        # boto3 gère automatiquement les connexions, rien à faire
@@ -0,0 +1,60 @@
+"""
+(Dé)sérialisation DynamoDB en types Python natifs.
+
+Par défaut, la ressource boto3 convertit les nombres en `Decimal` et refuse
+les `float` : il fallait alors reparcourir chaque item (messages compris)
+avec `decimal_to_float`/`float_to_decimal`. Les classes ci-dessous font la
+conversion pendant la (dé)sérialisation elle-même, en une seule passe :
+les nombres lus sont des int/float, et les float sont acceptés en écriture.
+"""
+from decimal import Decimal
+
+from boto3.dynamodb.transform import TransformationInjector
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+
+class NativeTypeSerializer(TypeSerializer):
+    """TypeSerializer qui accepte les float (via leur représentation décimale)."""
+
+    def _is_number(self, value) -> bool:
+        return isinstance(value, (int, float, Decimal))
+
+    def _serialize_n(self, value) -> str:
+        if isinstance(value, float):
+            value = Decimal(repr(value))
+        return super()._serialize_n(value)
+
+
+class NativeTypeDeserializer(TypeDeserializer):
+    """TypeDeserializer qui produit des int/float au lieu de Decimal."""
+
+    def _deserialize_n(self, value: str):
+        try:
+            return int(value)
+        except ValueError:
+            number = float(value)
+            # Même règle que l'ancien decimal_to_float : entier si sans partie décimale
+            return int(number) if number.is_integer() else number
+
+
+def install_native_types(resource) -> None:
+    """
+    Remplacer la (dé)sérialisation d'une ressource boto3 DynamoDB (et de son
+    client `meta.client`) par les versions natives.
+    """
+    injector = TransformationInjector(
+        serializer=NativeTypeSerializer(), deserializer=NativeTypeDeserializer()
+    )
+    events = resource.meta.client.meta.events
+    events.unregister("before-parameter-build.dynamodb", unique_id="dynamodb-attr-value-input")
+    events.register(
+        "before-parameter-build.dynamodb",
+        injector.inject_attribute_value_input,
+        unique_id="dynamodb-attr-value-input",
+    )
+    events.unregister("after-call.dynamodb", unique_id="dynamodb-attr-value-output")
+    events.register(
+        "after-call.dynamodb",
+        injector.inject_attribute_value_output,
+        unique_id="dynamodb-attr-value-output",
+    )
@@ -0,0 +1,121 @@
+"""
+Index secondaires en mémoire pour le filtrage des listings de tickets.
+
+Maintenus incrémentalement à chaque écriture par les stockages résidents
+(JSONStorage et, via son manifeste, ShardedJSONStorage). Chaque valeur de
+statut, canal, agent assigné et urgence pointe vers une liste triée par
+`created_at` : un listing filtré coûte O(log n + résultats), sans
+parcourir tous les tickets ni trier le résultat.
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Clé de tri d'un ticket dans les listes : (created_at, ticket_id)
+SortKey = Tuple[str, str]
+
+INDEXED_FIELDS = ("status", "channel", "assigned_to", "urgency")
+
+# Borne supérieure pour inclure tous les ticket_id d'un même created_at
+_MAX_ID = "\U0010ffff"
+
+
+def indexed_values(ticket: dict) -> Dict[str, Optional[str]]:
+    """Valeurs indexées d'un ticket (l'urgence vient des analytics)."""
+    analytics = ticket.get("analytics") or {}
+    return {
+        "status": ticket.get("status"),
+        "channel": ticket.get("channel"),
+        "assigned_to": ticket.get("assigned_to"),
+        "urgency": analytics.get("urgency") if isinstance(analytics, dict) else None,
+    }
+
+
+class TicketIndex:
+    """Index par champ et par date de création, mis à jour à chaque écriture."""
+
+    def __init__(self, tickets: Iterable[dict] = ()):
+        self._entries: Dict[str, Tuple[SortKey, Dict[str, Optional[str]]]] = {}
+        self._by_created: List[SortKey] = []
+        self._buckets: Dict[str, Dict[str, List[SortKey]]] = {f: {} for f in INDEXED_FIELDS}
+        for ticket in tickets:
+            self.put(ticket)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, ticket: dict) -> None:
+        """Indexer (ou réindexer) un ticket."""
+        ticket_id = ticket["ticket_id"]
+        key = (str(ticket.get("created_at") or ""), ticket_id)
+        values = indexed_values(ticket)
+
+        entry = self._entries.get(ticket_id)
+        if entry == (key, values):
+            return
+        if entry is not None:
+            self.remove(ticket_id)
+
+        self._entries[ticket_id] = (key, values)
+        insort(self._by_created, key)
+        for field, value in values.items():
+            if value is not None:
+                insort(self._buckets[field].setdefault(value, []), key)
+
+    def remove(self, ticket_id: str) -> None:
+        """Retirer un ticket de l'index."""
+        entry = self._entries.pop(ticket_id, None)
+        if entry is None:
+            return
+        key, values = entry
+        self._discard(self._by_created, key)
+        for field, value in values.items():
+            if value is None:
+                continue
+            bucket = self._buckets[field].get(value)
+            if bucket is not None:
+                self._discard(bucket, key)
+                if not bucket:
+                    del self._buckets[field][value]
+
+    @staticmethod
+    def _discard(keys: List[SortKey], key: SortKey) -> None:
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+    def query(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        before: Optional[SortKey] = None,
+        limit: Optional[int] = None,
+        **filters: Optional[str],
+    ) -> List[str]:
+        """
+        IDs des tickets correspondant aux filtres, du plus récent au plus ancien.
+
+        `filters` accepte les champs de INDEXED_FIELDS ; la liste la plus courte
+        parmi les filtres d'égalité est parcourue, les autres filtres sont
+        vérifiés en O(1) par ticket. `before` (clé exclue) et `limit`
+        permettent de paginer sans parcourir les tickets déjà servis.
+        """
+        active = {f: v for f, v in filters.items() if v}
+        candidates = [self._by_created]
+        for field, value in active.items():
+            candidates.append(self._buckets[field].get(value, []))
+        keys = min(candidates, key=len)
+
+        start = bisect_left(keys, (date_from, "")) if date_from else 0
+        end = bisect_right(keys, (date_to, _MAX_ID)) if date_to else len(keys)
+        if before is not None:
+            end = min(end, bisect_left(keys, before))
+
+        result = []
+        for i in range(end - 1, start - 1, -1):
+            ticket_id = keys[i][1]
+            values = self._entries[ticket_id][1]
+            if all(values[f] == v for f, v in active.items()):
+                result.append(ticket_id)
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
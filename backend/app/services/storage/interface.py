@@ -1,6 +1,53 @@
 """Storage interface and factory for ticket storage implementations."""
+import logging
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+
+from .counters import TicketCounters
+from .pagination import cursor_key, ticket_cursor
+from .summary import ticket_summary
+
+logger = logging.getLogger(__name__)
+
+# Statut attendu par une écriture conditionnelle : un statut ou plusieurs
+StatusCondition = Union[str, Iterable[str], None]
+
+# Statuts d'un ticket non fermé
+OPEN_STATUSES = ("nouveau", "en cours")
+
+
+def resolution_seconds(created_at: str, closed_at: str) -> Optional[int]:
+    """Durée de résolution en secondes entre deux dates ISO (None si illisibles)."""
+    try:
+        created = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        closed = datetime.fromisoformat(closed_at.replace("Z", "+00:00"))
+        return int((closed - created).total_seconds())
+    except Exception as e:
+        logger.warning(f"Could not calculate resolution duration: {e}")
+        return None
+
+
+def expected_statuses(expected_status: StatusCondition) -> Tuple[str, ...]:
+    """Normaliser une condition de statut en tuple de statuts acceptés."""
+    if expected_status is None:
+        return ()
+    if isinstance(expected_status, str):
+        return (expected_status,)
+    return tuple(expected_status)
+
+
+def check_expected_status(ticket: dict, expected_status: StatusCondition) -> None:
+    """Lever une 409 si le statut du ticket ne fait pas partie des statuts attendus."""
+    allowed = expected_statuses(expected_status)
+    if allowed and ticket.get("status") not in allowed:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Statut du ticket incompatible ({ticket.get('status')})",
+        )
+
 
 class TicketStorage(ABC):
     """Interface abstraite pour le stockage des tickets."""
@@ -11,10 +58,45 @@ class TicketStorage(ABC):
         pass
 
     @abstractmethod
-    async def get_ticket(self, ticket_id: str) -> dict:
-        """Récupérer un ticket par son ID."""
+    async def get_ticket(self, ticket_id: str, include_messages: bool = True) -> dict:
+        """
+        Récupérer un ticket par son ID.
+
+        Si `include_messages` est faux, seul l'en-tête est retourné : tous les
+        champs sauf `messages`, avec `message_count` et `last_message`.
+        """
         pass
 
+    async def get_tickets(
+        self, ticket_ids: Iterable[str], include_messages: bool = True
+    ) -> List[dict]:
+        """
+        Récupérer plusieurs tickets en un appel.
+
+        Retourne les tickets trouvés dans l'ordre des IDs demandés (doublons et
+        IDs inconnus ignorés). Implémentation par défaut : un get_ticket par ID.
+        """
+        tickets = []
+        for ticket_id in dict.fromkeys(ticket_ids):
+            try:
+                tickets.append(await self.get_ticket(ticket_id, include_messages=include_messages))
+            except HTTPException as e:
+                if e.status_code != 404:
+                    raise
+        return tickets
+
+    async def save_tickets(self, tickets: Iterable[dict]) -> int:
+        """
+        Sauvegarder plusieurs tickets en un appel ; retourne leur nombre.
+
+        Implémentation par défaut : un save_ticket par ticket.
+        """
+        count = 0
+        for ticket in tickets:
+            await self.save_ticket(ticket)
+            count += 1
+        return count
+
     @abstractmethod
     async def list_tickets(
         self,
@@ -22,15 +104,177 @@ class TicketStorage(ABC):
         channel: Optional[str] = None,
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        include_messages: bool = True,
     ) -> List[dict]:
-        """Lister les tickets avec filtres optionnels."""
+        """
+        Lister les tickets avec filtres optionnels, du plus récent au plus ancien.
+
+        Avec `include_messages=False`, retourne des en-têtes (voir get_ticket).
+        """
         pass
 
+    async def list_tickets_page(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        include_messages: bool = True,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Lister une page de tickets (mêmes filtres et même ordre que list_tickets).
+
+        Retourne `(tickets, next_cursor)` ; `next_cursor` est un jeton opaque à
+        repasser pour obtenir la page suivante, ou None en fin de listing.
+        Implémentation par défaut : filtrage de list_tickets sur la clé
+        `(created_at, ticket_id)`, à surcharger par les stockages qui savent
+        paginer nativement.
+        """
+        after = cursor_key(cursor)
+        tickets = await self.list_tickets(
+            status=status,
+            channel=channel,
+            date_from=date_from,
+            date_to=date_to,
+            assigned_to=assigned_to,
+            urgency=urgency,
+            include_messages=include_messages,
+        )
+        if after is not None:
+            tickets = [t for t in tickets if (t.get("created_at") or "", t["ticket_id"]) < after]
+        page = tickets[:limit]
+        next_cursor = ticket_cursor(page[-1]) if page and len(tickets) > limit else None
+        return page, next_cursor
+
+    async def iter_tickets(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        include_messages: bool = True,
+        page_size: int = 100,
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Itérer sur les tickets page par page (mêmes filtres et même ordre que
+        list_tickets), sans matérialiser tout le listing.
+
+        Générateur asynchrone : chaque élément est une liste d'au plus
+        `page_size` tickets. Implémentation par défaut : enchaînement des
+        curseurs de list_tickets_page.
+        """
+        cursor = None
+        while True:
+            page, cursor = await self.list_tickets_page(
+                status=status,
+                channel=channel,
+                date_from=date_from,
+                date_to=date_to,
+                assigned_to=assigned_to,
+                urgency=urgency,
+                include_messages=include_messages,
+                limit=page_size,
+                cursor=cursor,
+            )
+            if page:
+                yield page
+            if not cursor:
+                return
+
+    async def count_tickets(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+    ) -> int:
+        """
+        Compter les tickets correspondant aux filtres (mêmes filtres que
+        list_tickets). Implémentation par défaut : somme des pages
+        d'en-têtes, à surcharger par les stockages qui savent compter
+        nativement.
+        """
+        count = 0
+        async for page in self.iter_tickets(
+            status=status,
+            channel=channel,
+            date_from=date_from,
+            date_to=date_to,
+            assigned_to=assigned_to,
+            urgency=urgency,
+            include_messages=False,
+            page_size=500,
+        ):
+            count += len(page)
+        return count
+
+    async def list_ticket_summaries(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Lister une page de résumés de tickets (voir `summary.ticket_summary`).
+
+        Mêmes filtres, ordre et curseurs que list_tickets_page. Implémentation
+        par défaut : résumé des en-têtes, à surcharger par les stockages qui
+        savent ne lire que les attributs du résumé.
+        """
+        headers, next_cursor = await self.list_tickets_page(
+            status=status,
+            channel=channel,
+            date_from=date_from,
+            date_to=date_to,
+            assigned_to=assigned_to,
+            urgency=urgency,
+            include_messages=False,
+            limit=limit,
+            cursor=cursor,
+        )
+        return [ticket_summary(header) for header in headers], next_cursor
+
+    async def get_ticket_stats(self, days: int = 30) -> dict:
+        """
+        Totaux du dashboard (voir `counters.stats_from_counters`).
+
+        Implémentation par défaut : comptage des en-têtes de tous les tickets,
+        à surcharger par les stockages qui maintiennent les compteurs à
+        l'écriture (lecture en O(1)).
+        """
+        headers = await self.list_tickets(include_messages=False)
+        return TicketCounters(headers).stats(days)
+
     @abstractmethod
     async def update_ticket_status(
-        self, ticket_id: str, status: str, closed_at: Optional[str] = None
+        self,
+        ticket_id: str,
+        status: str,
+        closed_at: Optional[str] = None,
+        expected_status: StatusCondition = None,
     ) -> dict:
-        """Mettre à jour le statut d'un ticket."""
+        """
+        Mettre à jour le statut d'un ticket et retourner le ticket modifié.
+
+        Écriture conditionnelle en un seul aller-retour : 404 si le ticket
+        n'existe pas, 409 si `expected_status` est fourni et que le statut
+        courant n'en fait pas partie.
+        """
         pass
 
     @abstractmethod
@@ -40,17 +284,22 @@ class TicketStorage(ABC):
 
     @abstractmethod
     async def add_message(self, ticket_id: str, message: dict) -> None:
-        """Ajouter un message à un ticket."""
+        """Ajouter un message à un ticket (404 si le ticket n'existe pas)."""
         pass
 
     @abstractmethod
-    async def update_ticket(self, ticket_id: str, updates: dict) -> dict:
-        """Mettre à jour un ticket avec un dictionnaire de champs."""
+    async def update_ticket(
+        self, ticket_id: str, updates: dict, expected_status: StatusCondition = None
+    ) -> dict:
+        """
+        Mettre à jour un ticket avec un dictionnaire de champs et retourner
+        le ticket modifié (mêmes conditions que update_ticket_status).
+        """
         pass
 
     @abstractmethod
     async def delete_ticket(self, ticket_id: str) -> None:
-        """Supprimer un ticket."""
+        """Supprimer un ticket (404 s'il n'existe pas)."""
         pass
 
     @abstractmethod
@@ -61,13 +310,86 @@ class TicketStorage(ABC):
 def get_storage() -> TicketStorage:
     """Factory to obtain the appropriate storage implementation.
 
-    - If STORAGE_TYPE == "dynamodb", returns a DynamoDBStorage instance.
-    - Otherwise, returns a JSONStorage instance using the configured TICKETS_FILE.
+    - If STORAGE_TYPE == "dynamodb", returns a DynamoDBStorage instance sharing
+      the process-wide adaptive retry controller.
+    - If STORAGE_TYPE == "json_sharded", returns a ShardedJSONStorage instance
+      (one file per ticket under TICKETS_DIR).
+    - If STORAGE_TYPE == "sqlite", returns a SQLiteStorage instance (SQLITE_PATH).
+    - Otherwise, returns a JSONStorage instance using the configured TICKETS_FILE
+      (journal mode when JSON_STORAGE_JOURNAL is enabled).
+
+    File-based backends encode tickets with the STORAGE_CODEC codec. The
+    backend is then wrapped in the STORAGE_MIDDLEWARE layers, in order (see
+    middleware.wrap_storage); none by default. The opt-in "cache" layer is a
+    CachedStorage sharing the process-wide read cache, skipped when
+    STORAGE_CACHE_SIZE is 0.
     """
-    from app.core.config import STORAGE_TYPE, TICKETS_FILE, DYNAMODB_TABLE_TICKETS, AWS_REGION
+    from app.core.config import (
+        STORAGE_TYPE,
+        TICKETS_FILE,
+        TICKETS_DIR,
+        SQLITE_PATH,
+        DYNAMODB_TABLE_TICKETS,
+        DYNAMODB_LAYOUT,
+        DYNAMODB_SCAN_SEGMENTS,
+        DYNAMODB_SCAN_WORKERS,
+        DYNAMODB_MAX_WORKERS,
+        DYNAMODB_MAX_POOL_CONNECTIONS,
+        DYNAMODB_STATUS_SHARDS,
+        DYNAMODB_CREATED_SHARDS,
+        DYNAMODB_TABLE_COUNTERS,
+        DYNAMODB_COUNTER_SHARDS,
+        DYNAMODB_MAX_ATTEMPTS,
+        DYNAMODB_RETRY_BASE_DELAY,
+        DYNAMODB_RETRY_MAX_DELAY,
+        DYNAMODB_RETRY_BUDGET,
+        AWS_REGION,
+        JSON_STORAGE_JOURNAL,
+        JSON_JOURNAL_COMPACT_THRESHOLD,
+        STORAGE_CODEC,
+        STORAGE_MIDDLEWARE,
+    )
+    from app.services.storage.codecs import get_codec
     if STORAGE_TYPE == "dynamodb":
         from app.services.storage.dynamodb_store import DynamoDBStorage
-        return DynamoDBStorage(table_name=DYNAMODB_TABLE_TICKETS, region=AWS_REGION)
+        from app.services.storage.retry import shared_retry
+        storage = DynamoDBStorage(
+            table_name=DYNAMODB_TABLE_TICKETS,
+            region=AWS_REGION,
+            layout=DYNAMODB_LAYOUT,
+            scan_segments=DYNAMODB_SCAN_SEGMENTS,
+            scan_workers=DYNAMODB_SCAN_WORKERS,
+            max_workers=DYNAMODB_MAX_WORKERS,
+            max_pool_connections=DYNAMODB_MAX_POOL_CONNECTIONS,
+            status_shards=DYNAMODB_STATUS_SHARDS,
+            created_shards=DYNAMODB_CREATED_SHARDS,
+            counters_table=DYNAMODB_TABLE_COUNTERS or None,
+            counter_shards=DYNAMODB_COUNTER_SHARDS,
+            retry=shared_retry(
+                max_attempts=DYNAMODB_MAX_ATTEMPTS,
+                base_delay=DYNAMODB_RETRY_BASE_DELAY,
+                max_delay=DYNAMODB_RETRY_MAX_DELAY,
+                retry_budget=DYNAMODB_RETRY_BUDGET,
+            ),
+        )
+    elif STORAGE_TYPE == "json_sharded":
+        from app.services.storage.sharded_store import ShardedJSONStorage
+        storage = ShardedJSONStorage(
+            base_dir=TICKETS_DIR,
+            compact_threshold=JSON_JOURNAL_COMPACT_THRESHOLD,
+            codec=get_codec(STORAGE_CODEC),
+        )
+    elif STORAGE_TYPE == "sqlite":
+        from app.services.storage.sqlite_store import SQLiteStorage
+        storage = SQLiteStorage(db_path=SQLITE_PATH)
     else:
         from app.services.storage.json_store import JSONStorage
-        return JSONStorage(file_path=TICKETS_FILE)
+        storage = JSONStorage(
+            file_path=TICKETS_FILE,
+            journal=JSON_STORAGE_JOURNAL,
+            compact_threshold=JSON_JOURNAL_COMPACT_THRESHOLD,
+            codec=get_codec(STORAGE_CODEC),
+        )
+
+    from app.services.storage.middleware import wrap_storage
+    return wrap_storage(storage, STORAGE_MIDDLEWARE)
@@ -1,68 +1,484 @@
 """
 Implémentation JSON du stockage des tickets.
 Utilise un fichier JSON avec locking pour la concurrence.
+
+Les tickets sont gardés en mémoire et servis depuis celle-ci ; le fichier
+n'est relu que si sa signature (inode, mtime, taille) change, par exemple
+après une écriture d'un autre worker.
+
+Deux modes d'écriture sont disponibles :
+- snapshot (défaut) : chaque écriture réécrit tout le fichier.
+- journal : chaque mutation est ajoutée en une ligne compacte à un journal
+  (`tickets.json.journal`), replié périodiquement dans le snapshot par une
+  compaction en tâche de fond. Le coût d'une écriture ne dépend plus du
+  nombre de tickets stockés.
+
+Le format sur disque (snapshot et journal) est choisi par un codec :
+JSON compact (défaut), JSON indenté ou MessagePack (voir codecs.py).
+
+La concurrence entre workers (uvicorn --workers N) est gérée par des verrous
+fichiers : un verrou par ticket (réparti sur `lock_stripes` fichiers) couvre
+tout le cycle lecture-modification-écriture, et un verrou global court ne
+protège que la synchronisation et l'écriture physique.
 """
 import asyncio
-import json
 import logging
-from datetime import datetime
+import os
+import threading
+import zlib
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from fastapi import HTTPException
+from filelock import FileLock, Timeout
 
-from .interface import TicketStorage
+from .codecs import Codec, JSONCodec
+from .counters import TicketCounters
+from .index import TicketIndex
+from .interface import (
+    StatusCondition,
+    TicketStorage,
+    check_expected_status,
+    resolution_seconds,
+)
+from .pagination import cursor_key, ticket_cursor
 
 logger = logging.getLogger(__name__)
 
 
+def compute_status_changes(
+    ticket: dict, status: str, closed_at: Optional[str] = None
+) -> dict:
+    """Calculer les champs à modifier lors d'un changement de statut."""
+    changes = {"status": status}
+
+    # Si on ferme le ticket
+    if status == "fermé" and closed_at:
+        changes["closed_at"] = closed_at
+
+        # Calculer la durée de résolution
+        if "created_at" in ticket:
+            duration = resolution_seconds(ticket["created_at"], closed_at)
+            if duration is not None:
+                changes["resolution_duration"] = duration
+
+    # Si on réouvre le ticket
+    if status == "en cours" and ticket.get("status") == "fermé":
+        changes["closed_at"] = None
+        changes["resolution_duration"] = None
+
+    return changes
+
+
+@contextmanager
+def hold_lock(lock: FileLock):
+    """Acquérir un verrou fichier, en 503 si le stockage reste occupé."""
+    try:
+        lock.acquire()
+    except Timeout:
+        logger.error(f"Timeout acquiring storage lock: {lock.lock_file}")
+        raise HTTPException(status_code=503, detail="Stockage occupé, réessayez")
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def copy_ticket(ticket: dict) -> dict:
+    """Copier un ticket pour ne pas exposer l'état interne (messages inclus)."""
+    copied = dict(ticket)
+    if "messages" in copied:
+        copied["messages"] = list(copied["messages"])
+    return copied
+
+
+def ticket_header(ticket: dict) -> dict:
+    """
+    En-tête d'un ticket : tout sauf les messages, avec leur nombre et le
+    dernier message. Un en-tête déjà extrait est retourné tel quel (copie).
+    """
+    header = {k: v for k, v in ticket.items() if k != "messages"}
+    if "messages" in ticket:
+        messages = ticket["messages"] or []
+        header["message_count"] = len(messages)
+        header["last_message"] = messages[-1] if messages else None
+    return header
+
+
+def apply_record(tickets: Dict[str, dict], record: dict) -> Optional[str]:
+    """Rejouer un enregistrement du journal ; retourne l'ID du ticket touché."""
+    op = record.get("op")
+    if op == "put":
+        ticket = record["ticket"]
+        tickets[ticket["ticket_id"]] = ticket
+        return ticket["ticket_id"]
+    elif op == "msg":
+        ticket = tickets.get(record["id"])
+        if ticket is not None:
+            ticket.setdefault("messages", []).append(record["message"])
+        return record["id"]
+    elif op == "set":
+        ticket = tickets.get(record["id"])
+        if ticket is not None:
+            ticket.update(record["fields"])
+        return record["id"]
+    elif op == "del":
+        tickets.pop(record["id"], None)
+        return record["id"]
+    logger.warning(f"Unknown journal record ignored: {op}")
+    return None
+
+
 class JSONStorage(TicketStorage):
-    """Stockage des tickets dans un fichier JSON."""
+    """Stockage des tickets dans un fichier JSON, résident en mémoire."""
 
-    def __init__(self, file_path: Path):
+    def __init__(
+        self,
+        file_path: Path,
+        journal: bool = False,
+        compact_threshold: int = 1000,
+        lock_stripes: int = 64,
+        lock_timeout: float = 10.0,
+        codec: Optional[Codec] = None,
+    ):
         self.file_path = file_path
-        self._lock = asyncio.Lock()
-        logger.info(f"JSONStorage initialized with file: {file_path}")
-
-    async def _load_all(self) -> Dict[str, dict]:
-        """Charger tous les tickets depuis le fichier."""
-        async with self._lock:
-            if not self.file_path.exists():
-                return {}
+        self.journal = journal
+        # Par défaut : JSON indenté en mode snapshot, compact en mode journal
+        self.codec = codec or JSONCodec(pretty=not journal)
+        self.compact_threshold = compact_threshold
+        self.lock_timeout = lock_timeout
+
+        # Verrous inter-processus : global (court) et par ticket (cycle complet)
+        self._file_lock = FileLock(str(file_path) + ".lock", timeout=lock_timeout)
+        self.lock_dir = file_path.with_name(file_path.name + ".locks")
+        self._ticket_locks = [
+            FileLock(str(self.lock_dir / f"{i:03d}.lock"), timeout=lock_timeout)
+            for i in range(max(1, lock_stripes))
+        ]
+        # Verrou intra-processus protégeant l'état en mémoire
+        self._state_lock = threading.RLock()
+
+        # État résident et signatures des fichiers chargés
+        self.journal_path = file_path.with_name(file_path.name + ".journal")
+        self._tickets: Optional[Dict[str, dict]] = None
+        self._index = TicketIndex()
+        self._counters = TicketCounters()
+        self._snapshot_signature: Optional[Tuple[int, int, int]] = None
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._compaction_task: Optional[asyncio.Task] = None
+
+        logger.info(
+            f"JSONStorage initialized with file: {file_path} "
+            f"(mode={'journal' if journal else 'snapshot'}, codec={self.codec.name})"
+        )
+
+    # ------------------------------------------------------------------
+    # Verrous
+    # ------------------------------------------------------------------
+
+    def _ticket_lock(self, ticket_id: str) -> FileLock:
+        """Verrou du ticket (crc32 : stable d'un processus à l'autre)."""
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        index = zlib.crc32(ticket_id.encode("utf-8")) % len(self._ticket_locks)
+        return self._ticket_locks[index]
+
+    @contextmanager
+    def _synced(self):
+        """Verrou global + état mémoire synchronisé avec le disque."""
+        with hold_lock(self._file_lock), self._state_lock:
+            self._refresh()
+            yield self._tickets
+
+    # ------------------------------------------------------------------
+    # Synchronisation mémoire / disque
+    # ------------------------------------------------------------------
+
+    def _stat_signature(self, path: Path) -> Optional[Tuple[int, int, int]]:
+        """Identifier une version du fichier (inode, mtime, taille)."""
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _journal_size(self) -> int:
+        try:
+            return self.journal_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _read_snapshot(self) -> Dict[str, dict]:
+        """Lire le snapshot complet."""
+        if not self.file_path.exists():
+            return {}
+        try:
+            return self.codec.loads(self.file_path.read_bytes() or self.codec.dumps({}))
+        except Exception as e:
+            logger.exception(f"Error reading tickets file: {e}")
+            return {}
+
+    def _load_snapshot(self) -> None:
+        """Charger le snapshot en mémoire et reconstruire les index et compteurs."""
+        self._tickets = self._read_snapshot()
+        self._index = TicketIndex(self._tickets.values())
+        self._counters = TicketCounters(self._tickets.values())
+
+    def _apply(self, record: dict) -> None:
+        """Appliquer un enregistrement à l'état en mémoire, aux index et aux compteurs."""
+        ticket_id = apply_record(self._tickets, record)
+        if ticket_id is None:
+            return
+        ticket = self._tickets.get(ticket_id)
+        if ticket is None:
+            self._index.remove(ticket_id)
+            self._counters.remove(ticket_id)
+        else:
+            self._index.put(ticket)
+            self._counters.put(ticket)
+
+    def _write_snapshot(self) -> None:
+        """Écrire le snapshot de façon atomique (fichier temporaire + rename)."""
+        content = self.codec.dumps(self._tickets)
+        tmp_path = self.file_path.with_name(self.file_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
+        self._snapshot_signature = self._stat_signature(self.file_path)
+
+    def _refresh(self) -> None:
+        """
+        Synchroniser l'état en mémoire avec le disque.
+
+        Rechargement complet si le snapshot a changé (écriture ou compaction
+        par un autre processus) ; en mode journal, seule la fin du journal
+        est ensuite lue et rejouée.
+        """
+        signature = self._stat_signature(self.file_path)
+        if self._tickets is None or signature != self._snapshot_signature:
+            self._load_snapshot()
+            self._snapshot_signature = signature
+            self._journal_offset = 0
+            self._journal_records = 0
+            logger.debug(f"Tickets reloaded from {self.file_path}")
+
+        if not self.journal:
+            return
+
+        size = self._journal_size()
+        if size < self._journal_offset:
+            # Journal tronqué sans changement de snapshot : repartir de zéro
+            self._load_snapshot()
+            self._journal_offset = 0
+            self._journal_records = 0
+        if size == self._journal_offset:
+            return
+
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._journal_offset)
+            chunk = f.read(size - self._journal_offset)
+
+        # Ne consommer que les enregistrements complets
+        records, consumed = self.codec.iter_frames(chunk)
+        for record in records:
+            if record is None:
+                logger.warning("Unreadable journal record skipped")
+                continue
             try:
-                content = await asyncio.to_thread(
-                    lambda: self.file_path.read_text(encoding="utf-8")
-                )
-                return json.loads(content)
+                self._apply(record)
+                self._journal_records += 1
             except Exception as e:
-                logger.exception(f"Error reading tickets file: {e}")
-                return {}
+                logger.warning(f"Corrupted journal record skipped: {e}")
+        self._journal_offset += consumed
+
+    def _read_sync(self, reader):
+        """Exécuter `reader(tickets)` sur l'état synchronisé avec le disque."""
+        if self.journal:
+            # Le verrou global protège la lecture du journal contre une compaction
+            with self._synced() as tickets:
+                return reader(tickets)
+        # Le snapshot est remplacé atomiquement : lecture sans verrou fichier
+        with self._state_lock:
+            self._refresh()
+            return reader(self._tickets)
+
+    async def _read(self, reader):
+        """Lire l'état courant ; `reader` doit retourner des copies."""
+        return await asyncio.to_thread(self._read_sync, reader)
+
+    def _append_journal(self, payload: bytes) -> int:
+        """Ajouter des enregistrements encodés en fin de journal (sans fsync)."""
+        # Sous le verrou global, tout octet au-delà de l'offset est un
+        # enregistrement incomplet (écriture interrompue) : on le retire
+        if self._journal_size() > self._journal_offset:
+            os.truncate(self.journal_path, self._journal_offset)
+        with open(self.journal_path, "ab") as f:
+            f.write(payload)
+        self._journal_offset += len(payload)
+        return len(payload)
+
+    def _fsync_journal(self) -> None:
+        with open(self.journal_path, "rb+") as f:
+            os.fsync(f.fileno())
 
-    async def _save_all(self, tickets: Dict[str, dict]) -> None:
-        """Sauvegarder tous les tickets dans le fichier."""
-        async with self._lock:
+    def _mutate_sync(
+        self, ticket_id: str, mutation, return_ticket: bool = False
+    ) -> object:
+        """
+        Exécuter un cycle lecture-modification-écriture complet sur un ticket.
+
+        `mutation(tickets)` retourne `(records, result)` : les enregistrements
+        sont appliqués en mémoire puis persistés (ajout au journal, ou
+        réécriture du snapshot en mode snapshot).
+
+        Le verrou du ticket est tenu pendant tout le cycle. Le verrou global
+        n'est tenu que pour lire l'état puis pour écrire : le calcul,
+        l'encodage et le fsync de deux tickets différents se font en
+        parallèle, y compris entre workers.
+        """
+        with hold_lock(self._ticket_lock(ticket_id)):
+            with self._synced() as tickets:
+                records, result = mutation(tickets)
+            if not records:
+                return result
+
+            payload = self._encode_records(records)
+            with self._synced() as tickets:
+                self._persist(records, payload)
+                if return_ticket:
+                    result = copy_ticket(tickets[ticket_id])
+
+            if self.journal:
+                self._fsync_journal()
+        return result
+
+    def _encode_records(self, records: List[dict]) -> Optional[bytes]:
+        """Encoder des enregistrements pour le journal (hors verrou global)."""
+        if not self.journal:
+            return None
+        return b"".join(self.codec.frame(r) for r in records)
+
+    def _persist(self, records: List[dict], payload: Optional[bytes]) -> None:
+        """Appliquer et persister des enregistrements (sous le verrou global)."""
+        if self.journal:
+            self._append_journal(payload)
+            self._journal_records += len(records)
+        for record in records:
+            self._apply(record)
+        if not self.journal:
             try:
-                content = json.dumps(tickets, ensure_ascii=False, indent=2)
-                await asyncio.to_thread(
-                    lambda: self.file_path.write_text(content, encoding="utf-8")
-                )
+                self._write_snapshot()
             except Exception as e:
+                # Forcer un rechargement : la mémoire est en avance sur le disque
+                self._tickets = None
                 logger.exception(f"Error writing tickets file: {e}")
                 raise
 
+    async def _mutate(
+        self, ticket_id: str, mutation, return_ticket: bool = False
+    ) -> object:
+        """
+        Appliquer une mutation sur un ticket (journal ou snapshot).
+
+        Si `return_ticket` est vrai, retourne une copie du ticket après
+        application au lieu du résultat de la mutation.
+        """
+        result = await asyncio.to_thread(self._mutate_sync, ticket_id, mutation, return_ticket)
+        self._schedule_compaction()
+        return result
+
+    def _save_sync(self, records: List[dict]) -> None:
+        """Persister un lot d'enregistrements `put` (un seul ajout au journal)."""
+        # Écrasement sans lecture préalable : le verrou global suffit
+        payload = self._encode_records(records)
+        with self._synced():
+            self._persist(records, payload)
+        if self.journal:
+            self._fsync_journal()
+
+    # ------------------------------------------------------------------
+    # Compaction du journal
+    # ------------------------------------------------------------------
+
+    def _compact_sync(self) -> None:
+        """Replier le journal dans le snapshot (écriture atomique)."""
+        with self._synced():
+            if self._journal_records == 0 and self.file_path.exists():
+                return
+            self._write_snapshot()
+            # Le journal est vidé après le remplacement du snapshot
+            with open(self.journal_path, "wb"):
+                pass
+            self._journal_offset = 0
+            self._journal_records = 0
+        logger.info(f"Journal compacted into {self.file_path}")
+
+    async def compact(self) -> None:
+        """Forcer la compaction du journal dans le snapshot."""
+        if not self.journal:
+            return
+        await asyncio.to_thread(self._compact_sync)
+
+    def _schedule_compaction(self) -> None:
+        """Lancer une compaction en tâche de fond si le journal est trop long."""
+        if not self.journal or self._journal_records < self.compact_threshold:
+            return
+        if self._compaction_task and not self._compaction_task.done():
+            return
+        self._compaction_task = asyncio.get_running_loop().create_task(self._run_compaction())
+
+    async def _run_compaction(self) -> None:
+        try:
+            await self.compact()
+        except Exception as e:
+            logger.exception(f"Journal compaction failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Opérations
+    # ------------------------------------------------------------------
+
     async def save_ticket(self, ticket: dict) -> None:
         """Sauvegarder un ticket."""
-        tickets = await self._load_all()
-        tickets[ticket["ticket_id"]] = ticket
-        await self._save_all(tickets)
+        record = {"op": "put", "ticket": copy_ticket(ticket)}
+        await self._mutate(ticket["ticket_id"], lambda tickets: ([record], None))
         logger.info(f"Ticket saved: {ticket['ticket_id']}")
 
-    async def get_ticket(self, ticket_id: str) -> dict:
-        """Récupérer un ticket par son ID."""
-        tickets = await self._load_all()
-        if ticket_id not in tickets:
+    async def save_tickets(self, tickets: Iterable[dict]) -> int:
+        """
+        Sauvegarder plusieurs tickets : un seul ajout au journal (ou une seule
+        réécriture du snapshot) pour tout le lot.
+        """
+        records = [{"op": "put", "ticket": copy_ticket(ticket)} for ticket in tickets]
+        if not records:
+            return 0
+
+        await asyncio.to_thread(self._save_sync, records)
+        self._schedule_compaction()
+        logger.info(f"{len(records)} tickets saved")
+        return len(records)
+
+    async def get_ticket(self, ticket_id: str, include_messages: bool = True) -> dict:
+        """Récupérer un ticket par son ID (en-tête seul si `include_messages` est faux)."""
+        view = copy_ticket if include_messages else ticket_header
+        ticket = await self._read(
+            lambda tickets: view(tickets[ticket_id]) if ticket_id in tickets else None
+        )
+        if ticket is None:
             raise HTTPException(status_code=404, detail="Ticket non trouvé")
-        return tickets[ticket_id]
+        return ticket
+
+    async def get_tickets(
+        self, ticket_ids: Iterable[str], include_messages: bool = True
+    ) -> List[dict]:
+        """Récupérer plusieurs tickets en une seule lecture de l'état."""
+        view = copy_ticket if include_messages else ticket_header
+        ticket_ids = list(dict.fromkeys(ticket_ids))
+        return await self._read(
+            lambda tickets: [view(tickets[t]) for t in ticket_ids if t in tickets]
+        )
 
     async def list_tickets(
         self,
@@ -70,108 +486,150 @@ class JSONStorage(TicketStorage):
         channel: Optional[str] = None,
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        include_messages: bool = True,
     ) -> List[dict]:
-        """Lister les tickets avec filtres optionnels."""
-        tickets = await self._load_all()
-        result = list(tickets.values())
+        """Lister les tickets avec filtres optionnels (via les index secondaires)."""
+        view = copy_ticket if include_messages else ticket_header
 
-        # Filtrer par statut
-        if status:
-            result = [t for t in result if t.get("status") == status]
+        def reader(tickets):
+            ticket_ids = self._index.query(
+                date_from=date_from,
+                date_to=date_to,
+                status=status,
+                channel=channel,
+                assigned_to=assigned_to,
+                urgency=urgency,
+            )
+            # Déjà trié par date de création (plus récent en premier)
+            return [view(tickets[ticket_id]) for ticket_id in ticket_ids]
 
-        # Filtrer par canal
-        if channel:
-            result = [t for t in result if t.get("channel") == channel]
+        return await self._read(reader)
 
-        # Filtrer par date de création (from)
-        if date_from:
-            result = [t for t in result if t.get("created_at", "") >= date_from]
+    async def list_tickets_page(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        include_messages: bool = True,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Lister une page de tickets : l'index s'arrête après `limit` résultats."""
+        view = copy_ticket if include_messages else ticket_header
+        before = cursor_key(cursor)
 
-        # Filtrer par date de création (to)
-        if date_to:
-            result = [t for t in result if t.get("created_at", "") <= date_to]
+        def reader(tickets):
+            ticket_ids = self._index.query(
+                date_from=date_from,
+                date_to=date_to,
+                before=before,
+                limit=limit + 1,
+                status=status,
+                channel=channel,
+                assigned_to=assigned_to,
+                urgency=urgency,
+            )
+            return [view(tickets[ticket_id]) for ticket_id in ticket_ids]
 
-        # Trier par date de création (plus récent en premier)
-        result.sort(key=lambda t: t.get("created_at", ""), reverse=True)
+        tickets = await self._read(reader)
+        page = tickets[:limit]
+        next_cursor = ticket_cursor(page[-1]) if page and len(tickets) > limit else None
+        return page, next_cursor
 
-        return result
+    async def count_tickets(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+    ) -> int:
+        """Compter les tickets sur les index, sans copier aucun ticket."""
+        return await self._read(lambda tickets: len(self._index.query(
+            date_from=date_from,
+            date_to=date_to,
+            status=status,
+            channel=channel,
+            assigned_to=assigned_to,
+            urgency=urgency,
+        )))
 
     async def update_ticket_status(
-        self, ticket_id: str, status: str, closed_at: Optional[str] = None
+        self,
+        ticket_id: str,
+        status: str,
+        closed_at: Optional[str] = None,
+        expected_status: StatusCondition = None,
     ) -> dict:
         """Mettre à jour le statut d'un ticket."""
-        tickets = await self._load_all()
-        
-        if ticket_id not in tickets:
-            raise HTTPException(status_code=404, detail="Ticket non trouvé")
+        old_status = None
 
-        ticket = tickets[ticket_id]
-        old_status = ticket.get("status")
-        ticket["status"] = status
-
-        # Si on ferme le ticket
-        if status == "fermé" and closed_at:
-            ticket["closed_at"] = closed_at
-            
-            # Calculer la durée de résolution
-            if "created_at" in ticket:
-                try:
-                    created = datetime.fromisoformat(ticket["created_at"].replace("Z", "+00:00"))
-                    closed = datetime.fromisoformat(closed_at.replace("Z", "+00:00"))
-                    duration = (closed - created).total_seconds()
-                    ticket["resolution_duration"] = int(duration)
-                except Exception as e:
-                    logger.warning(f"Could not calculate resolution duration: {e}")
-
-        # Si on réouvre le ticket
-        if status == "en cours" and old_status == "fermé":
-            ticket["closed_at"] = None
-            ticket["resolution_duration"] = None
-
-        await self._save_all(tickets)
+        def mutation(tickets):
+            nonlocal old_status
+            if ticket_id not in tickets:
+                raise HTTPException(status_code=404, detail="Ticket non trouvé")
+            ticket = tickets[ticket_id]
+            check_expected_status(ticket, expected_status)
+            old_status = ticket.get("status")
+            changes = compute_status_changes(ticket, status, closed_at)
+            return [{"op": "set", "id": ticket_id, "fields": changes}], None
+
+        ticket = await self._mutate(ticket_id, mutation, return_ticket=True)
         logger.info(f"Ticket {ticket_id} status updated: {old_status} -> {status}")
-        
         return ticket
 
     async def ticket_exists(self, ticket_id: str) -> bool:
         """Vérifier si un ticket existe."""
-        tickets = await self._load_all()
-        return ticket_id in tickets
+        return await self._read(lambda tickets: ticket_id in tickets)
+
+    async def get_ticket_stats(self, days: int = 30) -> dict:
+        """Totaux du dashboard, lus sur les compteurs maintenus en mémoire."""
+        return await self._read(lambda tickets: self._counters.stats(days))
 
     async def add_message(self, ticket_id: str, message: dict) -> None:
         """Ajouter un message à un ticket."""
-        tickets = await self._load_all()
-        if ticket_id not in tickets:
-            raise HTTPException(status_code=404, detail="Ticket non trouvé")
-        
-        if "messages" not in tickets[ticket_id]:
-            tickets[ticket_id]["messages"] = []
-            
-        tickets[ticket_id]["messages"].append(message)
-        await self._save_all(tickets)
+        def mutation(tickets):
+            if ticket_id not in tickets:
+                raise HTTPException(status_code=404, detail="Ticket non trouvé")
+            return [{"op": "msg", "id": ticket_id, "message": message}], None
+
+        await self._mutate(ticket_id, mutation)
         logger.info(f"Message added to ticket {ticket_id}")
 
-    async def update_ticket(self, ticket_id: str, updates: dict) -> dict:
+    async def update_ticket(
+        self, ticket_id: str, updates: dict, expected_status: StatusCondition = None
+    ) -> dict:
         """Mettre à jour un ticket."""
-        tickets = await self._load_all()
-        if ticket_id not in tickets:
-            raise HTTPException(status_code=404, detail="Ticket non trouvé")
+        def mutation(tickets):
+            if ticket_id not in tickets:
+                raise HTTPException(status_code=404, detail="Ticket non trouvé")
+            check_expected_status(tickets[ticket_id], expected_status)
+            return [{"op": "set", "id": ticket_id, "fields": updates}], None
 
-        ticket = tickets[ticket_id]
-        ticket.update(updates)
-        
-        await self._save_all(tickets)
+        ticket = await self._mutate(ticket_id, mutation, return_ticket=True)
         logger.info(f"Ticket updated: {ticket_id}")
         return ticket
 
     async def delete_ticket(self, ticket_id: str) -> None:
         """Supprimer un ticket."""
-        tickets = await self._load_all()
-        if ticket_id in tickets:
-            del tickets[ticket_id]
-            await self._save_all(tickets)
-            logger.info(f"Ticket deleted: {ticket_id}")
+        def mutation(tickets):
+            if ticket_id not in tickets:
+                raise HTTPException(status_code=404, detail="Ticket non trouvé")
+            return [{"op": "del", "id": ticket_id}], None
+
+        await self._mutate(ticket_id, mutation)
+        logger.info(f"Ticket deleted: {ticket_id}")
 
     async def close(self) -> None:
-        """Fermer les connexions (rien à faire pour JSON)."""
+        """Fermer le stockage (compaction finale du journal en mode journal)."""
+        if self.journal:
+            if self._compaction_task and not self._compaction_task.done():
+                await self._compaction_task
+            await self.compact()
         logger.info("JSONStorage closed")
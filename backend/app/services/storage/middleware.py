@@ -0,0 +1,291 @@
+"""
+Middlewares de stockage : décorateurs empilables autour d'un `TicketStorage`.
+
+`StorageMiddleware` délègue chaque opération au stockage décoré via un seul
+point d'extension, `_call(operation, method, *args, **kwargs)` : une couche
+n'a qu'à surcharger `_call` pour s'appliquer à toutes les opérations, quel
+que soit le backend (chaque page de `iter_tickets` passe aussi par `_call`).
+
+Couches disponibles (voir `wrap_storage` et STORAGE_MIDDLEWARE) :
+- `cache`   : cache de lecture (`cache.CachedStorage`) ;
+- `metrics` : histogrammes de latence et erreurs par opération ;
+- `slowlog` : log des appels plus lents qu'un seuil ;
+- `faults`  : latence et erreurs artificielles, pour les tests de charge.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from .interface import TicketStorage
+
+logger = logging.getLogger(__name__)
+
+
+class StorageMiddleware(TicketStorage):
+    """Décorateur de `TicketStorage` qui fait passer chaque opération par `_call`."""
+
+    def __init__(self, storage: TicketStorage):
+        self.storage = storage
+
+    def __getattr__(self, name: str) -> Any:
+        # Attributs propres aux couches inférieures (codec, cache_stats, ...)
+        if name == "storage":
+            raise AttributeError(name)
+        return getattr(self.storage, name)
+
+    async def _call(self, operation: str, method: Callable, *args, **kwargs) -> Any:
+        """Exécuter une opération du stockage décoré (point d'extension des couches)."""
+        return await method(*args, **kwargs)
+
+    async def save_ticket(self, *args, **kwargs) -> None:
+        return await self._call("save_ticket", self.storage.save_ticket, *args, **kwargs)
+
+    async def get_ticket(self, *args, **kwargs) -> dict:
+        return await self._call("get_ticket", self.storage.get_ticket, *args, **kwargs)
+
+    async def get_tickets(self, *args, **kwargs) -> List[dict]:
+        return await self._call("get_tickets", self.storage.get_tickets, *args, **kwargs)
+
+    async def save_tickets(self, *args, **kwargs) -> int:
+        return await self._call("save_tickets", self.storage.save_tickets, *args, **kwargs)
+
+    async def list_tickets(self, *args, **kwargs) -> List[dict]:
+        return await self._call("list_tickets", self.storage.list_tickets, *args, **kwargs)
+
+    async def list_tickets_page(self, *args, **kwargs) -> Tuple[List[dict], Optional[str]]:
+        return await self._call("list_tickets_page", self.storage.list_tickets_page, *args, **kwargs)
+
+    async def iter_tickets(self, *args, **kwargs) -> AsyncIterator[List[dict]]:
+        pages = self.storage.iter_tickets(*args, **kwargs)
+        try:
+            while True:
+                page = await self._call("iter_tickets", anext, pages, None)
+                if page is None:
+                    return
+                yield page
+        finally:
+            await pages.aclose()
+
+    async def count_tickets(self, *args, **kwargs) -> int:
+        return await self._call("count_tickets", self.storage.count_tickets, *args, **kwargs)
+
+    async def list_ticket_summaries(self, *args, **kwargs) -> Tuple[List[dict], Optional[str]]:
+        return await self._call(
+            "list_ticket_summaries", self.storage.list_ticket_summaries, *args, **kwargs
+        )
+
+    async def get_ticket_stats(self, *args, **kwargs) -> dict:
+        return await self._call("get_ticket_stats", self.storage.get_ticket_stats, *args, **kwargs)
+
+    async def update_ticket_status(self, *args, **kwargs) -> dict:
+        return await self._call(
+            "update_ticket_status", self.storage.update_ticket_status, *args, **kwargs
+        )
+
+    async def ticket_exists(self, *args, **kwargs) -> bool:
+        return await self._call("ticket_exists", self.storage.ticket_exists, *args, **kwargs)
+
+    async def add_message(self, *args, **kwargs) -> None:
+        return await self._call("add_message", self.storage.add_message, *args, **kwargs)
+
+    async def update_ticket(self, *args, **kwargs) -> dict:
+        return await self._call("update_ticket", self.storage.update_ticket, *args, **kwargs)
+
+    async def delete_ticket(self, *args, **kwargs) -> None:
+        return await self._call("delete_ticket", self.storage.delete_ticket, *args, **kwargs)
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+
+def _is_error(error: Exception) -> bool:
+    """Les 4xx (ticket inconnu, conflit de statut) sont des réponses normales."""
+    return not (isinstance(error, HTTPException) and error.status_code < 500)
+
+
+class LatencyHistogram:
+    """Histogramme de latence à seaux fixes (bornes supérieures en ms)."""
+
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float, error: bool = False) -> None:
+        index = next(
+            (i for i, bound in enumerate(self.BUCKETS_MS) if elapsed_ms <= bound),
+            len(self.BUCKETS_MS),
+        )
+        self.counts[index] += 1
+        self.count += 1
+        self.errors += error
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Borne supérieure du seau contenant le quantile `q` (max au-delà du dernier seau)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.max_ms), 2)
+        return round(self.max_ms, 2)
+
+    def stats(self) -> Dict[str, Any]:
+        labels = [str(bound) for bound in self.BUCKETS_MS] + ["+Inf"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class MetricsStorage(StorageMiddleware):
+    """Latence (histogramme) et erreurs par opération, exposées par `metrics_stats`."""
+
+    def __init__(self, storage: TicketStorage, clock=time.perf_counter):
+        super().__init__(storage)
+        self._clock = clock
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    async def _call(self, operation: str, method: Callable, *args, **kwargs) -> Any:
+        start = self._clock()
+        error = False
+        try:
+            return await method(*args, **kwargs)
+        except Exception as e:
+            error = _is_error(e)
+            raise
+        finally:
+            histogram = self.histograms.setdefault(operation, LatencyHistogram())
+            histogram.observe((self._clock() - start) * 1000, error)
+
+    def metrics_stats(self) -> Dict[str, Any]:
+        """Statistiques par opération, triées par nom."""
+        return {name: self.histograms[name].stats() for name in sorted(self.histograms)}
+
+
+class SlowCallLogStorage(StorageMiddleware):
+    """Log (warning) des opérations plus lentes que `threshold_ms`."""
+
+    def __init__(self, storage: TicketStorage, threshold_ms: float = 500, clock=time.perf_counter):
+        super().__init__(storage)
+        self.threshold_ms = threshold_ms
+        self._clock = clock
+
+    async def _call(self, operation: str, method: Callable, *args, **kwargs) -> Any:
+        start = self._clock()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            elapsed_ms = (self._clock() - start) * 1000
+            if elapsed_ms >= self.threshold_ms:
+                # L'ID du ticket est le premier argument des opérations unitaires
+                target = f" {args[0]}" if args and isinstance(args[0], str) else ""
+                logger.warning(
+                    f"Slow storage call: {operation}{target} took {elapsed_ms:.0f} ms "
+                    f"({type(self.storage).__name__})"
+                )
+
+
+class FaultInjectionStorage(StorageMiddleware):
+    """
+    Latence et erreurs artificielles, pour les tests de charge : chaque
+    opération visée attend `latency_ms` (+ jusqu'à `jitter_ms`), puis échoue
+    en 503 avec la probabilité `error_rate`. `operations` vide = toutes.
+    """
+
+    def __init__(
+        self,
+        storage: TicketStorage,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0.0,
+        operations: Iterable[str] = (),
+        rng=random.random,
+    ):
+        super().__init__(storage)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.operations = frozenset(operations)
+        self._rng = rng
+        self.injected = {"delayed": 0, "errors": 0}
+
+    async def _call(self, operation: str, method: Callable, *args, **kwargs) -> Any:
+        if self.operations and operation not in self.operations:
+            return await method(*args, **kwargs)
+        delay_ms = self.latency_ms + self._rng() * self.jitter_ms
+        if delay_ms > 0:
+            self.injected["delayed"] += 1
+            await asyncio.sleep(delay_ms / 1000)
+        if self.error_rate and self._rng() < self.error_rate:
+            self.injected["errors"] += 1
+            raise HTTPException(status_code=503, detail=f"Erreur de stockage injectée ({operation})")
+        return await method(*args, **kwargs)
+
+    def fault_stats(self) -> Dict[str, Any]:
+        return {
+            **self.injected,
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "error_rate": self.error_rate,
+        }
+
+
+def wrap_storage(storage: TicketStorage, names: Iterable[str]) -> TicketStorage:
+    """
+    Empiler les couches `names` autour d'un stockage, dans l'ordre donné :
+    la première enveloppe le backend, la dernière reçoit les appels. Par
+    exemple `cache,metrics` mesure la latence vue par les routers (hits du
+    cache compris), `metrics,cache` celle du seul backend.
+
+    Les paramètres des couches sont lus dans la configuration.
+    """
+    from app.core.config import (
+        STORAGE_CACHE_SIZE,
+        STORAGE_CACHE_TTL,
+        STORAGE_SLOW_CALL_MS,
+        STORAGE_FAULT_LATENCY_MS,
+        STORAGE_FAULT_JITTER_MS,
+        STORAGE_FAULT_ERROR_RATE,
+        STORAGE_FAULT_OPERATIONS,
+    )
+    for name in names:
+        if name == "cache":
+            if STORAGE_CACHE_SIZE <= 0:
+                continue
+            from .cache import CachedStorage, shared_cache
+            storage = CachedStorage(storage, shared_cache(STORAGE_CACHE_SIZE, STORAGE_CACHE_TTL))
+        elif name == "metrics":
+            storage = MetricsStorage(storage)
+        elif name == "slowlog":
+            storage = SlowCallLogStorage(storage, threshold_ms=STORAGE_SLOW_CALL_MS)
+        elif name == "faults":
+            storage = FaultInjectionStorage(
+                storage,
+                latency_ms=STORAGE_FAULT_LATENCY_MS,
+                jitter_ms=STORAGE_FAULT_JITTER_MS,
+                error_rate=STORAGE_FAULT_ERROR_RATE,
+                operations=STORAGE_FAULT_OPERATIONS,
+            )
+        else:
+            raise ValueError(f"Unknown storage middleware: {name}")
+        logger.info(f"Storage middleware enabled: {name}")
+    return storage
@@ -0,0 +1,49 @@
+"""
+Curseurs de pagination opaques pour `list_tickets_page`.
+
+Un curseur encode (en base64 URL-safe) la position où reprendre le listing :
+pour les stockages fichiers/SQLite, la clé de tri `(created_at, ticket_id)`
+du dernier ticket servi ; pour DynamoDB, le `LastEvaluatedKey`. Le client
+le renvoie tel quel, sans l'interpréter.
+"""
+import base64
+import json
+from typing import Optional
+
+from fastapi import HTTPException
+
+
+def encode_cursor(position: dict) -> str:
+    """Encoder une position de reprise en curseur opaque."""
+    raw = json.dumps(position, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    """Décoder un curseur (400 s'il est invalide)."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    if not isinstance(position, dict):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    return position
+
+
+def ticket_cursor(ticket: dict) -> str:
+    """Curseur positionné après `ticket` (ordre created_at puis ticket_id décroissants)."""
+    return encode_cursor({"created_at": ticket.get("created_at") or "", "ticket_id": ticket["ticket_id"]})
+
+
+def cursor_key(cursor: Optional[str]) -> Optional[tuple]:
+    """Clé de tri `(created_at, ticket_id)` d'un curseur de ticket."""
+    position = decode_cursor(cursor)
+    if position is None:
+        return None
+    try:
+        return (str(position["created_at"]), str(position["ticket_id"]))
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
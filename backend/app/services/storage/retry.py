@@ -0,0 +1,182 @@
+"""
+Contrôleur de retry adaptatif partagé par toutes les requêtes DynamoDB.
+
+- Backoff exponentiel « full jitter » : attente tirée dans [0, min(max, base * 2^n)],
+  pour que les requêtes throttlées en même temps ne repartent pas ensemble.
+- Token bucket partagé : tant qu'aucun throttling n'est observé, aucune
+  limite ; au premier throttling, le débit autorisé tombe à la moitié du
+  débit mesuré, puis remonte à chaque succès jusqu'à lever la limite.
+- Budget de retry partagé : chaque retry consomme des jetons, chaque succès
+  en rend un ; budget épuisé = échec immédiat au lieu d'une vague de retries.
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Codes DynamoDB indiquant un dépassement de capacité
+THROTTLING_CODES = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+}
+# Erreurs serveur transitoires, retentées sans ralentir les autres appels
+TRANSIENT_CODES = {"InternalServerError", "ServiceUnavailable"}
+
+
+class AdaptiveRetry:
+    """Politique de retry et limiteur de débit communs à un stockage."""
+
+    # Jetons de budget consommés par un retry, rendus un par un aux succès
+    RETRY_COST = 5
+    # Facteur appliqué au débit lors d'un throttling
+    BACKOFF_FACTOR = 0.5
+    # Débit (req/s) regagné par succès tant que la limite est active
+    RECOVERY_STEP = 0.05
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 0.05,
+        max_delay: float = 2.0,
+        retry_budget: int = 500,
+        min_rate: float = 1.0,
+        clock=time.monotonic,
+        rng=random.random,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self.min_rate = min_rate
+        self._clock = clock
+        self._rng = rng
+
+        # Débit autorisé (req/s) ; None = pas de limite
+        self.rate: Optional[float] = None
+        self._ceiling = 0.0
+        self._tokens = 0.0
+        self._last_refill = clock()
+        # Verrou de thread et non asyncio.Lock : le contrôleur est partagé par
+        # le processus et peut servir plusieurs boucles (asyncio.run successifs,
+        # scripts, rechargement uvicorn) ; il n'est tenu que le temps d'un calcul
+        self._lock = threading.Lock()
+        self._budget = float(retry_budget)
+
+        # Débit mesuré sur des fenêtres d'une seconde
+        self._window_start = clock()
+        self._window_count = 0
+        self._measured_rate = 0.0
+
+        self.counters = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "throttled": 0,
+            "delayed": 0,
+            "budget_exhausted": 0,
+            "failed": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Débit
+    # ------------------------------------------------------------------
+    def _record_send(self) -> None:
+        now = self._clock()
+        self._window_count += 1
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self._measured_rate = self._window_count / elapsed
+            self._window_start = now
+            self._window_count = 0
+
+    def _current_rate(self) -> float:
+        elapsed = max(self._clock() - self._window_start, 1e-3)
+        return max(self._measured_rate, self._window_count / max(elapsed, 1.0))
+
+    def _refill(self) -> None:
+        now = self._clock()
+        if self.rate is not None:
+            capacity = max(1.0, self.rate)
+            self._tokens = min(capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    async def acquire(self) -> None:
+        """Attendre un jeton avant un envoi (immédiat tant qu'aucune limite n'est active)."""
+        self.counters["attempts"] += 1
+        self._record_send()
+        if self.rate is None:
+            return
+        with self._lock:
+            if self.rate is None:
+                return
+            # Réserver le jeton tout de suite (solde négatif = envois déjà
+            # promis) et attendre hors du verrou qu'il soit regagné
+            self._refill()
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 and self.rate else 0.0
+        if wait:
+            self.counters["delayed"] += 1
+            await asyncio.sleep(wait)
+
+    # ------------------------------------------------------------------
+    # Résultats
+    # ------------------------------------------------------------------
+    def on_success(self) -> None:
+        self._budget = min(self.retry_budget, self._budget + 1)
+        if self.rate is None:
+            return
+        with self._lock:
+            if self.rate is not None:
+                self.rate += self.RECOVERY_STEP
+                if self.rate >= self._ceiling:
+                    # Débit d'avant le throttling retrouvé : lever la limite
+                    self.rate = None
+
+    def on_throttle(self) -> None:
+        self.counters["throttled"] += 1
+        with self._lock:
+            self._refill()
+            base = self.rate if self.rate is not None else self._current_rate()
+            if self.rate is None:
+                self._ceiling = max(base, self.min_rate)
+                self._tokens = 0.0
+            self.rate = max(self.min_rate, base * self.BACKOFF_FACTOR)
+
+    def take_retry(self, attempt: int) -> bool:
+        """Autoriser un nouvel essai (nombre d'essais et budget partagé)."""
+        if attempt >= self.max_attempts:
+            return False
+        if self._budget < self.RETRY_COST:
+            self.counters["budget_exhausted"] += 1
+            return False
+        self._budget -= self.RETRY_COST
+        self.counters["retries"] += 1
+        return True
+
+    def backoff(self, attempt: int) -> float:
+        """Attente avant l'essai suivant (full jitter)."""
+        return self._rng() * min(self.max_delay, self.base_delay * (2 ** attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs et état du limiteur."""
+        return {
+            **self.counters,
+            "rate_limit": round(self.rate, 2) if self.rate is not None else None,
+            "retry_budget": int(self._budget),
+        }
+
+
+_shared_retry: Optional[AdaptiveRetry] = None
+
+
+def shared_retry(**kwargs) -> AdaptiveRetry:
+    """
+    Contrôleur unique du processus : les instances DynamoDBStorage créées par
+    la factory visent la même table et doivent ralentir ensemble.
+    """
+    global _shared_retry
+    if _shared_retry is None:
+        _shared_retry = AdaptiveRetry(**kwargs)
+    return _shared_retry
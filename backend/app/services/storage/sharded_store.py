@@ -0,0 +1,347 @@
+"""
+Implémentation JSON shardée du stockage des tickets.
+
+Chaque ticket est stocké dans son propre fichier, réparti dans des
+sous-dossiers par hash (`tickets/<xx>/<ticket_id>.json`, ou `.msgpack` selon
+le codec). Un manifeste (`tickets/manifest.json`, en mode journal) garde
+l'en-tête de chaque ticket (tout sauf les messages, avec leur nombre et le
+dernier message) : listings, filtres et consultations d'en-tête ne lisent
+jamais les fichiers des tickets.
+
+Ajouter un message ne réécrit que le fichier du ticket concerné et son
+en-tête : le coût ne dépend plus du nombre de tickets stockés. L'en-tête est
+réécrit sous le verrou du ticket, dans le même cycle que son fichier : deux
+workers ne peuvent pas le laisser en retard, ni le réinsérer après une
+suppression.
+"""
+import asyncio
+import logging
+import os
+import re
+import zlib
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from filelock import FileLock
+
+from .codecs import Codec, JSONCodec
+from .interface import StatusCondition, TicketStorage, check_expected_status
+from .json_store import (
+    JSONStorage,
+    compute_status_changes,
+    copy_ticket,
+    hold_lock,
+    ticket_header,
+)
+
+logger = logging.getLogger(__name__)
+
+# Les IDs servent de noms de fichiers : refuser tout ce qui pourrait sortir du dossier
+TICKET_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9._-]*$")
+
+
+class ShardedJSONStorage(TicketStorage):
+    """Stockage des tickets dans un fichier JSON par ticket."""
+
+    def __init__(
+        self,
+        base_dir: Path,
+        shard_count: int = 256,
+        compact_threshold: int = 1000,
+        lock_stripes: int = 64,
+        lock_timeout: float = 10.0,
+        codec: Optional[Codec] = None,
+    ):
+        self.base_dir = base_dir
+        self.shard_count = shard_count
+        self.codec = codec or JSONCodec()
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+
+        self.lock_dir = base_dir / "locks"
+        self.lock_dir.mkdir(exist_ok=True)
+        self._ticket_locks = [
+            FileLock(str(self.lock_dir / f"{i:03d}.lock"), timeout=lock_timeout)
+            for i in range(max(1, lock_stripes))
+        ]
+
+        # Le manifeste est lui-même un JSONStorage en mode journal (en-têtes seuls)
+        self.manifest = JSONStorage(
+            file_path=base_dir / f"manifest{self.codec.suffix}",
+            journal=True,
+            compact_threshold=compact_threshold,
+            lock_stripes=lock_stripes,
+            lock_timeout=lock_timeout,
+            codec=self.codec,
+        )
+        logger.info(f"ShardedJSONStorage initialized in: {base_dir} (codec={self.codec.name})")
+
+    # ------------------------------------------------------------------
+    # Fichiers des tickets
+    # ------------------------------------------------------------------
+
+    def _shard_key(self, ticket_id: str) -> int:
+        return zlib.crc32(ticket_id.encode("utf-8"))
+
+    def _ticket_path(self, ticket_id: str) -> Path:
+        if not TICKET_ID_PATTERN.match(ticket_id):
+            raise HTTPException(status_code=404, detail="Ticket non trouvé")
+        shard = self._shard_key(ticket_id) % self.shard_count
+        return self.base_dir / f"{shard:02x}" / f"{ticket_id}{self.codec.suffix}"
+
+    def _lock_index(self, ticket_id: str) -> int:
+        return self._shard_key(ticket_id) % len(self._ticket_locks)
+
+    def _ticket_lock(self, ticket_id: str) -> FileLock:
+        return self._ticket_locks[self._lock_index(ticket_id)]
+
+    def _read_ticket(self, ticket_id: str) -> Optional[dict]:
+        path = self._ticket_path(ticket_id)
+        try:
+            return self.codec.loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+
+    def _write_ticket(self, ticket: dict) -> None:
+        """Écrire le fichier d'un ticket de façon atomique."""
+        path = self._ticket_path(ticket["ticket_id"])
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(self.codec.dumps(ticket))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _read_tickets(self, headers: List[dict]) -> List[dict]:
+        """Lire les fichiers des tickets listés dans le manifeste."""
+        tickets = []
+        for header in headers:
+            ticket = self._read_ticket(header["ticket_id"])
+            if ticket is not None:
+                tickets.append(ticket)
+        return tickets
+
+    def _put_header_sync(self, ticket: dict) -> None:
+        """
+        Écrire l'en-tête complet d'un ticket dans le manifeste. À appeler
+        sous le verrou du ticket, après l'écriture de son fichier : l'en-tête
+        reflète toujours le fichier, et un manifeste incomplet (écriture
+        interrompue) est réparé au passage.
+        """
+        record = {"op": "put", "ticket": copy_ticket(ticket_header(ticket))}
+        self.manifest._mutate_sync(ticket["ticket_id"], lambda tickets: ([record], None))
+
+    def _modify_sync(self, ticket_id: str, modify) -> dict:
+        """Cycle lecture-modification-écriture du fichier d'un ticket et de son en-tête."""
+        with hold_lock(self._ticket_lock(ticket_id)):
+            ticket = self._read_ticket(ticket_id)
+            if ticket is None:
+                raise HTTPException(status_code=404, detail="Ticket non trouvé")
+            modify(ticket)
+            self._write_ticket(ticket)
+            self._put_header_sync(ticket)
+            return ticket
+
+    async def _modify(self, ticket_id: str, modify) -> dict:
+        ticket = await asyncio.to_thread(self._modify_sync, ticket_id, modify)
+        self.manifest._schedule_compaction()
+        return ticket
+
+    # ------------------------------------------------------------------
+    # Opérations
+    # ------------------------------------------------------------------
+
+    async def save_ticket(self, ticket: dict) -> None:
+        """Sauvegarder un ticket."""
+        def write():
+            with hold_lock(self._ticket_lock(ticket["ticket_id"])):
+                self._write_ticket(ticket)
+                self._put_header_sync(ticket)
+
+        await asyncio.to_thread(write)
+        self.manifest._schedule_compaction()
+        logger.info(f"Ticket saved: {ticket['ticket_id']}")
+
+    async def save_tickets(self, tickets: Iterable[dict]) -> int:
+        """Sauvegarder plusieurs tickets (en-têtes ajoutés au manifeste en un lot)."""
+        tickets = list(tickets)
+        if not tickets:
+            return 0
+
+        def write_all():
+            # Verrous des tickets du lot pris dans l'ordre des index (pas
+            # d'interblocage entre deux lots), tenus jusqu'à l'écriture des en-têtes
+            stripes = sorted({self._lock_index(ticket["ticket_id"]) for ticket in tickets})
+            with ExitStack() as stack:
+                for index in stripes:
+                    stack.enter_context(hold_lock(self._ticket_locks[index]))
+                for ticket in tickets:
+                    self._write_ticket(ticket)
+                self.manifest._save_sync(
+                    [{"op": "put", "ticket": copy_ticket(ticket_header(t))} for t in tickets]
+                )
+
+        await asyncio.to_thread(write_all)
+        self.manifest._schedule_compaction()
+        logger.info(f"{len(tickets)} tickets saved")
+        return len(tickets)
+
+    async def get_ticket(self, ticket_id: str, include_messages: bool = True) -> dict:
+        """Récupérer un ticket par son ID (en-tête servi par le manifeste)."""
+        if not include_messages:
+            try:
+                return await self.manifest.get_ticket(ticket_id)
+            except HTTPException as e:
+                if e.status_code != 404:
+                    raise
+            # Manifeste incomplet : repli sur le fichier du ticket
+        ticket = await asyncio.to_thread(self._read_ticket, ticket_id)
+        if ticket is None:
+            raise HTTPException(status_code=404, detail="Ticket non trouvé")
+        return ticket if include_messages else ticket_header(ticket)
+
+    async def get_tickets(
+        self, ticket_ids: Iterable[str], include_messages: bool = True
+    ) -> List[dict]:
+        """Récupérer plusieurs tickets (en-têtes servis par le manifeste)."""
+        headers = await self.manifest.get_tickets(ticket_ids)
+        if not include_messages:
+            return headers
+        return await asyncio.to_thread(self._read_tickets, headers)
+
+    async def list_tickets(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        include_messages: bool = True,
+    ) -> List[dict]:
+        """Lister les tickets : filtrage sur le manifeste, puis lecture des fichiers."""
+        headers = await self.manifest.list_tickets(
+            status=status,
+            channel=channel,
+            date_from=date_from,
+            date_to=date_to,
+            assigned_to=assigned_to,
+            urgency=urgency,
+        )
+        if not include_messages:
+            return headers
+        return await asyncio.to_thread(self._read_tickets, headers)
+
+    async def list_tickets_page(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        include_messages: bool = True,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Lister une page : pagination sur le manifeste, lecture des seuls fichiers de la page."""
+        headers, next_cursor = await self.manifest.list_tickets_page(
+            status=status,
+            channel=channel,
+            date_from=date_from,
+            date_to=date_to,
+            assigned_to=assigned_to,
+            urgency=urgency,
+            limit=limit,
+            cursor=cursor,
+        )
+        if not include_messages:
+            return headers, next_cursor
+        return await asyncio.to_thread(self._read_tickets, headers), next_cursor
+
+    async def count_tickets(self, *args, **kwargs) -> int:
+        """Compter les tickets sur le manifeste (aucun fichier lu)."""
+        return await self.manifest.count_tickets(*args, **kwargs)
+
+    async def update_ticket_status(
+        self,
+        ticket_id: str,
+        status: str,
+        closed_at: Optional[str] = None,
+        expected_status: StatusCondition = None,
+    ) -> dict:
+        """Mettre à jour le statut d'un ticket."""
+        changes = {}
+
+        def modify(ticket):
+            check_expected_status(ticket, expected_status)
+            changes["old_status"] = ticket.get("status")
+            changes["fields"] = compute_status_changes(ticket, status, closed_at)
+            ticket.update(changes["fields"])
+
+        ticket = await self._modify(ticket_id, modify)
+        logger.info(f"Ticket {ticket_id} status updated: {changes['old_status']} -> {status}")
+        return ticket
+
+    async def ticket_exists(self, ticket_id: str) -> bool:
+        """Vérifier si un ticket existe."""
+        return await self.manifest.ticket_exists(ticket_id)
+
+    async def get_ticket_stats(self, days: int = 30) -> dict:
+        """Totaux du dashboard (compteurs du manifeste)."""
+        return await self.manifest.get_ticket_stats(days)
+
+    async def add_message(self, ticket_id: str, message: dict) -> None:
+        """Ajouter un message à un ticket (seuls son fichier et son en-tête sont réécrits)."""
+        await self._modify(
+            ticket_id, lambda ticket: ticket.setdefault("messages", []).append(message)
+        )
+        logger.info(f"Message added to ticket {ticket_id}")
+
+    async def update_ticket(
+        self, ticket_id: str, updates: dict, expected_status: StatusCondition = None
+    ) -> dict:
+        """Mettre à jour un ticket."""
+        def modify(ticket):
+            check_expected_status(ticket, expected_status)
+            ticket.update(updates)
+
+        ticket = await self._modify(ticket_id, modify)
+        logger.info(f"Ticket updated: {ticket_id}")
+        return ticket
+
+    async def delete_ticket(self, ticket_id: str) -> None:
+        """Supprimer un ticket."""
+        def remove_header(tickets):
+            if ticket_id not in tickets:
+                return [], False
+            return [{"op": "del", "id": ticket_id}], True
+
+        def remove():
+            # Fichier et en-tête supprimés sous le même verrou : une écriture
+            # concurrente ne peut pas réinsérer l'en-tête d'un ticket supprimé
+            with hold_lock(self._ticket_lock(ticket_id)):
+                try:
+                    self._ticket_path(ticket_id).unlink()
+                    removed = True
+                except (FileNotFoundError, HTTPException):
+                    removed = False
+                return self.manifest._mutate_sync(ticket_id, remove_header) or removed
+
+        if not await asyncio.to_thread(remove):
+            raise HTTPException(status_code=404, detail="Ticket non trouvé")
+        self.manifest._schedule_compaction()
+        logger.info(f"Ticket deleted: {ticket_id}")
+
+    async def import_tickets(self, tickets: Dict[str, dict]) -> int:
+        """Importer des tickets au format mono-fichier (`{ticket_id: ticket}`)."""
+        count = await self.save_tickets(tickets.values())
+        await self.manifest.compact()
+        return count
+
+    async def close(self) -> None:
+        """Fermer le stockage (compaction du manifeste)."""
+        await self.manifest.close()
+        logger.info("ShardedJSONStorage closed")
@@ -0,0 +1,517 @@
+"""
+Implémentation SQLite du stockage des tickets.
+
+Backend mono-nœud avec de vraies transactions : base en mode WAL (lecteurs
+non bloqués par l'écrivain, plusieurs workers possibles), messages dans leur
+propre table et index sur les colonnes filtrées par `list_tickets`. Les
+lectures d'en-tête (`include_messages=False`) ne chargent que le nombre de
+messages et le dernier d'entre eux.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from .codecs import JSONCodec
+from .index import indexed_values
+from .interface import StatusCondition, TicketStorage, check_expected_status
+from .json_store import compute_status_changes
+from .pagination import cursor_key, ticket_cursor
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket_id   TEXT PRIMARY KEY,
+    status      TEXT,
+    channel     TEXT,
+    created_at  TEXT,
+    assigned_to TEXT,
+    urgency     TEXT,
+    data        TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticket_id TEXT NOT NULL REFERENCES tickets(ticket_id) ON DELETE CASCADE,
+    data      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_channel ON tickets(channel, created_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON tickets(created_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_assigned_to ON tickets(assigned_to, created_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_urgency ON tickets(urgency, created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_ticket ON messages(ticket_id, id);
+"""
+
+
+# Les données restent du texte JSON (requêtables avec json_extract), encodé
+# et décodé via orjson quand il est installé
+_CODEC = JSONCodec()
+
+
+# En-tête + nombre de messages et dernier message (via idx_messages_ticket)
+HEADER_SELECT = """
+SELECT t.ticket_id, t.data,
+    (SELECT COUNT(*) FROM messages m WHERE m.ticket_id = t.ticket_id) AS message_count,
+    (SELECT m.data FROM messages m WHERE m.ticket_id = t.ticket_id
+     ORDER BY m.id DESC LIMIT 1) AS last_message
+FROM tickets t
+"""
+
+
+def _dumps(obj) -> str:
+    return _CODEC.dumps(obj).decode("utf-8")
+
+
+def _loads(data: str):
+    return _CODEC.loads(data)
+
+
+class SQLiteStorage(TicketStorage):
+    """Stockage des tickets dans une base SQLite (mode WAL)."""
+
+    def __init__(self, db_path: Path, busy_timeout: float = 10.0):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        # Créer le schéma dès l'initialisation
+        conn = self._connection()
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(tickets)")}
+        if existing and "urgency" not in existing:
+            # Base créée avant l'ajout de la colonne urgency
+            conn.execute("ALTER TABLE tickets ADD COLUMN urgency TEXT")
+            conn.execute("UPDATE tickets SET urgency = json_extract(data, '$.analytics.urgency')")
+        conn.executescript(SCHEMA)
+        logger.info(f"SQLiteStorage initialized with database: {db_path}")
+
+    # ------------------------------------------------------------------
+    # Connexions et transactions
+    # ------------------------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connexion propre au thread courant (sqlite3 n'est pas partageable)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                str(self.db_path),
+                timeout=self.busy_timeout,
+                isolation_level=None,  # transactions explicites
+                check_same_thread=False,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Transaction d'écriture (BEGIN IMMEDIATE : verrou pris dès le début)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    async def _run(self, fn, *args):
+        """Exécuter une fonction bloquante hors de la boucle asyncio."""
+        try:
+            return await asyncio.to_thread(fn, *args)
+        except HTTPException:
+            raise
+        except sqlite3.OperationalError as e:
+            logger.error(f"SQLite error: {e}")
+            raise HTTPException(status_code=503, detail="Database busy")
+        except sqlite3.Error as e:
+            logger.exception(f"SQLite error: {e}")
+            raise HTTPException(status_code=500, detail="Database error")
+
+    # ------------------------------------------------------------------
+    # Conversion lignes <-> tickets
+    # ------------------------------------------------------------------
+
+    def _write_header(self, conn: sqlite3.Connection, ticket: dict) -> None:
+        header = {k: v for k, v in ticket.items() if k != "messages"}
+        values = indexed_values(header)
+        columns = (
+            values["status"],
+            values["channel"],
+            header.get("created_at"),
+            values["assigned_to"],
+            values["urgency"],
+        )
+        conn.execute(
+            """
+            INSERT INTO tickets (ticket_id, status, channel, created_at, assigned_to, urgency, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(ticket_id) DO UPDATE SET
+                status = excluded.status,
+                channel = excluded.channel,
+                created_at = excluded.created_at,
+                assigned_to = excluded.assigned_to,
+                urgency = excluded.urgency,
+                data = excluded.data
+            """,
+            (ticket["ticket_id"], *columns, _dumps(header)),
+        )
+
+    def _replace_messages(self, conn: sqlite3.Connection, ticket_id: str, messages: List[dict]) -> None:
+        conn.execute("DELETE FROM messages WHERE ticket_id = ?", (ticket_id,))
+        conn.executemany(
+            "INSERT INTO messages (ticket_id, data) VALUES (?, ?)",
+            [(ticket_id, _dumps(m)) for m in messages],
+        )
+
+    def _read_header(self, conn: sqlite3.Connection, ticket_id: str) -> Optional[dict]:
+        row = conn.execute(
+            "SELECT data FROM tickets WHERE ticket_id = ?", (ticket_id,)
+        ).fetchone()
+        return _loads(row["data"]) if row else None
+
+    @staticmethod
+    def _filter_clauses(status, channel, date_from, date_to, assigned_to, urgency):
+        """Clauses WHERE (colonnes indexées) des filtres de listing."""
+        clauses, params = [], []
+        for column, value in (
+            ("status", status),
+            ("channel", channel),
+            ("assigned_to", assigned_to),
+            ("urgency", urgency),
+        ):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if date_from:
+            clauses.append("created_at >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("created_at <= ?")
+            params.append(date_to)
+        return clauses, params
+
+    def _row_header(self, row: sqlite3.Row) -> dict:
+        header = _loads(row["data"])
+        header["message_count"] = row["message_count"]
+        header["last_message"] = _loads(row["last_message"]) if row["last_message"] else None
+        return header
+
+    def _read_messages(self, conn: sqlite3.Connection, ticket_id: str) -> List[dict]:
+        rows = conn.execute(
+            "SELECT data FROM messages WHERE ticket_id = ? ORDER BY id", (ticket_id,)
+        ).fetchall()
+        return [_loads(r["data"]) for r in rows]
+
+    def _read_ticket(self, conn: sqlite3.Connection, ticket_id: str) -> Optional[dict]:
+        ticket = self._read_header(conn, ticket_id)
+        if ticket is not None:
+            ticket["messages"] = self._read_messages(conn, ticket_id)
+        return ticket
+
+    # ------------------------------------------------------------------
+    # Opérations
+    # ------------------------------------------------------------------
+
+    async def save_ticket(self, ticket: dict) -> None:
+        """Sauvegarder un ticket (en-tête et messages dans une transaction)."""
+        def save():
+            with self._transaction() as conn:
+                self._write_header(conn, ticket)
+                self._replace_messages(conn, ticket["ticket_id"], ticket.get("messages", []))
+
+        await self._run(save)
+        logger.info(f"Ticket saved: {ticket['ticket_id']}")
+
+    async def save_tickets(self, tickets: Iterable[dict]) -> int:
+        """Sauvegarder plusieurs tickets dans une seule transaction."""
+        tickets = list(tickets)
+
+        def save_all():
+            with self._transaction() as conn:
+                for ticket in tickets:
+                    self._write_header(conn, ticket)
+                    self._replace_messages(conn, ticket["ticket_id"], ticket.get("messages", []))
+
+        await self._run(save_all)
+        logger.info(f"{len(tickets)} tickets saved")
+        return len(tickets)
+
+    async def get_ticket(self, ticket_id: str, include_messages: bool = True) -> dict:
+        """Récupérer un ticket par son ID."""
+        def get():
+            conn = self._connection()
+            if not include_messages:
+                row = conn.execute(
+                    f"{HEADER_SELECT} WHERE t.ticket_id = ?", (ticket_id,)
+                ).fetchone()
+                return self._row_header(row) if row else None
+            # Transaction de lecture : en-tête et messages du même instantané
+            conn.execute("BEGIN")
+            try:
+                return self._read_ticket(conn, ticket_id)
+            finally:
+                conn.execute("COMMIT")
+
+        ticket = await self._run(get)
+        if ticket is None:
+            raise HTTPException(status_code=404, detail="Ticket non trouvé")
+        return ticket
+
+    async def get_tickets(
+        self, ticket_ids: Iterable[str], include_messages: bool = True
+    ) -> List[dict]:
+        """Récupérer plusieurs tickets (requêtes IN par lots)."""
+        ticket_ids = list(dict.fromkeys(ticket_ids))
+
+        def get_all():
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                found: Dict[str, dict] = {}
+                for i in range(0, len(ticket_ids), 500):
+                    chunk = ticket_ids[i:i + 500]
+                    placeholders = ", ".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"{HEADER_SELECT} WHERE t.ticket_id IN ({placeholders})", chunk
+                    ).fetchall()
+                    for row in rows:
+                        found[row["ticket_id"]] = self._row_header(row)
+                tickets = [found[t] for t in ticket_ids if t in found]
+                if include_messages:
+                    for ticket in tickets:
+                        del ticket["message_count"], ticket["last_message"]
+                        ticket["messages"] = self._read_messages(conn, ticket["ticket_id"])
+                return tickets
+            finally:
+                conn.execute("COMMIT")
+
+        return await self._run(get_all)
+
+    async def list_tickets(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        include_messages: bool = True,
+    ) -> List[dict]:
+        """Lister les tickets avec filtres optionnels (via les index)."""
+        clauses, params = self._filter_clauses(status, channel, date_from, date_to, assigned_to, urgency)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        def list_headers():
+            rows = self._connection().execute(
+                f"{HEADER_SELECT} {where} ORDER BY t.created_at DESC", params
+            ).fetchall()
+            return [self._row_header(row) for row in rows]
+
+        def list_all():
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                rows = conn.execute(
+                    f"SELECT ticket_id, data FROM tickets {where} ORDER BY created_at DESC",
+                    params,
+                ).fetchall()
+                tickets: Dict[str, dict] = {}
+                for row in rows:
+                    ticket = _loads(row["data"])
+                    ticket["messages"] = []
+                    tickets[row["ticket_id"]] = ticket
+
+                # Un seul passage sur les messages des tickets retenus
+                message_rows = conn.execute(
+                    f"""
+                    SELECT ticket_id, data FROM messages
+                    WHERE ticket_id IN (SELECT ticket_id FROM tickets {where})
+                    ORDER BY id
+                    """,
+                    params,
+                ).fetchall()
+                for row in message_rows:
+                    tickets[row["ticket_id"]]["messages"].append(_loads(row["data"]))
+                return list(tickets.values())
+            finally:
+                conn.execute("COMMIT")
+
+        return await self._run(list_all if include_messages else list_headers)
+
+    async def list_tickets_page(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+        include_messages: bool = True,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Lister une page de tickets (pagination par clé, sans OFFSET)."""
+        clauses, params = self._filter_clauses(status, channel, date_from, date_to, assigned_to, urgency)
+        after = cursor_key(cursor)
+        if after is not None:
+            clauses.append("(t.created_at, t.ticket_id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        def page():
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                rows = conn.execute(
+                    f"{HEADER_SELECT} {where} ORDER BY t.created_at DESC, t.ticket_id DESC LIMIT ?",
+                    (*params, limit + 1),
+                ).fetchall()
+                tickets = [self._row_header(row) for row in rows]
+                if include_messages:
+                    for ticket in tickets[:limit]:
+                        del ticket["message_count"], ticket["last_message"]
+                        ticket["messages"] = self._read_messages(conn, ticket["ticket_id"])
+                return tickets
+            finally:
+                conn.execute("COMMIT")
+
+        tickets = await self._run(page)
+        items = tickets[:limit]
+        next_cursor = ticket_cursor(items[-1]) if items and len(tickets) > limit else None
+        return items, next_cursor
+
+    async def count_tickets(
+        self,
+        status: Optional[str] = None,
+        channel: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        assigned_to: Optional[str] = None,
+        urgency: Optional[str] = None,
+    ) -> int:
+        """Compter les tickets (COUNT sur les index, sans lire les données)."""
+        clauses, params = self._filter_clauses(status, channel, date_from, date_to, assigned_to, urgency)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        def count():
+            row = self._connection().execute(f"SELECT COUNT(*) FROM tickets {where}", params).fetchone()
+            return row[0]
+
+        return await self._run(count)
+
+    async def update_ticket_status(
+        self,
+        ticket_id: str,
+        status: str,
+        closed_at: Optional[str] = None,
+        expected_status: StatusCondition = None,
+    ) -> dict:
+        """Mettre à jour le statut d'un ticket."""
+        def update():
+            with self._transaction() as conn:
+                ticket = self._read_header(conn, ticket_id)
+                if ticket is None:
+                    raise HTTPException(status_code=404, detail="Ticket non trouvé")
+                check_expected_status(ticket, expected_status)
+                old_status = ticket.get("status")
+                ticket.update(compute_status_changes(ticket, status, closed_at))
+                self._write_header(conn, ticket)
+                ticket["messages"] = self._read_messages(conn, ticket_id)
+                return ticket, old_status
+
+        ticket, old_status = await self._run(update)
+        logger.info(f"Ticket {ticket_id} status updated: {old_status} -> {status}")
+        return ticket
+
+    async def ticket_exists(self, ticket_id: str) -> bool:
+        """Vérifier si un ticket existe."""
+        def exists():
+            row = self._connection().execute(
+                "SELECT 1 FROM tickets WHERE ticket_id = ?", (ticket_id,)
+            ).fetchone()
+            return row is not None
+
+        return await self._run(exists)
+
+    async def add_message(self, ticket_id: str, message: dict) -> None:
+        """Ajouter un message à un ticket (une seule insertion atomique)."""
+        def add():
+            with self._transaction() as conn:
+                cursor = conn.execute(
+                    """
+                    INSERT INTO messages (ticket_id, data)
+                    SELECT ?, ? WHERE EXISTS (SELECT 1 FROM tickets WHERE ticket_id = ?)
+                    """,
+                    (ticket_id, _dumps(message), ticket_id),
+                )
+                if cursor.rowcount == 0:
+                    raise HTTPException(status_code=404, detail="Ticket non trouvé")
+
+        await self._run(add)
+        logger.info(f"Message added to ticket {ticket_id}")
+
+    async def update_ticket(
+        self, ticket_id: str, updates: dict, expected_status: StatusCondition = None
+    ) -> dict:
+        """Mettre à jour un ticket."""
+        def update():
+            with self._transaction() as conn:
+                ticket = self._read_header(conn, ticket_id)
+                if ticket is None:
+                    raise HTTPException(status_code=404, detail="Ticket non trouvé")
+                check_expected_status(ticket, expected_status)
+                ticket.update(updates)
+                if "messages" in updates:
+                    self._replace_messages(conn, ticket_id, updates["messages"])
+                self._write_header(conn, ticket)
+                ticket["messages"] = self._read_messages(conn, ticket_id)
+                return ticket
+
+        ticket = await self._run(update)
+        logger.info(f"Ticket updated: {ticket_id}")
+        return ticket
+
+    async def delete_ticket(self, ticket_id: str) -> None:
+        """Supprimer un ticket (ses messages sont supprimés en cascade)."""
+        def delete():
+            with self._transaction() as conn:
+                return conn.execute(
+                    "DELETE FROM tickets WHERE ticket_id = ?", (ticket_id,)
+                ).rowcount
+
+        if not await self._run(delete):
+            raise HTTPException(status_code=404, detail="Ticket non trouvé")
+        logger.info(f"Ticket deleted: {ticket_id}")
+
+    async def health_check(self) -> bool:
+        """Vérifier que la base est accessible."""
+        try:
+            await self._run(lambda: self._connection().execute("SELECT 1").fetchone())
+            return True
+        except Exception as e:
+            logger.error(f"SQLite health check failed: {e}")
+            return False
+
+    async def close(self) -> None:
+        """Fermer toutes les connexions ouvertes."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+        logger.info("SQLiteStorage closed")
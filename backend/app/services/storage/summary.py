@@ -0,0 +1,61 @@
+"""
+Résumés de tickets pour les listings du dashboard.
+
+Un résumé est une vue réduite de l'en-tête : les attributs affichés dans la
+liste, quelques indicateurs d'analytics et un aperçu tronqué du dernier
+message (`last_message_preview`) à la place du message complet.
+"""
+from typing import Optional
+
+# Attributs de premier niveau d'un résumé
+SUMMARY_FIELDS = (
+    "ticket_id",
+    "status",
+    "channel",
+    "created_at",
+    "updated_at",
+    "closed_at",
+    "assigned_to",
+    "customer_name",
+    "message_count",
+    "last_message_preview",
+)
+
+# Sous-attributs de `analytics` conservés dans un résumé
+SUMMARY_ANALYTICS_FIELDS = ("sentiment", "urgency", "category", "churn_risk")
+
+# Longueur maximale du contenu dans l'aperçu du dernier message
+PREVIEW_LENGTH = 120
+
+
+def message_preview(message: Optional[dict]) -> Optional[dict]:
+    """Aperçu d'un message : auteur, type, date et début du contenu."""
+    if not message:
+        return None
+    content = message.get("content") or ""
+    if len(content) > PREVIEW_LENGTH:
+        content = content[:PREVIEW_LENGTH - 1] + "…"
+    return {
+        "author": message.get("author"),
+        "type": message.get("type"),
+        "timestamp": message.get("timestamp"),
+        "content": content,
+    }
+
+
+def ticket_summary(ticket: dict) -> dict:
+    """Résumé d'un ticket complet ou d'un en-tête."""
+    summary = {field: ticket[field] for field in SUMMARY_FIELDS if field in ticket}
+    if "message_count" not in summary and "messages" in ticket:
+        summary["message_count"] = len(ticket["messages"])
+    if "last_message_preview" not in summary:
+        last_message = ticket.get("last_message")
+        if last_message is None and ticket.get("messages"):
+            last_message = ticket["messages"][-1]
+        summary["last_message_preview"] = message_preview(last_message)
+    analytics = ticket.get("analytics")
+    if isinstance(analytics, dict):
+        summary["analytics"] = {
+            key: analytics[key] for key in SUMMARY_ANALYTICS_FIELDS if key in analytics
+        }
+    return summary
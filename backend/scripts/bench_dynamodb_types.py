@@ -0,0 +1,83 @@
+"""
+Microbenchmark de la conversion des items DynamoDB.
+
+Compare, sur les tickets de data/tickets.json, l'ancien chemin (Decimal :
+float_to_decimal + TypeSerializer en écriture, TypeDeserializer +
+decimal_to_float en lecture) au chemin natif (NativeTypeSerializer /
+NativeTypeDeserializer, une seule passe). Aucun accès réseau.
+
+Usage:
+  python scripts/bench_dynamodb_types.py
+  python scripts/bench_dynamodb_types.py --messages 50 --repeat 20
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour importer les modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from app.core.config import DATA_DIR
+from app.services.storage.dynamodb_store import decimal_to_float, float_to_decimal, ticket_item
+from app.services.storage.dynamodb_types import NativeTypeDeserializer, NativeTypeSerializer
+
+
+def load_items(path: Path, messages: int) -> list:
+    """Items DynamoDB réalistes ; `messages` > 0 allonge chaque conversation."""
+    tickets = list(json.loads(path.read_text(encoding="utf-8")).values())
+    items = []
+    for ticket in tickets:
+        if messages and ticket.get("messages"):
+            history = ticket["messages"]
+            ticket = {**ticket, "messages": [history[i % len(history)] for i in range(messages)]}
+        items.append(ticket_item(ticket))
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark (dé)sérialisation DynamoDB")
+    parser.add_argument("--file", type=Path, default=DATA_DIR / "tickets.json")
+    parser.add_argument("--messages", type=int, default=0, help="Messages par ticket (0 = tels quels)")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    items = load_items(args.file, args.messages)
+    legacy_ser, legacy_de = TypeSerializer(), TypeDeserializer()
+    native_ser, native_de = NativeTypeSerializer(), NativeTypeDeserializer()
+    wire = [{k: native_ser.serialize(v) for k, v in item.items()} for item in items]
+
+    # Les deux chemins doivent produire le même résultat
+    assert [{k: legacy_ser.serialize(v) for k, v in float_to_decimal(item).items()} for item in items] == wire
+    legacy_read = [decimal_to_float({k: legacy_de.deserialize(v) for k, v in w.items()}) for w in wire]
+    assert legacy_read == [{k: native_de.deserialize(v) for k, v in w.items()} for w in wire]
+
+    cases = {
+        "write": (
+            lambda: [{k: legacy_ser.serialize(v) for k, v in float_to_decimal(i).items()} for i in items],
+            lambda: [{k: native_ser.serialize(v) for k, v in i.items()} for i in items],
+        ),
+        "read": (
+            lambda: [decimal_to_float({k: legacy_de.deserialize(v) for k, v in w.items()}) for w in wire],
+            lambda: [{k: native_de.deserialize(v) for k, v in w.items()} for w in wire],
+        ),
+    }
+
+    messages = sum(len(i.get("messages") or []) for i in items)
+    print(f"{len(items)} tickets, {messages} messages, {args.repeat} répétitions")
+    print(f"{'':6} {'Decimal (µs/ticket)':>20} {'natif (µs/ticket)':>18} {'gain':>7}")
+    for name, (legacy, native) in cases.items():
+        legacy_time = min(timeit.repeat(legacy, number=1, repeat=args.repeat))
+        native_time = min(timeit.repeat(native, number=1, repeat=args.repeat))
+        per_ticket = 1e6 / len(items)
+        print(
+            f"{name:6} {legacy_time * per_ticket:20.1f} {native_time * per_ticket:18.1f} "
+            f"{legacy_time / native_time:6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Script de conversion des tickets d'un format de sérialisation à un autre.
+Usage:
+  python scripts/convert_codec.py --from json --to msgpack
+  python scripts/convert_codec.py --storage json_sharded --from json --to msgpack
+
+Formats : json (compact), json-pretty, msgpack. Le journal éventuel de la
+source est rejoué avant conversion. Après conversion, passer STORAGE_CODEC
+au nouveau format dans le .env.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour importer les modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import DATA_DIR, TICKETS_DIR
+from app.services.storage.codecs import get_codec
+from app.services.storage.json_store import JSONStorage
+from app.services.storage.sharded_store import ShardedJSONStorage
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _single_file(codec) -> Path:
+    return DATA_DIR / f"tickets{codec.suffix}"
+
+
+async def convert_single_file(source: Path, target: Path, src_codec, dst_codec) -> None:
+    """Réencoder le fichier mono-fichier `source` vers `target`."""
+    if not source.exists():
+        logger.error(f"Tickets file not found: {source}")
+        return
+
+    storage = JSONStorage(file_path=source, journal=True, codec=src_codec)
+    tickets = {t["ticket_id"]: t for t in await storage.list_tickets()}
+    logger.info(f"Loaded {len(tickets)} tickets from {source} ({src_codec.name})")
+
+    tmp_path = target.with_name(target.name + ".tmp")
+    tmp_path.write_bytes(dst_codec.dumps(tickets))
+    os.replace(tmp_path, target)
+
+    # Vérification
+    listed = await JSONStorage(file_path=target, codec=dst_codec).list_tickets()
+    logger.info(
+        f"✓ Converted {len(tickets)} tickets into {target} ({len(listed)} listed, "
+        f"{source.stat().st_size} -> {target.stat().st_size} bytes)"
+    )
+
+
+async def convert_sharded(base_dir: Path, src_codec, dst_codec) -> None:
+    """Réécrire chaque fichier de ticket (et le manifeste) dans le nouveau format."""
+    source = ShardedJSONStorage(base_dir=base_dir, codec=src_codec)
+    tickets = {t["ticket_id"]: t for t in await source.list_tickets()}
+    await source.close()
+    logger.info(f"Loaded {len(tickets)} tickets from {base_dir} ({src_codec.name})")
+
+    target = ShardedJSONStorage(base_dir=base_dir, codec=dst_codec)
+    count = await target.import_tickets(tickets)
+    await target.close()
+
+    listed = await ShardedJSONStorage(base_dir=base_dir, codec=dst_codec).list_tickets()
+    logger.info(f"✓ Converted {count} tickets in {base_dir} ({len(listed)} listed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convertir les tickets vers un autre codec")
+    parser.add_argument("--storage", choices=["json", "json_sharded"], default="json")
+    parser.add_argument("--from", dest="source_codec", default="json")
+    parser.add_argument("--to", dest="target_codec", required=True)
+    parser.add_argument("--source", type=Path, help="Fichier source (stockage json)")
+    parser.add_argument("--target", type=Path, help="Fichier cible (stockage json)")
+    parser.add_argument("--dir", type=Path, default=TICKETS_DIR, help="Dossier (json_sharded)")
+    args = parser.parse_args()
+
+    src_codec = get_codec(args.source_codec)
+    dst_codec = get_codec(args.target_codec)
+
+    if args.storage == "json_sharded":
+        if src_codec.suffix == dst_codec.suffix:
+            logger.error("Source and target codecs share the same file suffix")
+            return
+        asyncio.run(convert_sharded(args.dir, src_codec, dst_codec))
+    else:
+        source = args.source or _single_file(src_codec)
+        target = args.target or _single_file(dst_codec)
+        asyncio.run(convert_single_file(source, target, src_codec, dst_codec))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Script de conversion du stockage JSON mono-fichier vers le format shardé.
+Usage: python scripts/convert_to_sharded.py [--source data/tickets.json] [--target data/tickets]
+
+Après conversion, passer STORAGE_TYPE=json_sharded dans le .env.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour importer les modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import TICKETS_FILE, TICKETS_DIR
+from app.services.storage.sharded_store import ShardedJSONStorage
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def convert(source: Path, target: Path) -> None:
+    """Convertir `tickets.json` en un fichier par ticket + manifeste."""
+    if not source.exists():
+        logger.error(f"JSON file not found: {source}")
+        return
+
+    tickets = json.loads(source.read_text(encoding="utf-8") or "{}")
+    logger.info(f"Loaded {len(tickets)} tickets from {source}")
+
+    storage = ShardedJSONStorage(base_dir=target)
+    count = await storage.import_tickets(tickets)
+    await storage.close()
+
+    # Vérification
+    listed = await ShardedJSONStorage(base_dir=target).list_tickets()
+    logger.info(f"✓ Converted {count} tickets into {target} ({len(listed)} listed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convertir tickets.json au format shardé")
+    parser.add_argument("--source", type=Path, default=TICKETS_FILE)
+    parser.add_argument("--target", type=Path, default=TICKETS_DIR)
+    args = parser.parse_args()
+    asyncio.run(convert(args.source, args.target))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,29 @@
 """
 Script de migration des tickets de JSON vers DynamoDB.
-Usage: python migrate_to_dynamodb.py
+Usage:
+  python migrate_to_dynamodb.py
+  python migrate_to_dynamodb.py --convert-from freeda-tickets-legacy
+  python migrate_to_dynamodb.py --backfill-queues
+  python migrate_to_dynamodb.py --backfill-message-counts
+  python migrate_to_dynamodb.py --backfill-status-shards
+  python migrate_to_dynamodb.py --backfill-created-shards
+  python migrate_to_dynamodb.py --rebuild-counters
+
+La table cible est écrite dans la disposition DYNAMODB_LAYOUT (item ou
+single_table). Avec --convert-from, les tickets sont lus depuis une table
+existante en disposition "item" au lieu du fichier JSON. Avec
+--backfill-queues, rien n'est migré : les tickets ouverts déjà présents
+dans la table sont ajoutés aux index creux des files d'attente. Avec
+--backfill-message-counts, le nombre de messages et le dernier message
+(lus par /status et les listings) sont calculés sur les tickets
+existants. Avec --backfill-status-shards, le statut shardé
+(DYNAMODB_STATUS_SHARDS) est posé sur les tickets existants, et avec
+--backfill-created-shards leur clé dans l'index « tous les tickets »
+(DYNAMODB_CREATED_SHARDS). Avec --rebuild-counters, les compteurs du
+dashboard (DYNAMODB_TABLE_COUNTERS) sont recalculés depuis tous les tickets.
 """
+import argparse
 import asyncio
-import json
 import logging
 import os
 import sys
@@ -15,7 +35,10 @@ from dotenv import load_dotenv
 # Ajouter le répertoire parent au path pour importer les modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.services.storage.dynamodb_store import DynamoDBStorage, float_to_decimal
+from app.core.config import JSON_STORAGE_JOURNAL, STORAGE_CODEC, TICKETS_FILE
+from app.services.storage.codecs import get_codec
+from app.services.storage.dynamodb_store import LAYOUT_ITEM, DynamoDBStorage
+from app.services.storage.json_store import JSONStorage
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,55 +47,101 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def migrate_tickets():
-    """Migrer les tickets de JSON vers DynamoDB."""
+async def load_json_tickets() -> list:
+    """
+    Charger les tickets du stockage JSON configuré (TICKETS_FILE), via
+    JSONStorage : codec STORAGE_CODEC et journal non compacté compris.
+    """
+    json_file = TICKETS_FILE
+    journal_file = json_file.with_name(json_file.name + ".journal")
+    
+    # Vérifier que le fichier (ou son journal) existe
+    if not json_file.exists() and not journal_file.exists():
+        logger.error(f"JSON file not found: {json_file}")
+        return None
+    
+    storage = JSONStorage(
+        file_path=json_file,
+        journal=JSON_STORAGE_JOURNAL,
+        codec=get_codec(STORAGE_CODEC),
+    )
+    try:
+        tickets = await storage.list_tickets()
+        logger.info(f"Loaded {len(tickets)} tickets from {json_file.name}")
+        return tickets
+    except Exception as e:
+        logger.error(f"Error loading JSON file: {e}")
+        return None
+    finally:
+        await storage.close()
+
+
+async def load_table_tickets(source_table: str, region: str) -> list:
+    """Charger les tickets complets d'une table en disposition "item"."""
+    source = DynamoDBStorage(table_name=source_table, region=region, layout=LAYOUT_ITEM)
+    try:
+        tickets = await source.list_tickets()
+        logger.info(f"Loaded {len(tickets)} tickets from DynamoDB table '{source_table}'")
+        return tickets
+    except Exception as e:
+        logger.error(f"Error reading table '{source_table}': {e}")
+        return None
+    finally:
+        await source.close()
+
+
+async def migrate_tickets(source_table: str = None):
+    """Migrer les tickets de JSON (ou d'une ancienne table) vers DynamoDB."""
     
     # Charger les variables d'environnement
     load_dotenv()
     
     # Configuration
-    json_file = Path(__file__).parent.parent / "data" / "tickets.json"
     table_name = os.getenv("DYNAMODB_TABLE_TICKETS", "freeda-tickets-production")
     region = os.getenv("AWS_REGION", "eu-west-1")
+    layout = os.getenv("DYNAMODB_LAYOUT", LAYOUT_ITEM)
     
-    logger.info(f"Starting migration from {json_file} to DynamoDB table '{table_name}'")
+    source = f"table '{source_table}'" if source_table else TICKETS_FILE.name
+    logger.info(f"Starting migration from {source} to DynamoDB table '{table_name}' (layout={layout})")
     
-    # Vérifier que le fichier JSON existe
-    if not json_file.exists():
-        logger.error(f"JSON file not found: {json_file}")
-        return
-    
-    # Charger les tickets depuis JSON
-    try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            tickets_dict = json.load(f)
-        
-        tickets = list(tickets_dict.values())
-        logger.info(f"Loaded {len(tickets)} tickets from JSON")
-    except Exception as e:
-        logger.error(f"Error loading JSON file: {e}")
+    if source_table:
+        if source_table == table_name:
+            logger.error("Source and target tables must differ")
+            return
+        tickets = await load_table_tickets(source_table, region)
+    else:
+        tickets = await load_json_tickets()
+    if tickets is None:
         return
     
     # Initialiser DynamoDB
     try:
-        storage = DynamoDBStorage(table_name=table_name, region=region)
+        # Clés des index shardés posées dès la copie (pas de backfill ensuite)
+        storage = DynamoDBStorage(
+            table_name=table_name,
+            region=region,
+            layout=layout,
+            status_shards=int(os.getenv("DYNAMODB_STATUS_SHARDS", "0")),
+            created_shards=int(os.getenv("DYNAMODB_CREATED_SHARDS", "4")),
+        )
         logger.info("Connected to DynamoDB")
     except Exception as e:
         logger.error(f"Error connecting to DynamoDB: {e}")
         return
     
-    # Migrer chaque ticket
+    # Migrer par lots (BatchWriteItem, 25 items par requête)
     success_count = 0
     error_count = 0
+    batch_size = 100
     
-    for i, ticket in enumerate(tickets, 1):
+    for start in range(0, len(tickets), batch_size):
+        batch = tickets[start:start + batch_size]
         try:
-            await storage.save_ticket(ticket)
-            success_count += 1
-            logger.info(f"[{i}/{len(tickets)}] Migrated ticket {ticket['ticket_id']}")
+            success_count += await storage.save_tickets(batch)
+            logger.info(f"[{start + len(batch)}/{len(tickets)}] Migrated {len(batch)} tickets")
         except Exception as e:
-            error_count += 1
-            logger.error(f"[{i}/{len(tickets)}] Error migrating ticket {ticket.get('ticket_id', 'unknown')}: {e}")
+            error_count += len(batch)
+            logger.error(f"[{start + len(batch)}/{len(tickets)}] Error migrating batch: {e}")
     
     # Résumé
     logger.info("=" * 60)
@@ -92,20 +161,129 @@ async def migrate_tickets():
             logger.error(f"✗ Verification failed: {e}")
 
 
+async def backfill_queues():
+    """Indexer les tickets ouverts existants dans les index de file d'attente."""
+    load_dotenv()
+    table_name = os.getenv("DYNAMODB_TABLE_TICKETS", "freeda-tickets-production")
+    region = os.getenv("AWS_REGION", "eu-west-1")
+    layout = os.getenv("DYNAMODB_LAYOUT", LAYOUT_ITEM)
+
+    storage = DynamoDBStorage(table_name=table_name, region=region, layout=layout)
+    try:
+        count = await storage.backfill_queue_attributes()
+        logger.info(f"✓ {count} open tickets indexed in queue indexes")
+    except Exception as e:
+        logger.error(f"✗ Backfill failed: {e}")
+    finally:
+        await storage.close()
+
+
+async def backfill_message_counts():
+    """Dénormaliser nombre de messages et dernier message sur les tickets existants."""
+    load_dotenv()
+    table_name = os.getenv("DYNAMODB_TABLE_TICKETS", "freeda-tickets-production")
+    region = os.getenv("AWS_REGION", "eu-west-1")
+    layout = os.getenv("DYNAMODB_LAYOUT", LAYOUT_ITEM)
+
+    storage = DynamoDBStorage(table_name=table_name, region=region, layout=layout)
+    try:
+        count = await storage.backfill_message_summaries()
+        logger.info(f"✓ {count} tickets updated with message_count / last_message")
+    except Exception as e:
+        logger.error(f"✗ Backfill failed: {e}")
+    finally:
+        await storage.close()
+
+
+async def backfill_status_shards():
+    """Poser le statut shardé sur les tickets existants (à relancer après le déploiement)."""
+    load_dotenv()
+    table_name = os.getenv("DYNAMODB_TABLE_TICKETS", "freeda-tickets-production")
+    region = os.getenv("AWS_REGION", "eu-west-1")
+    layout = os.getenv("DYNAMODB_LAYOUT", LAYOUT_ITEM)
+    shards = int(os.getenv("DYNAMODB_STATUS_SHARDS", "0"))
+    if shards <= 0:
+        logger.error("DYNAMODB_STATUS_SHARDS must be > 0")
+        return
+
+    storage = DynamoDBStorage(
+        table_name=table_name, region=region, layout=layout, status_shards=shards
+    )
+    try:
+        count = await storage.backfill_status_shards()
+        logger.info(f"✓ {count} tickets updated with {shards} status shards")
+    except Exception as e:
+        logger.error(f"✗ Backfill failed: {e}")
+    finally:
+        await storage.close()
+
+
+async def backfill_created_shards():
+    """Poser la clé de l'index « tous les tickets » sur les tickets existants."""
+    load_dotenv()
+    table_name = os.getenv("DYNAMODB_TABLE_TICKETS", "freeda-tickets-production")
+    region = os.getenv("AWS_REGION", "eu-west-1")
+    layout = os.getenv("DYNAMODB_LAYOUT", LAYOUT_ITEM)
+    shards = int(os.getenv("DYNAMODB_CREATED_SHARDS", "4"))
+    if shards <= 0:
+        logger.error("DYNAMODB_CREATED_SHARDS must be > 0")
+        return
+
+    storage = DynamoDBStorage(
+        table_name=table_name, region=region, layout=layout, created_shards=shards
+    )
+    try:
+        count = await storage.backfill_created_shards()
+        logger.info(f"✓ {count} tickets indexed with {shards} created_at shards")
+    except Exception as e:
+        logger.error(f"✗ Backfill failed: {e}")
+    finally:
+        await storage.close()
+
+
+async def rebuild_counters():
+    """Recalculer les compteurs du dashboard depuis tous les tickets (hors trafic)."""
+    load_dotenv()
+    table_name = os.getenv("DYNAMODB_TABLE_TICKETS", "freeda-tickets-production")
+    region = os.getenv("AWS_REGION", "eu-west-1")
+    layout = os.getenv("DYNAMODB_LAYOUT", LAYOUT_ITEM)
+    counters_table = os.getenv("DYNAMODB_TABLE_COUNTERS", "")
+    if not counters_table:
+        logger.error("DYNAMODB_TABLE_COUNTERS must be set")
+        return
+
+    storage = DynamoDBStorage(
+        table_name=table_name,
+        region=region,
+        layout=layout,
+        counters_table=counters_table,
+        counter_shards=int(os.getenv("DYNAMODB_COUNTER_SHARDS", "4")),
+    )
+    try:
+        count = await storage.rebuild_counters()
+        logger.info(f"✓ Counters rebuilt from {count} tickets")
+    except Exception as e:
+        logger.error(f"✗ Rebuild failed: {e}")
+    finally:
+        await storage.close()
+
+
 async def create_backup():
-    """Créer une sauvegarde du fichier JSON avant migration."""
-    json_file = Path(__file__).parent.parent / "data" / "tickets.json"
+    """Créer une sauvegarde du fichier JSON (et de son journal) avant migration."""
+    json_file = TICKETS_FILE
+    files = [json_file, json_file.with_name(json_file.name + ".journal")]
+    files = [f for f in files if f.exists()]
     
-    if not json_file.exists():
+    if not files:
         logger.warning("No JSON file to backup")
         return
     
-    backup_file = json_file.with_suffix('.json.backup')
-    
     try:
         import shutil
-        shutil.copy2(json_file, backup_file)
-        logger.info(f"✓ Backup created: {backup_file}")
+        for source in files:
+            backup_file = source.with_name(source.name + ".backup")
+            shutil.copy2(source, backup_file)
+            logger.info(f"✓ Backup created: {backup_file}")
     except Exception as e:
         logger.error(f"✗ Failed to create backup: {e}")
 
@@ -129,6 +307,39 @@ async def verify_table_exists(table_name: str, region: str):
 
 async def main():
     """Point d'entrée principal."""
+    parser = argparse.ArgumentParser(description="Migrer les tickets vers DynamoDB")
+    parser.add_argument(
+        "--convert-from",
+        dest="source_table",
+        help="Table source en disposition item (conversion vers DYNAMODB_LAYOUT)",
+    )
+    parser.add_argument(
+        "--backfill-queues",
+        action="store_true",
+        help="Indexer les tickets ouverts existants dans les index de file (sans migration)",
+    )
+    parser.add_argument(
+        "--backfill-message-counts",
+        action="store_true",
+        help="Calculer message_count / last_message sur les tickets existants (sans migration)",
+    )
+    parser.add_argument(
+        "--backfill-status-shards",
+        action="store_true",
+        help="Poser le statut shardé (DYNAMODB_STATUS_SHARDS) sur les tickets existants",
+    )
+    parser.add_argument(
+        "--backfill-created-shards",
+        action="store_true",
+        help="Indexer les tickets existants dans l'index « tous les tickets »",
+    )
+    parser.add_argument(
+        "--rebuild-counters",
+        action="store_true",
+        help="Recalculer les compteurs du dashboard (DYNAMODB_TABLE_COUNTERS)",
+    )
+    args = parser.parse_args()
+
     logger.info("=" * 60)
     logger.info("Freeda - Migration JSON to DynamoDB")
     logger.info("=" * 60)
@@ -139,13 +350,33 @@ async def main():
     table_name = os.getenv("DYNAMODB_TABLE_TICKETS", "freeda-tickets-production")
     region = os.getenv("AWS_REGION", "eu-west-1")
     
-    # Vérifier que la table existe
+    # Vérifier que les tables existent
     if not await verify_table_exists(table_name, region):
         return
+    if args.source_table and not await verify_table_exists(args.source_table, region):
+        return
+
+    if args.backfill_queues:
+        await backfill_queues()
+        return
+    if args.backfill_message_counts:
+        await backfill_message_counts()
+        return
+    if args.backfill_status_shards:
+        await backfill_status_shards()
+        return
+    if args.backfill_created_shards:
+        await backfill_created_shards()
+        return
+    if args.rebuild_counters:
+        await rebuild_counters()
+        return
     
     # Demander confirmation
-    print("\n⚠️  This will migrate all tickets from JSON to DynamoDB.")
+    source = f"table {args.source_table}" if args.source_table else "JSON"
+    print(f"\n⚠️  This will migrate all tickets from {source} to DynamoDB.")
     print(f"   Table: {table_name}")
+    print(f"   Layout: {os.getenv('DYNAMODB_LAYOUT', LAYOUT_ITEM)}")
     print(f"   Region: {region}")
     response = input("\nContinue? (yes/no): ")
     
@@ -154,10 +385,11 @@ async def main():
         return
     
     # Créer une sauvegarde
-    await create_backup()
+    if not args.source_table:
+        await create_backup()
     
     # Lancer la migration
-    await migrate_tickets()
+    await migrate_tickets(args.source_table)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+import pytest
+
+
+@pytest.fixture
+def make_ticket():
+    """Fabrique de tickets minimaux ; `fields` complète ou remplace les champs."""
+    def make(ticket_id, created_at="2025-01-01T10:00:00", status="nouveau", channel="chat", **fields):
+        return {
+            "ticket_id": ticket_id,
+            "status": status,
+            "channel": channel,
+            "created_at": created_at,
+            "messages": [],
+            **fields,
+        }
+
+    return make
+
+
+@pytest.fixture
+def dynamodb_storage(monkeypatch):
+    """
+    Fabrique de `DynamoDBStorage` sur un client botocore stubbé (aucun appel
+    réseau) ; retourne `(storage, stubber)`. Les paramètres attendus sont
+    ceux passés à la ressource boto3, avant sérialisation des conditions.
+    """
+    import boto3
+    from botocore.stub import Stubber
+
+    from app.services.storage.dynamodb_store import CREATED_SHARD_INDEX, DynamoDBStorage
+
+    create_resource = boto3.resource
+
+    def make(table_name="freeda-tickets", indexes=None, **options):
+        resource = create_resource(
+            "dynamodb",
+            region_name="eu-west-1",
+            aws_access_key_id="test",
+            aws_secret_access_key="test",
+        )
+        stubber = Stubber(resource.meta.client)
+        # GSI de la table décrite : par défaut, l'index « tous les tickets » s'il est activé
+        if indexes is None:
+            indexes = [CREATED_SHARD_INDEX] if options.get("created_shards") else []
+        stubber.add_response("describe_table", {"Table": {
+            "TableName": table_name,
+            "GlobalSecondaryIndexes": [{"IndexName": name} for name in indexes],
+        }}, {"TableName": table_name})
+        if options.get("counters_table"):
+            table = options["counters_table"]
+            stubber.add_response(
+                "describe_table", {"Table": {"TableName": table}}, {"TableName": table}
+            )
+        stubber.activate()
+        monkeypatch.setattr(boto3, "resource", lambda *args, **kwargs: resource)
+        # Un seul thread : les appels parallèles (shards, segments) consomment
+        # les réponses stubbées dans l'ordre de leur lancement
+        options.setdefault("max_workers", 1)
+        return DynamoDBStorage(table_name, **options), stubber
+
+    return make
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.storage.cache import CachedStorage, TicketCache
+from app.services.storage.json_store import JSONStorage
+
+
+def test_reads_are_cached_and_writes_invalidate(tmp_path, make_ticket):
+    async def scenario():
+        inner = JSONStorage(file_path=tmp_path / "tickets.json")
+        storage = CachedStorage(inner, TicketCache(maxsize=10, ttl=60))
+        await storage.save_ticket(make_ticket("T1"))
+
+        first = await storage.get_ticket("T1")
+        first["status"] = "modifié par l'appelant"
+        assert (await storage.get_ticket("T1"))["status"] == "nouveau"
+        assert storage.cache_stats()["hits"] == 1
+
+        await storage.add_message("T1", {"content": "Bonjour"})
+        assert len((await storage.get_ticket("T1"))["messages"]) == 1
+
+        updated = await storage.update_ticket("T1", {"status": "en cours"})
+        hits = storage.cache.hits
+        assert await storage.get_ticket("T1") == updated
+        assert storage.cache.hits == hits + 1
+
+        assert await storage.ticket_exists("T1")
+        await storage.delete_ticket("T1")
+        assert not await storage.ticket_exists("T1")
+        with pytest.raises(HTTPException):
+            await storage.get_ticket("T1")
+
+    asyncio.run(scenario())
+
+
+def test_cache_is_bounded_and_expires():
+    now = [0.0]
+    cache = TicketCache(maxsize=2, ttl=5, clock=lambda: now[0])
+    for i in range(3):
+        cache.put(("ticket", f"T{i}"), {"ticket_id": f"T{i}"})
+    assert cache.stats()["size"] == 2
+    assert cache.get(("ticket", "T2")) == {"ticket_id": "T2"}
+
+    now[0] = 10
+    cache.get(("ticket", "T2"))
+    stats = cache.stats()
+    assert (stats["size"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_invalidation_only_discards_fills_of_the_same_ticket():
+    cache = TicketCache(maxsize=2, ttl=60)
+    generation = cache.generation
+    cache.invalidate("T2")
+    cache.put(("ticket", "T1"), {"ticket_id": "T1"}, generation)
+    assert cache.get(("ticket", "T1")) == {"ticket_id": "T1"}
+
+    # Remplissage commencé avant une écriture sur le même ticket : ignoré
+    generation = cache.generation
+    cache.invalidate("T1")
+    cache.put(("ticket", "T1"), {"ticket_id": "T1", "stale": True}, generation)
+    assert cache.stats()["size"] == 0
+
+    # Invalidations oubliées au-delà de maxsize : rejet conservateur
+    generation = cache.generation
+    for ticket_id in ("T3", "T4", "T5"):
+        cache.invalidate(ticket_id)
+    cache.put(("ticket", "T3"), {"ticket_id": "T3"}, generation)
+    cache.put(("header", "T6"), {"ticket_id": "T6"}, cache.generation)
+    assert cache.stats()["size"] == 1
+
+
+class OutOfOrderStorage(JSONStorage):
+    """Stockage dont les mises à jour vers certains statuts attendent un feu vert."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gates = {}
+        self.waiting = asyncio.Event()
+
+    async def update_ticket(self, ticket_id, updates, expected_status=None):
+        ticket = await super().update_ticket(ticket_id, updates, expected_status)
+        gate = self.gates.get(updates.get("status"))
+        if gate is not None:
+            self.waiting.set()
+            await gate.wait()
+        return ticket
+
+
+def test_write_through_keeps_the_latest_of_concurrent_updates(tmp_path, make_ticket):
+    async def scenario():
+        inner = OutOfOrderStorage(file_path=tmp_path / "tickets.json")
+        storage = CachedStorage(inner, TicketCache(maxsize=10, ttl=60))
+        await storage.save_ticket(make_ticket("T1"))
+        inner.gates["en cours"] = asyncio.Event()
+
+        # La première mise à jour se termine après la seconde
+        first = asyncio.create_task(storage.update_ticket("T1", {"status": "en cours"}))
+        await inner.waiting.wait()
+        await storage.update_ticket("T1", {"status": "fermé"})
+        inner.gates["en cours"].set()
+        await first
+
+        assert (await inner.get_ticket("T1"))["status"] == "fermé"
+        assert (await storage.get_ticket("T1"))["status"] == "fermé"
+
+    asyncio.run(scenario())
@@ -0,0 +1,548 @@
+import asyncio
+import copy
+from collections import Counter
+
+import pytest
+from boto3.dynamodb.conditions import Key
+from botocore.stub import ANY
+from fastapi import HTTPException
+
+from app.services.storage.counters import counter_delta, counter_keys
+from app.services.storage.dynamodb_store import (
+    CREATED_SHARD_INDEX,
+    HEADER_ATTRIBUTES,
+    header_projection,
+)
+from app.services.storage.interface import OPEN_STATUSES
+from app.services.storage.pagination import decode_cursor, encode_cursor
+from app.services.storage.retry import AdaptiveRetry
+
+TABLE = "freeda-tickets"
+
+
+def item(ticket_id, created_at, **fields):
+    """Item au format DynamoDB (chaînes seulement)."""
+    return {
+        "ticket_id": {"S": ticket_id},
+        "created_at": {"S": created_at},
+        **{name: {"S": value} for name, value in fields.items()},
+    }
+
+
+def test_unfiltered_listing_follows_the_all_tickets_index(dynamodb_storage):
+    async def scenario():
+        storage, stubber = dynamodb_storage(created_shards=2)
+        for shard, items in (
+            ("all#0", [item("T3", "2025-01-03"), item("T1", "2025-01-01")]),
+            ("all#1", [item("T2", "2025-01-02")]),
+        ):
+            stubber.add_response("query", {"Items": items}, {
+                "TableName": TABLE,
+                "IndexName": CREATED_SHARD_INDEX,
+                "KeyConditionExpression": Key("created_shard").eq(shard),
+                "ScanIndexForward": False,
+                "Limit": 2,
+                "ProjectionExpression": ANY,
+                "ExpressionAttributeNames": ANY,
+            })
+        page, cursor = await storage.list_tickets_page(include_messages=False, limit=2)
+        assert [t["ticket_id"] for t in page] == ["T3", "T2"]
+        # Seul le shard non épuisé reprend, juste après le dernier élément servi
+        assert decode_cursor(cursor) == {"shards": {"all#0": {
+            "ticket_id": "T3", "created_at": "2025-01-03", "created_shard": "all#0",
+        }}}
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def created_query(shard, limit, start_key=None):
+    """Paramètres attendus d'une query sur un shard de l'index « tous les tickets »."""
+    params = {
+        "TableName": TABLE,
+        "IndexName": CREATED_SHARD_INDEX,
+        "KeyConditionExpression": Key("created_shard").eq(shard),
+        "ScanIndexForward": False,
+        "Limit": limit,
+        "ProjectionExpression": ANY,
+        "ExpressionAttributeNames": ANY,
+    }
+    if start_key:
+        params["ExclusiveStartKey"] = start_key
+    return params
+
+
+def test_sharded_page_resumes_each_shard_from_its_cursor(dynamodb_storage):
+    async def scenario():
+        storage, stubber = dynamodb_storage(created_shards=3)
+        served = {"ticket_id": "T7", "created_at": "2025-01-07", "created_shard": "all#0"}
+        last_key = {"ticket_id": "T4", "created_at": "2025-01-04", "created_shard": "all#2"}
+        cursor = encode_cursor({"shards": {"all#0": served, "all#2": last_key}})
+        # all#1, absent du curseur, est épuisé : il n'est plus lu
+        resume = {"ticket_id": "T4", "created_at": "2025-01-04", "created_shard": "all#0"}
+        stubber.add_response("query", {
+            "Items": [item("T6", "2025-01-06"), item("T5", "2025-01-05")],
+            "LastEvaluatedKey": {name: {"S": value} for name, value in resume.items()},
+        }, created_query("all#0", 2, served))
+        stubber.add_response("query", {"Items": [item("T1", "2025-01-01")]},
+                             created_query("all#2", 2, last_key))
+
+        page, next_cursor = await storage.list_tickets_page(
+            include_messages=False, limit=2, cursor=cursor
+        )
+        assert [t["ticket_id"] for t in page] == ["T6", "T5"]
+        # all#0 servi en entier reprend à son LastEvaluatedKey ; rien n'a été
+        # servi de all#2, qui repart de la même position
+        assert decode_cursor(next_cursor) == {"shards": {"all#0": resume, "all#2": last_key}}
+
+        for invalid in (encode_cursor({"offset": 2}), encode_cursor({"shards": ["all#0"]})):
+            with pytest.raises(HTTPException) as exc:
+                await storage.list_tickets_page(include_messages=False, cursor=invalid)
+            assert exc.value.status_code == 400
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_iter_tickets_merges_shards_lazily_in_bounded_pages(dynamodb_storage):
+    async def scenario():
+        storage, stubber = dynamodb_storage(created_shards=2)
+
+        def first_pages():
+            for shard, items in (
+                ("all#0", [item("T6", "2025-01-06"), item("T3", "2025-01-03")]),
+                ("all#1", [item("T5", "2025-01-05"), item("T4", "2025-01-04")]),
+            ):
+                stubber.add_response("query", {
+                    "Items": items, "LastEvaluatedKey": copy.deepcopy(items[-1]),
+                }, created_query(shard, 2))
+
+        first_pages()
+
+        # Première page servie sans lire la suite des shards
+        pages = storage.iter_tickets(include_messages=False, page_size=2)
+        assert [t["ticket_id"] for t in await anext(pages)] == ["T6", "T5"]
+        await pages.aclose()
+        stubber.assert_no_pending_responses()
+
+        first_pages()
+        # all#1 est vidé le premier : sa page suivante est lue avant celle de all#0
+        for shard, after, items in (
+            ("all#1", ("T4", "2025-01-04"), [item("T2", "2025-01-02")]),
+            ("all#0", ("T3", "2025-01-03"), [item("T1", "2025-01-01")]),
+        ):
+            start_key = {"ticket_id": after[0], "created_at": after[1]}
+            stubber.add_response("query", {"Items": items}, created_query(shard, 2, start_key))
+
+        pages = [
+            [t["ticket_id"] for t in page]
+            async for page in storage.iter_tickets(include_messages=False, page_size=2)
+        ]
+        # Trois éléments prêts dès la première lecture : découpés à page_size
+        assert pages == [["T6", "T5"], ["T4"], ["T3"], ["T2"], ["T1"]]
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_unfiltered_listing_without_index_pages_by_keyset(dynamodb_storage):
+    async def scenario():
+        storage, stubber = dynamodb_storage(scan_segments=1)
+        scan = {"TableName": TABLE, "ProjectionExpression": ANY, "ExpressionAttributeNames": ANY}
+        stubber.add_response("scan", {
+            "Items": [item("T1", "2025-01-01"), item("T3", "2025-01-03")],
+            "LastEvaluatedKey": {"ticket_id": {"S": "T3"}},
+        }, scan)
+        stubber.add_response(
+            "scan", {"Items": [item("T2", "2025-01-02")]},
+            {**scan, "ExclusiveStartKey": {"ticket_id": "T3"}},
+        )
+        # Ticket créé entre les deux pages : il n'en décale aucune
+        stubber.add_response("scan", {"Items": [
+            item("T1", "2025-01-01"), item("T4", "2025-01-04"),
+            item("T3", "2025-01-03"), item("T2", "2025-01-02"),
+        ]}, scan)
+
+        page, cursor = await storage.list_tickets_page(include_messages=False, limit=2)
+        assert [t["ticket_id"] for t in page] == ["T3", "T2"]
+        assert decode_cursor(cursor) == {"created_at": "2025-01-02", "ticket_id": "T2"}
+        page, cursor = await storage.list_tickets_page(
+            include_messages=False, limit=2, cursor=cursor
+        )
+        assert [t["ticket_id"] for t in page] == ["T1"] and cursor is None
+
+        with pytest.raises(HTTPException) as exc:
+            await storage.list_tickets_page(
+                include_messages=False, cursor=encode_cursor({"offset": 2})
+            )
+        assert exc.value.status_code == 400
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_created_shards_require_the_all_tickets_index(dynamodb_storage):
+    with pytest.raises(HTTPException) as exc:
+        dynamodb_storage(created_shards=4, indexes=[])
+    assert CREATED_SHARD_INDEX in exc.value.detail
+
+
+def message_item(ticket_id, message_id, timestamp, content="Bonjour"):
+    return {
+        "ticket_id": {"S": ticket_id},
+        "sk": {"S": f"MSG#{timestamp}#{message_id}"},
+        "message_id": {"S": message_id},
+        "timestamp": {"S": timestamp},
+        "content": {"S": content},
+    }
+
+
+def test_single_table_get_ticket_reads_the_partition_in_one_query(dynamodb_storage):
+    async def scenario():
+        storage, stubber = dynamodb_storage(layout="single_table")
+        partition = {"TableName": TABLE, "KeyConditionExpression": Key("ticket_id").eq("T1")}
+        header = item("T1", "2025-01-01", sk="TICKET", status="nouveau")
+        header["message_count"] = {"N": "2"}
+        stubber.add_response("query", {"Items": [
+            message_item("T1", "m1", "2025-01-01T10:00:00"),
+            message_item("T1", "m2", "2025-01-01T10:05:00", "Suite"),
+            header,
+        ]}, partition)
+        # Messages sans en-tête (ticket supprimé à moitié) : 404
+        orphan = message_item("T1", "m1", "2025-01-01T10:00:00")
+        stubber.add_response("query", {"Items": [orphan]}, partition)
+
+        ticket = await storage.get_ticket("T1")
+        assert [m["content"] for m in ticket["messages"]] == ["Bonjour", "Suite"]
+        assert "sk" not in ticket and "message_count" not in ticket
+        assert "ticket_id" not in ticket["messages"][0]
+        with pytest.raises(HTTPException) as exc:
+            await storage.get_ticket("T1")
+        assert exc.value.status_code == 404
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_single_table_sync_messages_writes_only_the_difference(dynamodb_storage):
+    async def scenario():
+        storage, stubber = dynamodb_storage(layout="single_table")
+        kept = {"message_id": "m2", "timestamp": "2025-01-01T10:05:00", "content": "Suite"}
+        added = {"message_id": "m3", "timestamp": "2025-01-01T10:10:00", "content": "Fin"}
+        sk_suffix = "2025-01-01T10:10:00#m3"
+        stubber.add_response("query", {"Items": [
+            {"sk": {"S": "MSG#2025-01-01T10:00:00#m1"}},
+            {"sk": {"S": "MSG#2025-01-01T10:05:00#m2"}},
+        ]}, {
+            "TableName": TABLE,
+            "KeyConditionExpression": Key("ticket_id").eq("T1") & Key("sk").begins_with("MSG#"),
+            "ProjectionExpression": "sk",
+        })
+        stubber.add_response("batch_write_item", {}, {"RequestItems": {TABLE: [
+            {"PutRequest": {"Item": {**added, "ticket_id": "T1", "sk": "MSG#" + sk_suffix}}},
+            {"DeleteRequest": {"Key": {"ticket_id": "T1", "sk": "MSG#2025-01-01T10:00:00#m1"}}},
+        ]}})
+
+        await storage._sync_messages("T1", [kept, added])
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_single_table_update_leaves_messages_alone_when_the_condition_fails(dynamodb_storage):
+    async def scenario():
+        storage, stubber = dynamodb_storage(layout="single_table")
+        message = {"message_id": "m1", "timestamp": "2025-01-01T10:00:00", "content": "Bonjour"}
+        update = {
+            "TableName": TABLE, "Key": {"ticket_id": "T1", "sk": "TICKET"},
+            "UpdateExpression": ANY, "ConditionExpression": ANY,
+            "ExpressionAttributeNames": ANY, "ExpressionAttributeValues": ANY,
+            "ReturnValues": "ALL_NEW", "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }
+        stubber.add_client_error(
+            "update_item", "ConditionalCheckFailedException", expected_params=update,
+            modeled_fields={"Item": item("T1", "2025-01-01", sk="TICKET", status="fermé")},
+        )
+        stubber.add_client_error(
+            "update_item", "ConditionalCheckFailedException", expected_params=update
+        )
+
+        # Ni query ni batch_write sur les messages : la condition échoue avant
+        for status_code in (409, 404):
+            with pytest.raises(HTTPException) as exc:
+                await storage.update_ticket(
+                    "T1", {"messages": [message], "status": "fermé"},
+                    expected_status=OPEN_STATUSES,
+                )
+            assert exc.value.status_code == status_code
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_single_table_put_message_sends_native_values(dynamodb_storage):
+    async def scenario():
+        storage, stubber = dynamodb_storage(layout="single_table")
+        message = {"message_id": "m1", "timestamp": "2025-01-01T10:00:00", "content": "Bonjour"}
+        # Valeurs natives : le client de la ressource les sérialise une seule fois
+        expected = {"TransactItems": [
+            {"Put": {
+                "TableName": TABLE,
+                "Item": {**message, "ticket_id": "T1", "sk": "MSG#2025-01-01T10:00:00#m1"},
+                "ConditionExpression": "attribute_not_exists(sk)",
+            }},
+            {"Update": {
+                "TableName": TABLE,
+                "Key": {"ticket_id": "T1", "sk": "TICKET"},
+                "UpdateExpression": ANY,
+                "ConditionExpression": "attribute_exists(ticket_id)",
+                "ExpressionAttributeValues": {
+                    ":zero": 0, ":one": 1, ":last": message, ":preview": ANY,
+                },
+            }},
+        ]}
+        stubber.add_response("transact_write_items", {}, expected)
+        for reasons in (["None", "ConditionalCheckFailed"], ["ConditionalCheckFailed", "None"]):
+            stubber.add_client_error(
+                "transact_write_items",
+                service_error_code="TransactionCanceledException",
+                expected_params=expected,
+                modeled_fields={"CancellationReasons": [{"Code": code} for code in reasons]},
+            )
+
+        await storage.add_message("T1", dict(message))
+        # En-tête absent : 404
+        with pytest.raises(HTTPException) as exc:
+            await storage.add_message("T1", dict(message))
+        assert exc.value.status_code == 404
+        # Message déjà enregistré (rejeu) : ignoré
+        await storage.add_message("T1", dict(message))
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_single_table_delete_removes_the_whole_partition(dynamodb_storage):
+    async def scenario():
+        storage, stubber = dynamodb_storage(layout="single_table")
+        keys = {
+            "TableName": TABLE,
+            "KeyConditionExpression": Key("ticket_id").eq("T1"),
+            "ProjectionExpression": "ticket_id, sk",
+        }
+        stubber.add_response("query", {"Items": [
+            {"ticket_id": {"S": "T1"}, "sk": {"S": "MSG#2025-01-01T10:00:00#m1"}},
+            {"ticket_id": {"S": "T1"}, "sk": {"S": "TICKET"}},
+        ]}, keys)
+        stubber.add_response("batch_write_item", {}, {"RequestItems": {TABLE: [
+            {"DeleteRequest": {"Key": {"ticket_id": "T1", "sk": "MSG#2025-01-01T10:00:00#m1"}}},
+            {"DeleteRequest": {"Key": {"ticket_id": "T1", "sk": "TICKET"}}},
+        ]}})
+        # Partition vide : 404, rien n'est supprimé
+        stubber.add_response("query", {"Items": []}, keys)
+
+        await storage.delete_ticket("T1")
+        with pytest.raises(HTTPException) as exc:
+            await storage.delete_ticket("T1")
+        assert exc.value.status_code == 404
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_header_reads_return_the_fields_written_by_the_routers(dynamodb_storage):
+    async def scenario():
+        # Disposition item : projection sur la liste des attributs d'en-tête
+        storage, stubber = dynamodb_storage()
+        stubber.add_response(
+            "get_item",
+            {"Item": item("T1", "2025-01-01", updated_by="a@free.fr", closed_by="a@free.fr")},
+            {"TableName": TABLE, "Key": {"ticket_id": "T1"}, **header_projection()},
+        )
+        header = await storage.get_ticket("T1", include_messages=False)
+        assert header["updated_by"] == header["closed_by"] == "a@free.fr"
+        written = {"updated_by", "closed_by", "assigned_by", "resolution_time_seconds", "priority"}
+        assert written <= set(HEADER_ATTRIBUTES)
+        await storage.close()
+
+        # Single table : l'en-tête est lu en entier, champs libres compris
+        storage, stubber = dynamodb_storage(layout="single_table")
+        stubber.add_response(
+            "get_item",
+            {"Item": item("T1", "2025-01-01", sk="TICKET", custom_field="libre")},
+            {"TableName": TABLE, "Key": {"ticket_id": "T1", "sk": "TICKET"}},
+        )
+        header = await storage.get_ticket("T1", include_messages=False)
+        assert header["custom_field"] == "libre" and "sk" not in header
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_backfill_message_summaries_fixes_legacy_items(dynamodb_storage):
+    async def scenario():
+        storage, stubber = dynamodb_storage(scan_segments=1)
+        messages = [
+            {"M": {"message_id": {"S": "m1"}, "content": {"S": "Bonjour"}}},
+            {"M": {"message_id": {"S": "m2"}, "content": {"S": "Suite"}}},
+        ]
+        one = {"N": "1"}
+        stubber.add_response("scan", {"Items": [
+            # Écrit avant la dénormalisation, puis compté à partir de zéro
+            {"ticket_id": {"S": "T1"}, "messages": {"L": messages}, "message_count": one},
+            # Déjà à jour : aucune écriture
+            {"ticket_id": {"S": "T2"}, "messages": {"L": messages[:1]}, "message_count": one},
+        ]}, {"TableName": TABLE, "ProjectionExpression": ANY, "ExpressionAttributeNames": ANY})
+        update = {
+            "TableName": TABLE,
+            "Key": {"ticket_id": "T1"},
+            "UpdateExpression": ANY,
+            "ConditionExpression": "size(#messages) = :count",
+            "ExpressionAttributeNames": {"#count": "message_count", "#messages": "messages"},
+            "ExpressionAttributeValues": {
+                ":count": 2,
+                ":last": {"message_id": "m2", "content": "Suite"},
+                ":preview": ANY,
+            },
+        }
+        stubber.add_response("update_item", {}, update)
+
+        assert await storage.backfill_message_summaries() == 1
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+COUNTERS = "freeda-ticket-counters"
+
+
+def sent_params(storage, operation):
+    """Paramètres envoyés à `operation` par le stockage, appel par appel."""
+    sent = []
+    storage.client.meta.events.register(
+        f"before-parameter-build.dynamodb.{operation}",
+        lambda params, **kwargs: sent.append(copy.deepcopy(params)),
+    )
+    return sent
+
+
+def added_counters(update):
+    """Incréments {compteur: valeur} d'une expression ADD sur les compteurs."""
+    names, values = update["ExpressionAttributeNames"], update["ExpressionAttributeValues"]
+    return {names[f"#c{i}"]: values[f":c{i}"] for i in range(len(names))}
+
+
+def test_counted_write_retries_on_state_change_and_conflict(dynamodb_storage):
+    async def scenario():
+        storage, stubber = dynamodb_storage(
+            counters_table=COUNTERS, retry=AdaptiveRetry(base_delay=0)
+        )
+        transactions = sent_params(storage, "TransactWriteItems")
+        state = {"TableName": TABLE, "Key": {"ticket_id": "T1"}, "ConsistentRead": True,
+                 "ProjectionExpression": ANY, "ExpressionAttributeNames": ANY}
+        ticket = item("T1", "2025-01-01T10:00:00", channel="chat")
+
+        stubber.add_response("get_item", {"Item": {**ticket, "status": {"S": "nouveau"}}}, state)
+        # Statut changé par un autre worker entre la lecture et l'écriture : relire
+        stubber.add_client_error(
+            "transact_write_items", "TransactionCanceledException",
+            modeled_fields={"CancellationReasons": [
+                {"Code": "ConditionalCheckFailed"}, {"Code": "None"},
+            ]},
+        )
+        stubber.add_response("get_item", {"Item": {**ticket, "status": {"S": "en cours"}}}, state)
+        # Item compteur pris par une transaction concurrente : rejouer tel quel
+        stubber.add_client_error(
+            "transact_write_items", "TransactionCanceledException",
+            modeled_fields={"CancellationReasons": [
+                {"Code": "None"}, {"Code": "TransactionConflict"},
+            ]},
+        )
+        stubber.add_response("transact_write_items", {})
+        stubber.add_response("get_item", {"Item": {
+            **ticket, "status": {"S": "fermé"}, "closed_at": {"S": "2025-01-02T10:00:00"},
+        }}, {"TableName": TABLE, "Key": {"ticket_id": "T1"}, "ConsistentRead": True})
+
+        closed = await storage.update_ticket_status("T1", "fermé", "2025-01-02T10:00:00")
+        assert closed["resolution_duration"] == 86400
+
+        # Chaque écriture est conditionnée au statut lu juste avant
+        statuses = [
+            t["TransactItems"][0]["Update"]["ExpressionAttributeValues"][":cp0"]
+            for t in transactions
+        ]
+        assert statuses == ["nouveau", "en cours", "en cours"]
+        update = transactions[-1]["TransactItems"][0]["Update"]
+        assert "#cp_st = :cp0" in update["ConditionExpression"]
+        counters = transactions[-1]["TransactItems"][1]["Update"]
+        assert counters["TableName"] == COUNTERS
+        assert counter_delta(
+            {"status": "en cours", "channel": "chat", "created_at": "2025-01-01T10:00:00"},
+            {"status": "fermé", "channel": "chat", "created_at": "2025-01-01T10:00:00",
+             "closed_at": "2025-01-02T10:00:00"},
+        ) == added_counters(counters)
+        assert added_counters(counters)["status:fermé"] == 1
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_batch_import_adds_only_the_counter_delta(dynamodb_storage, make_ticket):
+    async def scenario():
+        storage, stubber = dynamodb_storage(counters_table=COUNTERS)
+        updates = sent_params(storage, "UpdateItem")
+        existing = make_ticket("T1")
+        created = make_ticket("T2", "2025-01-02T10:00:00", channel="email")
+
+        stubber.add_response("batch_get_item", {"Responses": {TABLE: [
+            item("T1", existing["created_at"], status="nouveau", channel="chat"),
+        ]}})
+        stubber.add_response("batch_write_item", {})
+        stubber.add_response("update_item", {})
+
+        assert await storage.save_tickets([existing, created]) == 2
+        # T1 réimporté à l'identique : seuls les compteurs de T2 bougent
+        assert added_counters(updates[0]) == dict.fromkeys(counter_keys(created), 1)
+        assert updates[0]["TableName"] == COUNTERS
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_rebuild_counters_resets_the_other_shards(dynamodb_storage, make_ticket):
+    async def scenario():
+        storage, stubber = dynamodb_storage(
+            counters_table=COUNTERS, counter_shards=3, scan_segments=1
+        )
+        tickets = [make_ticket("T1"), make_ticket("T2", status="fermé", channel="email")]
+        stubber.add_response("scan", {"Items": [
+            item(t["ticket_id"], t["created_at"], status=t["status"], channel=t["channel"])
+            for t in tickets
+        ]})
+        expected = Counter(key for t in tickets for key in counter_keys(t))
+        stubber.add_response("put_item", {}, {
+            "TableName": COUNTERS, "Item": {"counter_id": "counters#0", **expected},
+        })
+        for n in (1, 2):
+            stubber.add_response(
+                "delete_item", {}, {"TableName": COUNTERS, "Key": {"counter_id": f"counters#{n}"}}
+            )
+
+        assert await storage.rebuild_counters() == 2
+        stubber.assert_no_pending_responses()
+        await storage.close()
+
+    asyncio.run(scenario())
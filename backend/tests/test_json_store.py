@@ -0,0 +1,266 @@
+import asyncio
+from datetime import datetime
+
+from app.services.export import ExportService
+from app.services.storage.codecs import get_codec
+from app.services.storage.interface import TicketStorage
+from app.services.storage.json_store import JSONStorage
+
+
+def test_journal_appends_and_replays(tmp_path, make_ticket):
+    file_path = tmp_path / "tickets.json"
+
+    async def scenario():
+        storage = JSONStorage(file_path=file_path, journal=True, compact_threshold=1000)
+        await storage.save_ticket(make_ticket("T1"))
+        await storage.add_message("T1", {"message_id": "m1", "content": "Bonjour"})
+        await storage.update_ticket_status("T1", "fermé", "2025-01-01T11:00:00")
+
+        # Aucune réécriture du snapshot, seulement des ajouts au journal
+        assert not file_path.exists()
+        assert len(storage.journal_path.read_text(encoding="utf-8").splitlines()) == 3
+
+        # Une autre instance (autre worker) relit le journal
+        other = JSONStorage(file_path=file_path, journal=True)
+        ticket = await other.get_ticket("T1")
+        assert ticket["status"] == "fermé"
+        assert ticket["resolution_duration"] == 3600
+        assert ticket["messages"][0]["content"] == "Bonjour"
+
+    asyncio.run(scenario())
+
+
+def test_journal_compaction_folds_into_snapshot(tmp_path, make_ticket):
+    file_path = tmp_path / "tickets.json"
+
+    async def scenario():
+        storage = JSONStorage(file_path=file_path, journal=True, compact_threshold=3)
+        for i in range(3):
+            await storage.save_ticket(make_ticket(f"T{i}"))
+        await storage.close()
+
+        assert file_path.exists()
+        assert storage.journal_path.read_bytes() == b""
+
+        reopened = JSONStorage(file_path=file_path, journal=True)
+        assert len(await reopened.list_tickets()) == 3
+
+    asyncio.run(scenario())
+
+
+def test_reads_served_from_memory_until_file_changes(tmp_path, make_ticket):
+    file_path = tmp_path / "tickets.json"
+
+    async def scenario():
+        storage = JSONStorage(file_path=file_path)
+        await storage.save_ticket(make_ticket("T1"))
+
+        calls = []
+        original = storage._read_snapshot
+        storage._read_snapshot = lambda: calls.append(1) or original()
+
+        for _ in range(5):
+            await storage.get_ticket("T1")
+        assert calls == []
+
+        # Écriture externe (autre worker) : le fichier change, on recharge
+        other = JSONStorage(file_path=file_path)
+        await other.update_ticket("T1", {"assigned_to": "agent@free.fr"})
+        ticket = await storage.get_ticket("T1")
+        assert ticket["assigned_to"] == "agent@free.fr"
+        assert calls == [1]
+
+    asyncio.run(scenario())
+
+
+def _add_messages(file_path, journal, worker, count):
+    async def run():
+        storage = JSONStorage(file_path=file_path, journal=journal)
+        for i in range(count):
+            await storage.add_message("T1", {"message_id": f"{worker}-{i}"})
+
+    asyncio.run(run())
+
+
+def test_concurrent_workers_do_not_lose_updates(tmp_path, make_ticket):
+    import multiprocessing
+
+    for journal in (False, True):
+        file_path = tmp_path / f"tickets-{journal}.json"
+        asyncio.run(JSONStorage(file_path=file_path, journal=journal).save_ticket(make_ticket("T1")))
+
+        workers = [
+            multiprocessing.Process(target=_add_messages, args=(file_path, journal, w, 20))
+            for w in range(2)
+        ]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+
+        ticket = asyncio.run(JSONStorage(file_path=file_path, journal=journal).get_ticket("T1"))
+        assert len(ticket["messages"]) == 40
+
+
+def test_list_filters_use_incremental_indexes(tmp_path, make_ticket):
+    file_path = tmp_path / "tickets.json"
+
+    async def scenario():
+        storage = JSONStorage(file_path=file_path, journal=True)
+        for i, channel in enumerate(["chat", "email", "chat", "sms"]):
+            ticket = make_ticket(f"T{i}", created_at=f"2025-01-0{i + 1}T10:00:00", channel=channel)
+            ticket["analytics"] = {"urgency": "haute" if i % 2 else "basse"}
+            await storage.save_ticket(ticket)
+
+        chat = await storage.list_tickets(channel="chat")
+        assert [t["ticket_id"] for t in chat] == ["T2", "T0"]
+
+        await storage.update_ticket("T2", {"assigned_to": "agent@free.fr", "status": "en cours"})
+        mine = await storage.list_tickets(assigned_to="agent@free.fr", status="en cours")
+        assert [t["ticket_id"] for t in mine] == ["T2"]
+        assert await storage.list_tickets(status="nouveau", channel="chat") == [chat[1]]
+
+        urgent = await storage.list_tickets(urgency="haute", date_from="2025-01-02", date_to="2025-01-03")
+        assert [t["ticket_id"] for t in urgent] == ["T1"]
+
+        await storage.delete_ticket("T0")
+        assert await storage.list_tickets(channel="chat", status="nouveau") == []
+
+        # Un autre worker reconstruit les index depuis le disque
+        other = JSONStorage(file_path=file_path, journal=True)
+        assert [t["ticket_id"] for t in await other.list_tickets()] == ["T3", "T2", "T1"]
+
+    asyncio.run(scenario())
+
+
+def test_msgpack_codec_journal_skips_torn_record(tmp_path, make_ticket):
+    file_path = tmp_path / "tickets.msgpack"
+
+    async def scenario():
+        storage = JSONStorage(file_path=file_path, journal=True, codec=get_codec("msgpack"))
+        await storage.save_ticket(make_ticket("T1"))
+
+        # Enregistrement interrompu en fin de journal (crash pendant l'écriture)
+        with open(storage.journal_path, "ab") as f:
+            f.write(storage.codec.frame({"op": "put", "ticket": make_ticket("T9")})[:-3])
+
+        other = JSONStorage(file_path=file_path, journal=True, codec=get_codec("msgpack"))
+        await other.add_message("T1", {"message_id": "m1", "content": "Bonjour"})
+        await other.close()
+
+        reopened = JSONStorage(file_path=file_path, journal=True, codec=get_codec("msgpack"))
+        tickets = await reopened.list_tickets()
+        assert [t["ticket_id"] for t in tickets] == ["T1"]
+        assert tickets[0]["messages"][0]["content"] == "Bonjour"
+        assert get_codec("msgpack").loads(file_path.read_bytes())["T1"]["status"] == "nouveau"
+
+    asyncio.run(scenario())
+
+
+def test_list_pages_with_opaque_cursor(tmp_path, make_ticket):
+    async def scenario():
+        storage = JSONStorage(file_path=tmp_path / "tickets.json")
+        for i in range(5):
+            await storage.save_ticket(make_ticket(f"T{i}", created_at="2025-01-01T10:00:00"))
+        await storage.save_ticket(make_ticket("E1", channel="email"))
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = await storage.list_tickets_page(channel="chat", limit=2, cursor=cursor)
+            seen.extend(t["ticket_id"] for t in page)
+            if cursor is None:
+                break
+        assert seen == ["T4", "T3", "T2", "T1", "T0"]
+
+    asyncio.run(scenario())
+
+
+def test_iterate_pages_and_count(tmp_path, make_ticket):
+    async def scenario():
+        storage = JSONStorage(file_path=tmp_path / "tickets.json")
+        for i in range(5):
+            await storage.save_ticket(make_ticket(f"T{i}", created_at=f"2025-01-0{i + 1}T10:00:00"))
+        await storage.save_ticket(make_ticket("E1", channel="email"))
+
+        pages = [
+            [t["ticket_id"] for t in page]
+            async for page in storage.iter_tickets(channel="chat", page_size=2)
+        ]
+        assert pages == [["T4", "T3"], ["T2", "T1"], ["T0"]]
+        assert await storage.count_tickets(channel="chat") == 5
+        assert await storage.count_tickets(date_from="2025-01-03") == 3
+        # Implémentation par défaut : somme des pages
+        assert await TicketStorage.count_tickets(storage, channel="chat") == 5
+
+        csv_content = await ExportService(storage).generate_csv(channel="chat")
+        assert csv_content.splitlines()[0].startswith("ticket_id,created_at")
+        assert [line.split(",")[0] for line in csv_content.splitlines()[1:]] == [
+            "T4", "T3", "T2", "T1", "T0"
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_batch_save_and_get(tmp_path, make_ticket):
+    file_path = tmp_path / "tickets.json"
+
+    async def scenario():
+        storage = JSONStorage(file_path=file_path, journal=True)
+        assert await storage.save_tickets(make_ticket(f"T{i}") for i in range(3)) == 3
+        # Un seul lot dans le journal, relu par une autre instance
+        other = JSONStorage(file_path=file_path, journal=True)
+        tickets = await other.get_tickets(["T2", "T404", "T0", "T2"], include_messages=False)
+        assert [t["ticket_id"] for t in tickets] == ["T2", "T0"]
+        assert tickets[0]["message_count"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_list_summaries_truncate_last_message(tmp_path, make_ticket):
+    async def scenario():
+        storage = JSONStorage(file_path=tmp_path / "tickets.json")
+        ticket = make_ticket("T1")
+        ticket["analytics"] = {"urgency": "haute", "summary": "Long résumé", "sentiment": "négatif"}
+        await storage.save_ticket(ticket)
+        await storage.add_message("T1", {"content": "x" * 500, "type": "client", "timestamp": "t"})
+
+        summaries, cursor = await storage.list_ticket_summaries(limit=10)
+        assert cursor is None
+        summary = summaries[0]
+        assert summary["message_count"] == 1
+        assert len(summary["last_message_preview"]["content"]) == 120
+        assert summary["analytics"] == {"urgency": "haute", "sentiment": "négatif"}
+        assert "last_message" not in summary and "messages" not in summary
+
+    asyncio.run(scenario())
+
+
+def test_stats_counters_follow_writes(tmp_path, make_ticket):
+    file_path = tmp_path / "tickets.json"
+
+    async def scenario():
+        storage = JSONStorage(file_path=file_path, journal=True)
+        today = datetime.utcnow().date().isoformat()
+        for i, channel in enumerate(["chat", "email", "chat"]):
+            ticket = make_ticket(f"T{i}", created_at=f"{today}T1{i}:00:00", channel=channel)
+            ticket["analytics"] = {"urgency": "haute"}
+            await storage.save_ticket(ticket)
+
+        await storage.update_ticket_status("T0", "fermé", closed_at=f"{today}T18:00:00")
+        await storage.update_ticket("T1", {"status": "en cours"})
+        await storage.delete_ticket("T2")
+
+        stats = await storage.get_ticket_stats(days=7)
+        assert (stats["total"], stats["open"], stats["closed"]) == (2, 1, 1)
+        assert stats["by_status"] == {"fermé": 1, "en cours": 1}
+        assert stats["by_channel"] == {"chat": {"open": 0, "closed": 1}, "email": {"open": 1, "closed": 0}}
+        assert stats["by_urgency"] == {"haute": {"open": 1, "closed": 1}}
+        assert stats["by_day"][-1] == {"date": today, "created": 2, "closed": 1}
+        assert len(stats["by_day"]) == 7
+
+        # Compteurs reconstruits depuis le disque, identiques au comptage complet
+        other = JSONStorage(file_path=file_path, journal=True)
+        assert await other.get_ticket_stats(days=7) == stats
+        assert await TicketStorage.get_ticket_stats(storage, days=7) == stats
+
+    asyncio.run(scenario())
@@ -1,4 +1,6 @@
 from fastapi.testclient import TestClient
+from app.core.container import services
+from app.core.ratelimit import lookup_limiter, ticket_limiter
 from app.main import app
 
 client = TestClient(app)
@@ -40,3 +42,56 @@ def test_smart_reply_integration():
     assert "assistant_message" in data
     # "Bonjour" usually triggers a greeting
     assert "Bonjour" in data["assistant_message"]["content"]
+
+def test_lookup_tickets_public():
+    response = client.post(
+        "/public/tickets/lookup",
+        json={"ticket_ids": ["FRE-UNKNOWN", "FRE-UNKNOWN"]}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"tickets": [], "not_found": ["FRE-UNKNOWN"]}
+
+
+def test_lookup_existing_tickets_is_rate_limited_per_id():
+    ticket_limiter.requests.clear()
+    lookup_limiter.requests.clear()
+    ticket_ids = [
+        client.post(
+            "/public/tickets/",
+            json={"initial_message": "Test message", "channel": "chat"}
+        ).json()["ticket_id"]
+        for _ in range(2)
+    ]
+
+    response = client.post(
+        "/public/tickets/lookup",
+        json={"ticket_ids": ticket_ids + ["FRE-UNKNOWN"]}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [t["ticket_id"] for t in data["tickets"]] == ticket_ids
+    assert all(t["status"] == "nouveau" and t["channel"] == "chat" for t in data["tickets"])
+    assert all(t["message_count"] >= 1 for t in data["tickets"])
+    assert data["not_found"] == ["FRE-UNKNOWN"]
+
+    # Budget de 100 IDs par minute : 3 déjà consultés
+    response = client.post(
+        "/public/tickets/lookup",
+        json={"ticket_ids": [f"FRE-{i:08d}" for i in range(97)]}
+    )
+    assert response.status_code == 200
+    response = client.post("/public/tickets/lookup", json={"ticket_ids": ["FRE-UNKNOWN"]})
+    assert response.status_code == 429
+    lookup_limiter.requests.clear()
+
+def test_routers_share_one_storage():
+    with TestClient(app) as managed:
+        storage = services.storage
+        created = managed.post(
+            "/public/tickets/",
+            json={"initial_message": "Test message", "channel": "chat"}
+        ).json()
+        assert managed.get(f"/public/tickets/{created['ticket_id']}").status_code == 200
+        assert services.storage is storage
+    # Fermé au shutdown, recréé à la demande
+    assert services.storage is None
@@ -0,0 +1,64 @@
+import asyncio
+
+from app.services.storage.retry import AdaptiveRetry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_throttling_limits_rate_until_recovered():
+    async def scenario():
+        clock = FakeClock()
+        retry = AdaptiveRetry(min_rate=1.0, clock=clock)
+
+        # 40 envois en une seconde, puis un throttling : débit divisé par deux
+        for _ in range(40):
+            await retry.acquire()
+        clock.now = 1.0
+        await retry.acquire()
+        retry.on_throttle()
+        assert retry.stats()["rate_limit"] == 20.5
+        assert retry.stats()["throttled"] == 1
+
+        # Les succès font remonter le débit jusqu'à lever la limite
+        for _ in range(500):
+            retry.on_success()
+        assert retry.rate is None
+
+    asyncio.run(scenario())
+
+
+def test_full_jitter_backoff_and_retry_budget():
+    retry = AdaptiveRetry(
+        max_attempts=3, base_delay=0.1, max_delay=0.3, retry_budget=10, rng=lambda: 1.0
+    )
+    assert [retry.backoff(n) for n in range(4)] == [0.1, 0.2, 0.3, 0.3]
+    assert AdaptiveRetry(rng=lambda: 0.0).backoff(5) == 0.0
+
+    assert retry.take_retry(1) and retry.take_retry(2)
+    # Nombre d'essais atteint, puis budget épuisé
+    assert not retry.take_retry(3)
+    assert not retry.take_retry(1)
+    assert retry.stats()["budget_exhausted"] == 1
+    retry.on_success()
+    assert retry.stats()["retry_budget"] == 1
+
+
+def test_shared_controller_survives_successive_event_loops():
+    clock = FakeClock()
+    retry = AdaptiveRetry(min_rate=1.0, clock=clock)
+    retry.rate = 1000.0
+
+    async def burst():
+        await asyncio.gather(*(retry.acquire() for _ in range(3)))
+
+    # Un asyncio.run par boucle, comme les tests, les scripts ou un rechargement
+    asyncio.run(burst())
+    asyncio.run(burst())
+    # Jetons réservés sous le verrou : les envois en excès attendent leur tour
+    assert retry.stats()["delayed"] == 6
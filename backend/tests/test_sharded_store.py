@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.storage.sharded_store import ShardedJSONStorage
+
+
+def test_message_append_only_rewrites_ticket_file(tmp_path, make_ticket):
+    async def scenario():
+        storage = ShardedJSONStorage(base_dir=tmp_path)
+        greeting = {"message_id": "m0", "content": "Bonjour"}
+        await storage.save_ticket(make_ticket("FRE-1", "2025-01-01T10:00:00", messages=[greeting]))
+        await storage.save_ticket(
+            make_ticket("FRE-2", "2025-01-02T10:00:00", channel="email", messages=[greeting])
+        )
+
+        other_path = storage._ticket_path("FRE-2")
+        other_mtime = other_path.stat().st_mtime_ns
+        await storage.add_message("FRE-1", {"message_id": "m1", "content": "Suite"})
+        assert other_path.stat().st_mtime_ns == other_mtime
+
+        ticket = await storage.get_ticket("FRE-1")
+        assert [m["message_id"] for m in ticket["messages"]] == ["m0", "m1"]
+
+        # En-têtes servis par le manifeste, sans lire les fichiers des tickets
+        storage._ticket_path("FRE-1").unlink()
+        header = await storage.get_ticket("FRE-1", include_messages=False)
+        assert "messages" not in header
+        assert header["message_count"] == 2
+        assert header["last_message"]["message_id"] == "m1"
+        assert len(await storage.list_tickets(include_messages=False)) == 2
+        await storage.save_ticket(ticket)
+
+        await storage.update_ticket_status("FRE-2", "fermé", "2025-01-02T11:00:00")
+        closed = await storage.list_tickets(status="fermé")
+        assert [t["ticket_id"] for t in closed] == ["FRE-2"]
+        assert closed[0]["messages"]
+
+    asyncio.run(scenario())
+
+
+def test_import_from_single_file_format(tmp_path, make_ticket):
+    tickets = {
+        f"FRE-{i}": make_ticket(
+            f"FRE-{i}", f"2025-01-0{i}T10:00:00",
+            messages=[{"message_id": "m0", "content": "Bonjour"}],
+        )
+        for i in range(1, 4)
+    }
+
+    async def scenario():
+        storage = ShardedJSONStorage(base_dir=tmp_path)
+        assert await storage.import_tickets(tickets) == 3
+
+        listed = await ShardedJSONStorage(base_dir=tmp_path).list_tickets()
+        assert [t["ticket_id"] for t in listed] == ["FRE-3", "FRE-2", "FRE-1"]
+        assert not await storage.ticket_exists("../manifest")
+
+    asyncio.run(scenario())
+
+
+def test_headers_follow_files_across_workers(tmp_path, make_ticket):
+    async def scenario():
+        # Deux instances sur le même dossier : deux workers
+        workers = [ShardedJSONStorage(base_dir=tmp_path) for _ in range(2)]
+        await workers[0].save_tickets([make_ticket("FRE-1"), make_ticket("FRE-2")])
+
+        await asyncio.gather(*(
+            workers[i % 2].add_message("FRE-1", {"message_id": f"m{i}", "content": "Suite"})
+            for i in range(20)
+        ))
+        ticket = await workers[1].get_ticket("FRE-1")
+        reader = ShardedJSONStorage(base_dir=tmp_path)
+        header = await reader.get_ticket("FRE-1", include_messages=False)
+        assert header["message_count"] == len(ticket["messages"]) == 20
+        assert header["last_message"] == ticket["messages"][-1]
+
+        async def add(i):
+            try:
+                message = {"message_id": f"m{i}", "content": "Suite"}
+                await workers[i % 2].add_message("FRE-2", message)
+            except HTTPException as e:
+                assert e.status_code == 404
+
+        # Une suppression concurrente d'écritures ne laisse aucun en-tête orphelin
+        await asyncio.gather(*(add(i) for i in range(10)), workers[0].delete_ticket("FRE-2"))
+        reader = ShardedJSONStorage(base_dir=tmp_path)
+        assert not await reader.ticket_exists("FRE-2")
+        headers = await reader.list_tickets(include_messages=False)
+        assert [t["ticket_id"] for t in headers] == ["FRE-1"]
+        with pytest.raises(HTTPException):
+            await workers[1].delete_ticket("FRE-2")
+
+    asyncio.run(scenario())
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.storage.sqlite_store import SQLiteStorage
+
+
+def test_sqlite_round_trip_and_filters(tmp_path, make_ticket):
+    async def scenario():
+        storage = SQLiteStorage(db_path=tmp_path / "tickets.db")
+        extra = dict(
+            analytics={"urgency": "haute", "score": 0.5},
+            messages=[{"message_id": "m0", "content": "Bonjour"}],
+        )
+        await storage.save_ticket(make_ticket("FRE-1", "2025-01-01T10:00:00", **extra))
+        await storage.save_ticket(make_ticket("FRE-2", "2025-01-02T10:00:00", channel="email", **extra))
+        await storage.add_message("FRE-1", {"message_id": "m1", "content": "Suite"})
+
+        ticket = await storage.get_ticket("FRE-1")
+        assert [m["message_id"] for m in ticket["messages"]] == ["m0", "m1"]
+        assert ticket["analytics"]["score"] == 0.5
+
+        header = await storage.get_ticket("FRE-1", include_messages=False)
+        assert "messages" not in header
+        assert header["message_count"] == 2 and header["last_message"]["message_id"] == "m1"
+        headers = await storage.list_tickets(channel="email", include_messages=False)
+        assert [(h["ticket_id"], h["message_count"]) for h in headers] == [("FRE-2", 1)]
+
+        page, cursor = await storage.list_tickets_page(limit=1)
+        assert [t["ticket_id"] for t in page] == ["FRE-2"] and cursor
+        page, cursor = await storage.list_tickets_page(limit=1, cursor=cursor)
+        assert [t["ticket_id"] for t in page] == ["FRE-1"] and cursor is None
+        assert [m["message_id"] for m in page[0]["messages"]] == ["m0", "m1"]
+
+        closed = await storage.update_ticket_status("FRE-2", "fermé", "2025-01-02T12:00:00")
+        assert closed["resolution_duration"] == 7200
+
+        assert [t["ticket_id"] for t in await storage.list_tickets()] == ["FRE-2", "FRE-1"]
+        assert [t["ticket_id"] for t in await storage.list_tickets(status="fermé")] == ["FRE-2"]
+        chat = await storage.list_tickets(channel="chat", date_from="2025-01-01")
+        assert len(chat) == 1 and len(chat[0]["messages"]) == 2
+        assert await storage.count_tickets() == 2
+        assert await storage.count_tickets(status="fermé", channel="email") == 1
+
+        with pytest.raises(HTTPException) as exc:
+            await storage.add_message("FRE-404", {"message_id": "x"})
+        assert exc.value.status_code == 404
+
+        await storage.delete_ticket("FRE-1")
+        assert not await storage.ticket_exists("FRE-1")
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_conditional_updates(tmp_path, make_ticket):
+    async def scenario():
+        storage = SQLiteStorage(db_path=tmp_path / "tickets.db")
+        await storage.save_ticket(make_ticket(
+            "FRE-1", "2025-01-01T10:00:00",
+            analytics={"urgency": "haute", "score": 0.5},
+            messages=[{"message_id": "m0", "content": "Bonjour"}],
+        ))
+
+        ticket = await storage.update_ticket_status(
+            "FRE-1", "fermé", "2025-01-01T11:00:00", expected_status=("nouveau", "en cours")
+        )
+        assert ticket["resolution_duration"] == 3600
+
+        with pytest.raises(HTTPException) as conflict:
+            await storage.update_ticket("FRE-1", {"assigned_to": "a@x"}, expected_status="nouveau")
+        assert conflict.value.status_code == 409
+        assert "assigned_to" not in await storage.get_ticket("FRE-1", include_messages=False)
+
+        for missing in (
+            storage.update_ticket("FRE-404", {"assigned_to": "a@x"}),
+            storage.delete_ticket("FRE-404"),
+        ):
+            with pytest.raises(HTTPException) as not_found:
+                await missing
+            assert not_found.value.status_code == 404
+        await storage.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.storage.cache import CachedStorage
+from app.services.storage.json_store import JSONStorage
+from app.services.storage.middleware import (
+    FaultInjectionStorage,
+    MetricsStorage,
+    SlowCallLogStorage,
+)
+
+
+class StepClock:
+    """Horloge qui avance de `step` secondes à chaque lecture."""
+
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def test_metrics_over_cache_count_every_operation(tmp_path, make_ticket):
+    async def scenario():
+        backend = JSONStorage(file_path=tmp_path / "tickets.json")
+        storage = MetricsStorage(CachedStorage(backend), clock=StepClock(0.004))
+        for i in range(3):
+            await storage.save_ticket(make_ticket(f"T{i}", created_at=f"2025-01-0{i + 1}T10:00:00"))
+        await storage.get_ticket("T0")
+        await storage.get_ticket("T0")
+        with pytest.raises(HTTPException):
+            await storage.get_ticket("T404")
+
+        pages = [[t["ticket_id"] for t in page] async for page in storage.iter_tickets(page_size=2)]
+        assert pages == [["T2", "T1"], ["T0"]]
+
+        stats = storage.metrics_stats()
+        assert stats["save_ticket"]["count"] == 3
+        # Le 404 est une réponse normale, pas une erreur
+        assert stats["get_ticket"]["count"] == 3 and stats["get_ticket"]["errors"] == 0
+        assert stats["get_ticket"]["buckets"]["5"] == 3
+        assert stats["get_ticket"]["p95_ms"] == 4.0
+        # Une mesure par page, plus la fin de l'itération
+        assert stats["iter_tickets"]["count"] == 3
+        # Attributs des couches inférieures toujours accessibles
+        assert storage.cache_stats()["hits"] == 1
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_fault_injection_and_slow_call_log(tmp_path, caplog, make_ticket):
+    async def scenario():
+        backend = JSONStorage(file_path=tmp_path / "tickets.json")
+        await backend.save_ticket(make_ticket("T1"))
+
+        faulty = FaultInjectionStorage(
+            backend, error_rate=0.5, operations=["get_ticket"], rng=lambda: 0.1
+        )
+        metrics = MetricsStorage(faulty)
+        with pytest.raises(HTTPException) as exc:
+            await metrics.get_ticket("T1")
+        assert exc.value.status_code == 503
+        assert await metrics.ticket_exists("T1")
+        assert metrics.metrics_stats()["get_ticket"]["errors"] == 1
+        assert metrics.fault_stats()["errors"] == 1
+
+        slow = SlowCallLogStorage(backend, threshold_ms=100, clock=StepClock(0.25))
+        with caplog.at_level(logging.WARNING, logger="app.services.storage.middleware"):
+            await slow.get_ticket("T1")
+        assert "Slow storage call: get_ticket T1 took 250 ms" in caplog.text
+
+    asyncio.run(scenario())